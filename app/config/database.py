@@ -1,254 +1,399 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+from typing import Dict, List, Optional
 from app.config.settings import settings
-from app.utils.logger import log_info, log_error
+from app.utils.logger import log_info, log_error, log_warning
+from app.utils.query_tracker import tracked_cursor
+
+class PoolTimeoutError(Exception):
+    """No hubo conexión disponible dentro del tiempo de espera del pool"""
+
+class PooledConnection:
+    """Conexión prestada por el pool; close() la devuelve en lugar de cerrarla"""
+    
+    def __init__(self, pool: "ConnectionPool", raw_connection, created_at: float):
+        self._pool = pool
+        self._raw = raw_connection
+        self._created_at = created_at
+        self._last_used = time.monotonic()
+        self._returned = False
+    
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+    
+    def cursor(self, *args, **kwargs):
+        return tracked_cursor(self._raw.cursor(*args, **kwargs))
+    
+    def close(self):
+        """Devuelve la conexión al pool"""
+        if not self._returned:
+            self._returned = True
+            self._pool.putconn(self)
+
+class ConnectionPool:
+    """Pool de conexiones PostgreSQL thread-safe con timeout, health check y tiempo de vida máximo"""
+    
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_lifetime: int = 1800,
+        health_check_interval: int = 30
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        
+        self._idle: List[PooledConnection] = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "checkouts": 0,
+            "checkout_timeouts": 0,
+            "health_check_failures": 0,
+            "waiting": 0,
+            "total_wait_ms": 0.0
+        }
+        
+        for _ in range(self.min_size):
+            self._size += 1
+            self._idle.append(self._connect())
+    
+    def _connect(self) -> PooledConnection:
+        """Abre una conexión nueva; el llamador ya reservó su lugar en `_size`"""
+        raw = psycopg2.connect(self.dsn, cursor_factory=psycopg2.extras.RealDictCursor)
+        with self._condition:
+            self._stats["connections_created"] += 1
+        return PooledConnection(self, raw, time.monotonic())
+    
+    def _discard(self, connection: PooledConnection):
+        with self._condition:
+            self._size -= 1
+            self._stats["connections_discarded"] += 1
+            self._condition.notify()
+        try:
+            connection._raw.close()
+        except Exception:
+            pass
+    
+    def _is_expired(self, connection: PooledConnection) -> bool:
+        return self.max_lifetime > 0 and time.monotonic() - connection._created_at > self.max_lifetime
+    
+    def _is_healthy(self, connection: PooledConnection) -> bool:
+        """Verifica la conexión solo si estuvo inactiva más del intervalo configurado"""
+        if connection._raw.closed:
+            return False
+        if time.monotonic() - connection._last_used < self.health_check_interval:
+            return True
+        try:
+            with connection._raw.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection._raw.rollback()
+            return True
+        except Exception:
+            with self._condition:
+                self._stats["health_check_failures"] += 1
+            return False
+    
+    def getconn(self) -> PooledConnection:
+        """Obtiene una conexión del pool, esperando como máximo `timeout` segundos"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection = None
+            with self._condition:
+                if self._closed:
+                    raise PoolTimeoutError("El pool de conexiones está cerrado")
+                
+                if self._idle:
+                    connection = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["checkout_timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Sin conexiones disponibles tras {self.timeout}s (max_size={self.max_size})"
+                        )
+                    self._stats["waiting"] += 1
+                    self._condition.wait(remaining)
+                    self._stats["waiting"] -= 1
+                    continue
+            
+            # La conexión y el health check se hacen fuera del lock
+            if connection is None:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            elif self._is_expired(connection) or not self._is_healthy(connection):
+                self._discard(connection)
+                continue
+            
+            with self._condition:
+                return self._checkout(connection, started)
+    
+    def _checkout(self, connection: PooledConnection, started: float) -> PooledConnection:
+        connection._returned = False
+        self._stats["checkouts"] += 1
+        self._stats["total_wait_ms"] += (time.monotonic() - started) * 1000
+        return connection
+    
+    def putconn(self, connection: PooledConnection):
+        """Devuelve una conexión al pool descartando transacciones abiertas"""
+        raw = connection._raw
+        try:
+            if not raw.closed and raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                raw.rollback()
+        except Exception:
+            pass
+        
+        if self._closed or raw.closed or self._is_expired(connection):
+            self._discard(connection)
+            return
+        
+        with self._condition:
+            connection._last_used = time.monotonic()
+            self._idle.append(connection)
+            self._condition.notify()
+    
+    def closeall(self):
+        """Cierra todas las conexiones inactivas y rechaza nuevos préstamos"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for connection in idle:
+            self._discard(connection)
+    
+    def stats(self) -> Dict:
+        """Estadísticas actuales del pool"""
+        with self._condition:
+            checkouts = self._stats["checkouts"]
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+                "avg_wait_ms": round(self._stats["total_wait_ms"] / checkouts, 3) if checkouts else 0.0
+            }
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Obtiene (o crea) el pool global de conexiones"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    settings.database_url,
+                    min_size=settings.db_pool_min_size,
+                    max_size=settings.db_pool_max_size,
+                    timeout=settings.db_pool_timeout,
+                    max_lifetime=settings.db_pool_max_lifetime,
+                    health_check_interval=settings.db_pool_health_check_interval
+                )
+                log_info("Pool de conexiones PostgreSQL creado", min_size=settings.db_pool_min_size, max_size=settings.db_pool_max_size)
+    return _pool
+
+def close_pool():
+    """Cierra el pool global (al apagar la aplicación)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+def get_pool_stats() -> Dict:
+    """Estadísticas del pool global o vacío si aún no se ha creado"""
+    return _pool.stats() if _pool is not None else {}
+
+class UnitOfWorkError(Exception):
+    """La transacción de la unidad de trabajo falló y se revirtió"""
+
+class UnitOfWorkConnection:
+    """Conexión compartida por una unidad de trabajo.
+    
+    Los modelos la reciben de get_db_connection() como cualquier otra: su commit()
+    y close() se difieren al final de la unidad y rollback() la marca para revertir.
+    """
+    
+    def __init__(self, connection: PooledConnection):
+        self._connection = connection
+        self.rollback_only = False
+    
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        self.rollback_only = True
+    
+    def close(self):
+        pass
+
+_unit_of_work: ContextVar[Optional[UnitOfWorkConnection]] = ContextVar("unit_of_work", default=None)
+
+@contextmanager
+def unit_of_work():
+    """Ejecuta el bloque en una sola conexión y transacción con un único commit al final
+    
+    Las llamadas a get_db_connection() dentro del bloque (también las de los modelos)
+    reciben la misma conexión. Una unidad anidada se une a la exterior.
+    """
+    current = _unit_of_work.get()
+    if current is not None:
+        yield current
+        return
+    
+    connection = get_db_connection()
+    uow = UnitOfWorkConnection(connection)
+    token = _unit_of_work.set(uow)
+    try:
+        yield uow
+        if connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            raise UnitOfWorkError("Una consulta de la unidad de trabajo falló; se revirtió la transacción")
+        if uow.rollback_only:
+            connection.rollback()
+        else:
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        _unit_of_work.reset(token)
+        connection.close()
 
 def get_db_connection():
-    """Obtiene conexión a la base de datos PostgreSQL"""
+    """Obtiene conexión a la base de datos PostgreSQL desde el pool (o la de la unidad de trabajo activa)"""
+    uow = _unit_of_work.get()
+    if uow is not None:
+        return uow
     try:
-        connection = psycopg2.connect(
-            settings.database_url,
-            cursor_factory=psycopg2.extras.RealDictCursor
-        )
-        return connection
+        return get_pool().getconn()
+    except PoolTimeoutError as e:
+        log_warning("Pool de conexiones agotado", error=str(e))
+        raise Exception(f"Error conectando a la base de datos: {str(e)}")
     except Exception as e:
         raise Exception(f"Error conectando a la base de datos: {str(e)}")
 
 def init_database():
-    """Inicializa la base de datos y crea las tablas si no existen"""
+    """Aplica las migraciones pendientes y, fuera de producción, los datos de prueba
+    
+    También crea las particiones mensuales que falten (ver PartitionService).
+    """
+    from app.config.migrations import run_migrations
+    from app.services.partition_service import PartitionService
+    
+    try:
+        run_migrations("postgresql")
+        # Al arrancar también: si el cron de particiones dejó de correr, los meses nuevos
+        # no se quedan en la partición DEFAULT hasta su siguiente ejecución
+        try:
+            PartitionService.ensure_future_partitions()
+        except Exception as e:
+            log_error(f"Error creando particiones al iniciar: {str(e)}")
+        if settings.environment != "production":
+            seed_database()
+        log_info("Base de datos PostgreSQL inicializada correctamente")
+    except Exception as e:
+        log_error(f"Error inicializando base de datos: {str(e)}")
+        raise
+
+def seed_database():
+    """Inserta datos de prueba una sola vez (nunca se ejecuta en producción)"""
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
-            # Tabla users
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    nombre VARCHAR(100) NOT NULL,
-                    email VARCHAR(100) UNIQUE,
-                    telefono VARCHAR(20) UNIQUE,
-                    password VARCHAR(255) NOT NULL,
-                    user_type_id INTEGER NOT NULL DEFAULT 1,
-                    municipality_id BIGINT,
-                    avatar VARCHAR(500),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    CONSTRAINT chk_contact CHECK (email IS NOT NULL OR telefono IS NOT NULL)
-                )
-            """)
-            
-            # Tabla otp_codes
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS otp_codes (
-                    id SERIAL PRIMARY KEY,
-                    email VARCHAR(100) NOT NULL,
-                    otp_code VARCHAR(6) NOT NULL,
-                    expires_at TIMESTAMP NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Crear índices para otp_codes
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_otp ON otp_codes(email, otp_code)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_expires ON otp_codes(expires_at)")
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM businesses) AS seeded")
+            if cursor.fetchone()['seeded']:
+                connection.commit()
+                return
             
-            # Tabla user_types
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_types (
-                    id SERIAL PRIMARY KEY,
-                    type_name VARCHAR(50) NOT NULL UNIQUE,
-                    type_hash VARCHAR(64) NOT NULL UNIQUE,
-                    description VARCHAR(200),
-                    active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Insertar tipos de usuario por defecto solo si no existen
-            cursor.execute("SELECT COUNT(*) FROM user_types")
-            result = cursor.fetchone()
-            user_types_count = result['count'] if result else 0
-            
-            if user_types_count == 0:
-                cursor.execute("""
-                    INSERT INTO user_types (type_name, type_hash, description) VALUES 
-                    ('cliente', 'a1b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456', 'Usuario cliente final'),
-                    ('negocio', 'b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456a1', 'Usuario propietario de negocio'),
-                    ('admin', 'c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456a1b2', 'Administrador del sistema')
-                """)
-                log_info("Tipos de usuario insertados")
-            
-            # Tabla municipalities
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS municipalities (
-                    id BIGSERIAL PRIMARY KEY,
-                    municipio VARCHAR(100) NOT NULL,
-                    state VARCHAR(50) NOT NULL,
-                    active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabla businesses
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS businesses (
-                    id BIGSERIAL PRIMARY KEY,
-                    name VARCHAR(200) NOT NULL UNIQUE,
-                    category VARCHAR(100) NOT NULL,
-                    address TEXT,
-                    municipality_id BIGINT REFERENCES municipalities(id),
-                    phone VARCHAR(20),
-                    email VARCHAR(100),
-                    logo VARCHAR(500),
-                    description TEXT,
-                    rating DECIMAL(2,1) DEFAULT 0.0,
-                    visits_for_prize INTEGER DEFAULT 6,
-                    facebook VARCHAR(500),
-                    instagram VARCHAR(500),
-                    tiktok VARCHAR(500),
-                    whatsapp VARCHAR(500),
-                    owner_user_id INTEGER REFERENCES users(id),
-                    active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Agregar columna owner_user_id si no existe
-            try:
-                cursor.execute("ALTER TABLE businesses ADD COLUMN owner_user_id INTEGER REFERENCES users(id)")
-            except:
-                pass  # Ya existe
-            
-            # Tabla business_menu
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS business_menu (
-                    id BIGSERIAL PRIMARY KEY,
-                    business_id BIGINT NOT NULL REFERENCES businesses(id),
-                    producto VARCHAR(200) NOT NULL,
-                    descripcion TEXT,
-                    precio DECIMAL(10,2) NOT NULL,
-                    categoria VARCHAR(100),
-                    disponible BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabla user_visits
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_visits (
-                    id BIGSERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    business_id BIGINT NOT NULL REFERENCES businesses(id),
-                    visit_date TIMESTAMP NOT NULL,
-                    visit_month VARCHAR(7) NOT NULL,
-                    status VARCHAR(20) DEFAULT 'completed' CHECK (status IN ('pending', 'completed', 'cancelled')),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Crear índice para user_visits
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_business_month ON user_visits(user_id, business_id, visit_month)")
-            
-            # Tabla user_rounds (Sistema de rondas)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_rounds (
-                    id BIGSERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    business_id BIGINT NOT NULL REFERENCES businesses(id),
-                    round_number INTEGER NOT NULL DEFAULT 1,
-                    progress_in_round INTEGER NOT NULL DEFAULT 0,
-                    round_start_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP NULL,
-                    is_completed BOOLEAN NOT NULL DEFAULT FALSE,
-                    is_reward_claimed BOOLEAN NOT NULL DEFAULT FALSE,
-                    last_visit_id BIGINT NULL
-                )
-            """)
-            
-            # Crear índices para user_rounds
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_rounds_user_business ON user_rounds(user_id, business_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_rounds_completed ON user_rounds(is_completed)")
-            # Agregar foreign keys a users
-            try:
-                cursor.execute("ALTER TABLE users ADD CONSTRAINT fk_user_type FOREIGN KEY (user_type_id) REFERENCES user_types(id)")
-            except:
-                pass  # Ya existe
-            
-            try:
-                cursor.execute("ALTER TABLE users ADD CONSTRAINT fk_municipality FOREIGN KEY (municipality_id) REFERENCES municipalities(id)")
-            except:
-                pass  # Ya existe
-            
-            # Insertar datos de prueba solo si no existen
-            cursor.execute("SELECT COUNT(*) FROM municipalities")
-            result = cursor.fetchone()
-            municipality_count = result['count'] if result else 0
-            
-            if municipality_count == 0:
-                cursor.execute("""
-                    INSERT INTO municipalities (municipio, state) VALUES
+                INSERT INTO municipalities (municipio, state)
+                SELECT * FROM (VALUES
                     ('Papantla', 'Veracruz'),
                     ('Coatzintla', 'Veracruz'),
                     ('Poza Rica', 'Veracruz'),
                     ('Tuxpan', 'Veracruz')
-                """)
-                log_info("Municipios de ejemplo insertados")
-            
-            cursor.execute("SELECT COUNT(*) FROM businesses")
-            result = cursor.fetchone()
-            business_count = result['count'] if result else 0
+                ) AS seed (municipio, state)
+                WHERE NOT EXISTS (SELECT 1 FROM municipalities)
+            """)
             
-            if business_count == 0:
-                # Primero crear un usuario admin por defecto
-                cursor.execute("""
-                    INSERT INTO users (nombre, email, password, user_type_id) VALUES
-                    ('Administrador', 'admin@flevoapp.com', '$2b$12$LQv3c1yqBWVHxkd0LQ4YCOdHrCkUAI6H0O/8VfzCr5FqSQqIBfxSm', 3)
-                    ON CONFLICT (email) DO NOTHING
-                """)
-                
-                cursor.execute("""
-                    INSERT INTO businesses (name, category, address, municipality_id, phone, email, description, rating, facebook, instagram, tiktok, whatsapp, owner_user_id) VALUES
-                    ('Restaurante El Totonaco', 'Restaurante', 'Calle Enríquez 123, Centro', 1, '7841234567', 'contacto@eltotonaco.com', 'Comida tradicional veracruzana', 4.5, 'https://facebook.com/eltotonaco', 'https://instagram.com/eltotonaco', 'https://tiktok.com/@eltotonaco', 'https://wa.me/527841234567', 1),
-                    ('Café Vanilla', 'Cafetería', 'Av. 20 de Noviembre 45', 2, '7822345678', 'info@cafevanilla.com', 'Café de especialidad y vainilla', 4.2, 'https://facebook.com/cafevanilla', 'https://instagram.com/cafevanilla', 'https://tiktok.com/@cafevanilla', 'https://wa.me/527822345678', 1),
-                    ('Boutique Jarocha', 'Ropa', 'Plaza Poza Rica 67', 3, '7823456789', 'ventas@boutiquejarocha.com', 'Ropa y accesorios regionales', 4.0, 'https://facebook.com/boutiquejarocha', 'https://instagram.com/boutiquejarocha', 'https://tiktok.com/@boutiquejarocha', 'https://wa.me/527823456789', 1),
-                    ('Farmacia del Puerto', 'Farmacia', 'Malecón Tuxpan 89', 4, '7834567890', 'contacto@farmaciapuerto.com', 'Medicamentos y productos de salud', 4.3, 'https://facebook.com/farmaciapuerto', 'https://instagram.com/farmaciapuerto', 'https://tiktok.com/@farmaciapuerto', 'https://wa.me/527834567890', 1),
-                    ('Gimnasio Coatza Fit', 'Deportes', 'Calle Hidalgo 12', 2, '7825678901', 'info@coatzafit.com', 'Gimnasio y entrenamiento personal', 4.4, 'https://facebook.com/coatzafit', 'https://instagram.com/coatzafit', 'https://tiktok.com/@coatzafit', 'https://wa.me/527825678901', 1)
-                """)
-                log_info("Businesses de ejemplo insertados")
+            # Usuario admin por defecto, propietario de los negocios de ejemplo
+            cursor.execute("""
+                INSERT INTO users (nombre, email, password, user_type_id) VALUES
+                ('Administrador', 'admin@flevoapp.com', '$2b$12$LQv3c1yqBWVHxkd0LQ4YCOdHrCkUAI6H0O/8VfzCr5FqSQqIBfxSm', 3)
+                ON CONFLICT (email) DO NOTHING
+            """)
+            cursor.execute("SELECT id FROM users WHERE email = 'admin@flevoapp.com'")
+            admin_id = cursor.fetchone()['id']
+            cursor.execute("SELECT id FROM municipalities ORDER BY id LIMIT 4")
+            municipality_ids = [row['id'] for row in cursor.fetchall()]
             
-            cursor.execute("SELECT COUNT(*) FROM business_menu")
-            result = cursor.fetchone()
-            menu_count = result['count'] if result else 0
+            businesses = [
+                ('Restaurante El Totonaco', 'Restaurante', 'Calle Enríquez 123, Centro', municipality_ids[0], '7841234567', 'contacto@eltotonaco.com', 'Comida tradicional veracruzana', 4.5, 'https://facebook.com/eltotonaco', 'https://instagram.com/eltotonaco', 'https://tiktok.com/@eltotonaco', 'https://wa.me/527841234567', admin_id),
+                ('Café Vanilla', 'Cafetería', 'Av. 20 de Noviembre 45', municipality_ids[1], '7822345678', 'info@cafevanilla.com', 'Café de especialidad y vainilla', 4.2, 'https://facebook.com/cafevanilla', 'https://instagram.com/cafevanilla', 'https://tiktok.com/@cafevanilla', 'https://wa.me/527822345678', admin_id),
+                ('Boutique Jarocha', 'Ropa', 'Plaza Poza Rica 67', municipality_ids[2], '7823456789', 'ventas@boutiquejarocha.com', 'Ropa y accesorios regionales', 4.0, 'https://facebook.com/boutiquejarocha', 'https://instagram.com/boutiquejarocha', 'https://tiktok.com/@boutiquejarocha', 'https://wa.me/527823456789', admin_id),
+                ('Farmacia del Puerto', 'Farmacia', 'Malecón Tuxpan 89', municipality_ids[3], '7834567890', 'contacto@farmaciapuerto.com', 'Medicamentos y productos de salud', 4.3, 'https://facebook.com/farmaciapuerto', 'https://instagram.com/farmaciapuerto', 'https://tiktok.com/@farmaciapuerto', 'https://wa.me/527834567890', admin_id),
+                ('Gimnasio Coatza Fit', 'Deportes', 'Calle Hidalgo 12', municipality_ids[1], '7825678901', 'info@coatzafit.com', 'Gimnasio y entrenamiento personal', 4.4, 'https://facebook.com/coatzafit', 'https://instagram.com/coatzafit', 'https://tiktok.com/@coatzafit', 'https://wa.me/527825678901', admin_id)
+            ]
+            psycopg2.extras.execute_values(cursor, """
+                INSERT INTO businesses (name, category, address, municipality_id, phone, email, description, rating, facebook, instagram, tiktok, whatsapp, owner_user_id)
+                VALUES %s RETURNING id
+            """, businesses)
+            business_ids = [row['id'] for row in cursor.fetchall()]
             
-            if menu_count == 0:
-                cursor.execute("""
-                    INSERT INTO business_menu (business_id, producto, descripcion, precio, categoria) VALUES
-                    (1, 'Mole de Olla', 'Mole tradicional veracruzano con pollo', 85.00, 'Platillos'),
-                    (1, 'Pescado a la Veracruzana', 'Pescado fresco con salsa veracruzana', 120.00, 'Platillos'),
-                    (1, 'Agua de Chía con Limón', 'Bebida refrescante natural', 30.00, 'Bebidas'),
-                    (2, 'Café de Olla', 'Café tradicional con canela y piloncillo', 45.00, 'Cafés'),
-                    (2, 'Flan de Vainilla', 'Postre con vainilla de Papantla', 55.00, 'Postres'),
-                    (2, 'Torta de Jamón', 'Torta veracruzana con ingredientes frescos', 65.00, 'Alimentos'),
-                    (3, 'Guayabera Bordada', 'Guayabera tradicional veracruzana', 450.00, 'Ropa'),
-                    (3, 'Huipil Totonaco', 'Huipil artesanal de la región', 650.00, 'Ropa'),
-                    (3, 'Huaraches de Cuero', 'Calzado artesanal mexicano', 380.00, 'Calzado'),
-                    (4, 'Paracetamol 500mg', 'Analgésico y antipirético', 25.00, 'Medicamentos'),
-                    (4, 'Vitamina C', 'Suplemento vitamínico 1000mg', 180.00, 'Suplementos'),
-                    (4, 'Termómetro Digital', 'Termómetro clínico digital', 120.00, 'Equipos'),
-                    (5, 'Membresía Mensual', 'Acceso completo al gimnasio por 1 mes', 350.00, 'Membresías'),
-                    (5, 'Clase de Zumba', 'Clase grupal de baile y ejercicio', 60.00, 'Clases'),
-                    (5, 'Entrenamiento Personal', 'Sesión individual con entrenador', 250.00, 'Servicios')
-                """)
-                log_info("Menús de ejemplo insertados")
+            menu = [
+                (0, 'Mole de Olla', 'Mole tradicional veracruzano con pollo', 85.00, 'Platillos'),
+                (0, 'Pescado a la Veracruzana', 'Pescado fresco con salsa veracruzana', 120.00, 'Platillos'),
+                (0, 'Agua de Chía con Limón', 'Bebida refrescante natural', 30.00, 'Bebidas'),
+                (1, 'Café de Olla', 'Café tradicional con canela y piloncillo', 45.00, 'Cafés'),
+                (1, 'Flan de Vainilla', 'Postre con vainilla de Papantla', 55.00, 'Postres'),
+                (1, 'Torta de Jamón', 'Torta veracruzana con ingredientes frescos', 65.00, 'Alimentos'),
+                (2, 'Guayabera Bordada', 'Guayabera tradicional veracruzana', 450.00, 'Ropa'),
+                (2, 'Huipil Totonaco', 'Huipil artesanal de la región', 650.00, 'Ropa'),
+                (2, 'Huaraches de Cuero', 'Calzado artesanal mexicano', 380.00, 'Calzado'),
+                (3, 'Paracetamol 500mg', 'Analgésico y antipirético', 25.00, 'Medicamentos'),
+                (3, 'Vitamina C', 'Suplemento vitamínico 1000mg', 180.00, 'Suplementos'),
+                (3, 'Termómetro Digital', 'Termómetro clínico digital', 120.00, 'Equipos'),
+                (4, 'Membresía Mensual', 'Acceso completo al gimnasio por 1 mes', 350.00, 'Membresías'),
+                (4, 'Clase de Zumba', 'Clase grupal de baile y ejercicio', 60.00, 'Clases'),
+                (4, 'Entrenamiento Personal', 'Sesión individual con entrenador', 250.00, 'Servicios')
+            ]
+            psycopg2.extras.execute_values(cursor, """
+                INSERT INTO business_menu (business_id, producto, descripcion, precio, categoria) VALUES %s
+            """, [(business_ids[index],) + tuple(item) for index, *item in menu])
             
             connection.commit()
-            log_info("Base de datos PostgreSQL inicializada correctamente")
+            log_info("Datos de prueba insertados")
     except Exception as e:
-        print(f"Error detallado: {str(e)}")
-        print(f"Tipo de error: {type(e)}")
-        log_error(f"Error inicializando base de datos: {str(e)}")
+        connection.rollback()
+        log_error("Error insertando datos de prueba", error=e)
         raise
     finally:
-        connection.close()
\ No newline at end of file
+        connection.close()
@@ -0,0 +1,54 @@
+import asyncio
+import asyncpg
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from app.config.settings import settings
+from app.utils.logger import log_info
+from app.utils.query_tracker import tracked_async_connection
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+async def get_async_pool() -> asyncpg.Pool:
+    """Obtiene (o crea) el pool asyncpg global"""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    settings.database_url,
+                    min_size=settings.db_pool_min_size,
+                    max_size=settings.db_pool_max_size,
+                    timeout=settings.db_pool_timeout,
+                    max_inactive_connection_lifetime=settings.db_pool_max_lifetime
+                )
+                log_info("Pool asyncpg creado", max_size=settings.db_pool_max_size)
+    return _pool
+
+async def close_async_pool():
+    """Cierra el pool asyncpg (al apagar la aplicación)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+def get_async_pool_stats() -> Dict:
+    """Estadísticas del pool asyncpg o vacío si aún no se ha creado"""
+    if _pool is None:
+        return {}
+    return {
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size()
+    }
+
+@asynccontextmanager
+async def get_async_connection():
+    """Obtiene una conexión asyncpg del pool (se devuelve al salir del bloque)"""
+    try:
+        pool = await get_async_pool()
+    except Exception as e:
+        raise Exception(f"Error conectando a la base de datos: {str(e)}")
+    async with pool.acquire(timeout=settings.db_pool_timeout) as connection:
+        yield tracked_async_connection(connection)
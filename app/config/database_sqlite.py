@@ -1,99 +1,132 @@
 import sqlite3
-import bcrypt
+import threading
+from app.config.settings import settings
 from app.utils.logger import log_info, log_error
+from app.utils.query_tracker import tracked_cursor
+
+_local = threading.local()
+_open_connections = set()
+_open_connections_lock = threading.Lock()
+
+def get_pragmas() -> list:
+    """PRAGMAs de rendimiento aplicados a cada conexión nueva"""
+    return [
+        'PRAGMA encoding = "UTF-8"',
+        f"PRAGMA journal_mode = {settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}",
+        f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}",
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout)}",
+        f"PRAGMA temp_store = {settings.sqlite_temp_store}"
+    ]
+
+def connect_sqlite() -> sqlite3.Connection:
+    """Abre una conexión SQLite nueva con los PRAGMAs configurados"""
+    connection = sqlite3.connect(
+        settings.sqlite_path,
+        check_same_thread=False,
+        timeout=settings.sqlite_busy_timeout / 1000
+    )
+    connection.row_factory = sqlite3.Row
+    for pragma in get_pragmas():
+        connection.execute(pragma)
+    return connection
+
+class PersistentConnection:
+    """Conexión SQLite reutilizada por hilo; close() solo descarta la transacción abierta"""
+    
+    def __init__(self, raw_connection: sqlite3.Connection, path: str):
+        self._raw = raw_connection
+        self.path = path
+    
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+    
+    def cursor(self, *args):
+        return tracked_cursor(self._raw.cursor(*args))
+    
+    def execute(self, statement, *args):
+        return self.cursor().execute(statement, *args)
+    
+    def executemany(self, statement, *args):
+        return self.cursor().executemany(statement, *args)
+    
+    def close(self):
+        if self._raw.in_transaction:
+            self._raw.rollback()
+    
+    def close_raw(self):
+        self._raw.close()
 
 def get_db_connection():
-    """Obtiene conexión a SQLite"""
+    """Obtiene conexión a SQLite (persistente por hilo si está habilitado)"""
     try:
-        connection = sqlite3.connect('auth_api.db', check_same_thread=False)
-        connection.row_factory = sqlite3.Row
-        connection.execute('PRAGMA encoding = "UTF-8"')
+        if not settings.sqlite_persistent_connections:
+            return connect_sqlite()
+        
+        connection = getattr(_local, "connection", None)
+        if connection is None or connection.path != settings.sqlite_path:
+            connection = PersistentConnection(connect_sqlite(), settings.sqlite_path)
+            _local.connection = connection
+            with _open_connections_lock:
+                _open_connections.add(connection)
         return connection
     except Exception as e:
         raise Exception(f"Error conectando a SQLite: {str(e)}")
 
+def close_all_connections():
+    """Cierra las conexiones persistentes de todos los hilos (al apagar la aplicación)"""
+    with _open_connections_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+    for connection in connections:
+        try:
+            connection.close_raw()
+        except Exception:
+            pass
+
+# Hash bcrypt precalculado de "123456": evita hashear contraseñas al arrancar
+SEED_PASSWORD_HASH = "$2b$12$yx7Tl.Iy5zSFeRQbXX1e5.UGAovwEJcELTIMYFiIbs3d02YCq1IEq"
+
 def init_database():
-    """Inicializa SQLite con datos de prueba"""
+    """Aplica las migraciones pendientes y, fuera de producción, los datos de prueba"""
+    from app.config.migrations import run_migrations
+    
+    try:
+        run_migrations("sqlite")
+        if settings.environment != "production":
+            seed_database()
+        log_info("SQLite inicializado")
+        return True
+    except Exception as e:
+        log_error(f"Error inicializando SQLite: {str(e)}")
+        return False
+
+def seed_database():
+    """Crea usuarios y negocios de prueba si la base está vacía (nunca en producción)"""
+    conn = connect_sqlite()
     try:
-        conn = sqlite3.connect('auth_api.db', check_same_thread=False)
-        conn.execute('PRAGMA encoding = "UTF-8"')
         cursor = conn.cursor()
         
-        # Crear tablas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_types (
-                id INTEGER PRIMARY KEY,
-                type_name TEXT UNIQUE,
-                type_hash TEXT UNIQUE,
-                description TEXT,
-                active BOOLEAN DEFAULT TRUE
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                nombre TEXT NOT NULL,
-                email TEXT UNIQUE,
-                telefono TEXT UNIQUE,
-                password TEXT NOT NULL,
-                user_type_id INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS businesses (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE,
-                category TEXT NOT NULL,
-                address TEXT,
-                phone TEXT,
-                email TEXT,
-                description TEXT,
-                rating REAL DEFAULT 0.0,
-                visits_for_prize INTEGER DEFAULT 6,
-                active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Insertar tipos de usuario
-        cursor.execute("SELECT COUNT(*) FROM user_types")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                INSERT INTO user_types (type_name, type_hash, description) VALUES 
-                ('cliente', 'a1b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456', 'Usuario cliente final'),
-                ('negocio', 'b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456a1', 'Usuario propietario de negocio')
-            ''')
-        
-        # Crear usuarios de prueba
-        cursor.execute("SELECT COUNT(*) FROM users")
-        if cursor.fetchone()[0] == 0:
-            password = "123456"
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=12))
-            
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM users)")
+        if not cursor.fetchone()[0]:
             cursor.execute('''
                 INSERT INTO users (nombre, email, password, user_type_id) VALUES
                 ('Admin Test', 'admin@test.com', ?, 1),
                 ('Negocio Test', 'negocio@test.com', ?, 2),
                 ('Cliente Test', 'cliente@test.com', ?, 1)
-            ''', (hashed_password.decode('utf-8'), hashed_password.decode('utf-8'), hashed_password.decode('utf-8')))
+            ''', (SEED_PASSWORD_HASH, SEED_PASSWORD_HASH, SEED_PASSWORD_HASH))
         
-        # Crear negocios de prueba
-        cursor.execute("SELECT COUNT(*) FROM businesses")
-        if cursor.fetchone()[0] == 0:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM businesses)")
+        if not cursor.fetchone()[0]:
             cursor.execute('''
                 INSERT INTO businesses (name, category, address, phone, email, description, rating) VALUES
                 ('Restaurante El Totonaco', 'Restaurante', 'Calle Enriquez 123, Centro', '7841234567', 'contacto@eltotonaco.com', 'Comida tradicional veracruzana', 4.5),
                 ('Cafe Vanilla', 'Cafeteria', 'Av. 20 de Noviembre 45', '7822345678', 'info@cafevanilla.com', 'Cafe de especialidad y vainilla', 4.2),
                 ('Pizzeria Don Juan', 'Pizzeria', 'Plaza Principal 12', '7843333333', 'juan@pizzeria.com', 'Las mejores pizzas artesanales', 4.7)
             ''')
+            log_info("SQLite inicializado con usuarios y negocios de prueba")
         
         conn.commit()
+    finally:
         conn.close()
-        log_info("SQLite inicializado con usuarios y negocios de prueba")
-        return True
-    except Exception as e:
-        log_error(f"Error inicializando SQLite: {str(e)}")
-        return False
\ No newline at end of file
@@ -0,0 +1,20 @@
+import aiosqlite
+from contextlib import asynccontextmanager
+from app.config.database_sqlite import get_pragmas
+from app.config.settings import settings
+from app.utils.query_tracker import tracked_async_connection
+
+@asynccontextmanager
+async def get_async_db_connection():
+    """Obtiene conexión asíncrona a SQLite (aiosqlite ejecuta las consultas fuera del event loop)"""
+    try:
+        connection = await aiosqlite.connect(settings.sqlite_path, timeout=settings.sqlite_busy_timeout / 1000)
+    except Exception as e:
+        raise Exception(f"Error conectando a SQLite: {str(e)}")
+    try:
+        connection.row_factory = aiosqlite.Row
+        for pragma in get_pragmas():
+            await connection.execute(pragma)
+        yield tracked_async_connection(connection)
+    finally:
+        await connection.close()
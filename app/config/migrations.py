@@ -0,0 +1,202 @@
+import re
+import sqlite3
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Set
+from app.utils.logger import log_info, log_error
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Llave del advisory lock de PostgreSQL: solo un worker migra a la vez
+MIGRATION_LOCK_KEY = 7283100
+
+# Las migraciones con esta marca en su primera línea se ejecutan fuera de transacción
+# (p. ej. CREATE INDEX CONCURRENTLY); sus sentencias se separan por ';' al final de línea.
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+
+# Nombre del índice de un CREATE [UNIQUE] INDEX CONCURRENTLY IF NOT EXISTS
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+    transactional: bool
+
+def load_migrations(backend: str) -> List[Migration]:
+    """Lee app/migrations/<backend>/NNNN_nombre.sql ordenadas por versión"""
+    migrations = []
+    for path in sorted((MIGRATIONS_DIR / backend).glob("*.sql")):
+        version, _, name = path.stem.partition("_")
+        sql = path.read_text(encoding="utf-8")
+        migrations.append(Migration(
+            version=int(version),
+            name=name,
+            sql=sql,
+            transactional=not sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+        ))
+    return migrations
+
+def split_statements(sql: str) -> List[str]:
+    """Separa un script en sentencias completas (respeta literales y triggers)"""
+    statements, current = [], ""
+    for line in sql.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statement = current.strip()
+            if statement.rstrip(";").strip():
+                statements.append(statement)
+            current = ""
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+def concurrent_index_name(statement: str) -> Optional[str]:
+    """Índice que crea una sentencia CREATE INDEX CONCURRENTLY IF NOT EXISTS (o None)"""
+    match = CONCURRENT_INDEX_PATTERN.search(statement)
+    return match.group(1) if match else None
+
+def drop_invalid_index(cursor, index_name: str):
+    """Elimina el índice si quedó INVALID por un CREATE INDEX CONCURRENTLY fallido
+
+    Sin esto, el reintento con IF NOT EXISTS lo saltaría y la migración quedaría
+    registrada con el índice inutilizable.
+    """
+    cursor.execute(
+        "SELECT NOT indisvalid AS invalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+        (index_name,)
+    )
+    row = cursor.fetchone()
+    if row and row["invalid"]:
+        log_info("Eliminando índice inválido antes de recrearlo", index=index_name)
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"')
+
+def get_pending(migrations: List[Migration], applied: Set[int]) -> List[Migration]:
+    return [migration for migration in migrations if migration.version not in applied]
+
+def run_postgres_migrations() -> int:
+    """Aplica las migraciones pendientes de PostgreSQL bajo un advisory lock; devuelve cuántas aplicó"""
+    from app.config.database import get_db_connection
+
+    migrations = load_migrations("postgresql")
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            # Camino rápido: si todo está aplicado no se toma ningún lock
+            cursor.execute("SELECT to_regclass('schema_version') AS table_name")
+            if cursor.fetchone()["table_name"]:
+                cursor.execute("SELECT version FROM schema_version")
+                if not get_pending(migrations, {row["version"] for row in cursor.fetchall()}):
+                    connection.commit()
+                    return 0
+            connection.commit()
+
+            cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            connection.commit()
+            try:
+                cursor.execute(SCHEMA_VERSION_DDL)
+                cursor.execute("SELECT version FROM schema_version")
+                pending = get_pending(migrations, {row["version"] for row in cursor.fetchall()})
+                connection.commit()
+
+                for migration in pending:
+                    log_info("Aplicando migración", version=migration.version, name=migration.name)
+                    if migration.transactional:
+                        cursor.execute(migration.sql)
+                    else:
+                        connection.set_session(autocommit=True)
+                        try:
+                            for statement in split_statements(migration.sql):
+                                index_name = concurrent_index_name(statement)
+                                if index_name:
+                                    drop_invalid_index(cursor, index_name)
+                                cursor.execute(statement)
+                        finally:
+                            connection.set_session(autocommit=False)
+                    cursor.execute(
+                        "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                        (migration.version, migration.name)
+                    )
+                    connection.commit()
+                    # Los RAISE NOTICE de la migración (p. ej. espacio recuperado) quedan en el log
+                    for notice in connection.notices:
+                        log_info("Aviso de migración", version=migration.version, notice=notice.strip())
+                    del connection.notices[:]
+                return len(pending)
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+                connection.commit()
+    except Exception as e:
+        log_error("Error aplicando migraciones PostgreSQL", error=e)
+        raise
+    finally:
+        connection.close()
+
+def run_sqlite_migrations() -> int:
+    """Aplica las migraciones pendientes de SQLite; BEGIN IMMEDIATE hace de lock entre procesos"""
+    from app.config.database_sqlite import connect_sqlite
+
+    migrations = load_migrations("sqlite")
+    connection = connect_sqlite()
+    connection.isolation_level = None
+    try:
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        ).fetchone()
+        if exists:
+            applied = {row[0] for row in connection.execute("SELECT version FROM schema_version")}
+            if not get_pending(migrations, applied):
+                return 0
+
+        connection.execute(SCHEMA_VERSION_DDL)
+        count = 0
+        for migration in migrations:
+            if migration.transactional:
+                connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Se vuelve a comprobar dentro del lock: otro proceso pudo aplicarla
+                if connection.execute(
+                    "SELECT 1 FROM schema_version WHERE version = ?", (migration.version,)
+                ).fetchone():
+                    if connection.in_transaction:
+                        connection.execute("COMMIT")
+                    continue
+                log_info("Aplicando migración", version=migration.version, name=migration.name)
+                for statement in split_statements(migration.sql):
+                    connection.execute(statement)
+                connection.execute(
+                    "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                    (migration.version, migration.name)
+                )
+                if connection.in_transaction:
+                    connection.execute("COMMIT")
+                count += 1
+            except Exception:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+        return count
+    except Exception as e:
+        log_error("Error aplicando migraciones SQLite", error=e)
+        raise
+    finally:
+        connection.close()
+
+def run_migrations(backend: str) -> int:
+    """Punto de entrada: backend 'postgresql' o 'sqlite'"""
+    applied = run_postgres_migrations() if backend == "postgresql" else run_sqlite_migrations()
+    if applied:
+        log_info("Migraciones aplicadas", backend=backend, count=applied)
+    return applied
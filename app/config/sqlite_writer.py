@@ -0,0 +1,163 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+from app.config.database_sqlite import connect_sqlite, get_db_connection
+from app.config.settings import settings
+from app.utils.logger import log_info, log_error
+
+class SQLiteWriter:
+    """Hilo escritor único: dueño de la única conexión de escritura a SQLite.
+
+    Los trabajos son funciones `job(connection, *args)` que ejecutan sus
+    escrituras sin hacer commit. El escritor los agrupa en lotes pequeños,
+    aísla cada trabajo en un SAVEPOINT y hace un solo COMMIT por lote; el
+    resultado (o la excepción) se entrega al llamador por un Future.
+    """
+
+    def __init__(self, batch_size: int = 64, batch_wait_ms: float = 2.0):
+        self.batch_size = max(batch_size, 1)
+        self.batch_wait = batch_wait_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"jobs": 0, "batches": 0, "failed_jobs": 0, "failed_batches": 0, "cancelled_jobs": 0}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+            log_info("Escritor SQLite iniciado", batch_size=self.batch_size)
+
+    def stop(self):
+        """Procesa los trabajos pendientes y detiene el hilo"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, job: Callable, *args) -> Future:
+        future = Future()
+        self._queue.put((job, args, future))
+        return future
+
+    def execute(self, job: Callable, *args) -> Any:
+        """Encola un trabajo y espera su resultado
+
+        Si vence el tiempo de espera y el trabajo sigue en cola, se cancela: el escritor
+        lo descarta y nunca se confirma. Si ya está en un lote en curso, se espera a que
+        termine para que el llamador reciba lo que realmente quedó confirmado.
+        """
+        future = self.submit(job, *args)
+        try:
+            return future.result(timeout=settings.sqlite_writer_timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise
+            return future.result()
+
+    def stats(self) -> Dict:
+        return {**self._stats, "queued": self._queue.qsize()}
+
+    def _collect_batch(self, first) -> list:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=self.batch_wait)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        connection = connect_sqlite()
+        connection.isolation_level = None
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    break
+                self._process(connection, self._collect_batch(first))
+        finally:
+            connection.close()
+
+    def _process(self, connection: sqlite3.Connection, batch: list):
+        # Los trabajos cancelados por timeout del llamador se descartan sin ejecutarse
+        pending = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        self._stats["cancelled_jobs"] += len(batch) - len(pending)
+        batch = pending
+        if not batch:
+            return
+        results = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for job, args, future in batch:
+                connection.execute("SAVEPOINT job")
+                try:
+                    results.append((future, job(connection, *args), None))
+                    connection.execute("RELEASE SAVEPOINT job")
+                except Exception as e:
+                    connection.execute("ROLLBACK TO SAVEPOINT job")
+                    connection.execute("RELEASE SAVEPOINT job")
+                    results.append((future, None, e))
+            connection.execute("COMMIT")
+        except Exception as e:
+            log_error("Error en lote del escritor SQLite", error=e)
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            self._stats["failed_batches"] += 1
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._stats["batches"] += 1
+        for future, result, error in results:
+            self._stats["jobs"] += 1
+            if error is not None:
+                self._stats["failed_jobs"] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+_writer: Optional[SQLiteWriter] = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> SQLiteWriter:
+    """Obtiene (e inicia) el escritor global"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SQLiteWriter(settings.sqlite_writer_batch_size, settings.sqlite_writer_batch_wait_ms)
+        _writer.start()
+        return _writer
+
+def stop_writer():
+    """Detiene el escritor global (al apagar la aplicación)"""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+
+def get_writer_stats() -> Dict:
+    return _writer.stats() if _writer is not None else {}
+
+def run_write(job: Callable, *args) -> Any:
+    """Ejecuta una escritura: en el hilo escritor si está habilitado, o en la conexión del hilo actual"""
+    if settings.sqlite_single_writer:
+        return get_writer().execute(job, *args)
+
+    connection = get_db_connection()
+    try:
+        result = job(connection, *args)
+        connection.commit()
+        return result
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
@@ -1,6 +1,7 @@
 from fastapi import HTTPException
 from app.services.admin_service import AdminService
 from app.schemas.admin import BusinessCreate, BusinessUpdate, UserCreate, UserUpdate, AdminDashboardFilters
+from app.utils.pagination import InvalidCursorError
 from typing import Dict, List, Optional
 
 class AdminController:
@@ -15,11 +16,19 @@ class AdminController:
             raise HTTPException(status_code=500, detail=f"Error obteniendo dashboard: {str(e)}")
     
     @staticmethod
-    def get_all_businesses(page: int = 1, limit: int = 20, search: Optional[str] = None):
+    def get_all_businesses(
+        page: int = 1,
+        limit: int = 20,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ):
         """Obtiene todos los negocios con paginación"""
         try:
-            businesses = AdminService.get_all_businesses(page, limit, search)
+            businesses = AdminService.get_all_businesses(page, limit, search, cursor, include_total)
             return {"success": True, "data": businesses}
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error obteniendo negocios: {str(e)}")
     
@@ -61,11 +70,20 @@ class AdminController:
             raise HTTPException(status_code=500, detail=f"Error eliminando negocio: {str(e)}")
     
     @staticmethod
-    def get_all_users(page: int = 1, limit: int = 20, search: Optional[str] = None, user_type: Optional[int] = None):
+    def get_all_users(
+        page: int = 1,
+        limit: int = 20,
+        search: Optional[str] = None,
+        user_type: Optional[int] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ):
         """Obtiene todos los usuarios con paginación"""
         try:
-            users = AdminService.get_all_users(page, limit, search, user_type)
+            users = AdminService.get_all_users(page, limit, search, user_type, cursor, include_total)
             return {"success": True, "data": users}
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error obteniendo usuarios: {str(e)}")
     
@@ -100,4 +118,13 @@ class AdminController:
             stats = AdminService.get_system_stats()
             return {"success": True, "data": stats}
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error obteniendo estadísticas: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Error obteniendo estadísticas: {str(e)}")
+    
+    @staticmethod
+    def get_runtime_metrics():
+        """Obtiene métricas de ejecución"""
+        try:
+            metrics = AdminService.get_runtime_metrics()
+            return {"success": True, "data": metrics}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error obteniendo métricas: {str(e)}")
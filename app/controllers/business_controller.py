@@ -1,6 +1,8 @@
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.services.business_service_sqlite import BusinessService
 from app.schemas.business import BusinessProfileUpdate
+from typing import Optional
 
 class BusinessController:
     @staticmethod
@@ -12,6 +14,18 @@ class BusinessController:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
     
+    @staticmethod
+    async def get_businesses_async(current_user: dict = None, search: Optional[str] = None):
+        try:
+            user_id = current_user["id"] if current_user else None
+            if search and search.strip():
+                businesses = await run_in_threadpool(BusinessService.search_businesses, search)
+            else:
+                businesses = await BusinessService.get_all_businesses_async(user_id)
+            return {"data": businesses}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+    
     @staticmethod
     def get_business(business_id: int, current_user: dict = None):
         try:
@@ -1,7 +1,12 @@
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 from app.services.reward_service import RewardService
 from app.schemas.reward import RewardCreate, RewardUpdate, CouponGenerate, CouponClaim, CouponRedeem, CouponQRValidation
+from app.config.settings import settings
+from app.utils.qr_renderer import QRImageCache, QRRenderBusyError, QRRenderTimeoutError, qr_render_pool
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
+from typing import Optional
+import base64
 
 class RewardController:
     @staticmethod
@@ -115,6 +120,33 @@ class RewardController:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
     
+    @staticmethod
+    async def get_coupon_qr_image(coupon_id: int, user_id: int, image_format: str, if_none_match: Optional[str]):
+        """Imagen del QR del cupón renderizada al pedirla, con ETag y Cache-Control"""
+        try:
+            qr_token = await run_in_threadpool(RewardService.get_coupon_qr_token, coupon_id, user_id)
+            if not qr_token:
+                raise HTTPException(status_code=404, detail="Cupón no encontrado")
+            
+            # La imagen depende solo del token y del formato: el ETag se calcula sin renderizar
+            etag = f'"{QRImageCache.key(qr_token, {}, image_format)[:32]}"'
+            headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.qr_image_max_age}"}
+            if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+                return Response(status_code=304, headers=headers)
+            
+            image = await qr_render_pool.render(qr_token, image_format)
+            if image_format == "svg":
+                return Response(content=image, media_type="image/svg+xml", headers=headers)
+            return Response(content=base64.b64decode(image.split(",", 1)[1]), media_type="image/png", headers=headers)
+        except HTTPException:
+            raise
+        except QRRenderBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except QRRenderTimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+    
     @staticmethod
     def claim_coupon(coupon_data: CouponClaim, user_id: int):
         """Reclama un cupón y completa la ronda"""
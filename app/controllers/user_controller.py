@@ -3,6 +3,8 @@ from app.services.user_service import UserService
 from app.schemas.user import UserProfileUpdate, VisitCreate
 from app.services.push_notification_service import PushNotificationService
 from app.services.websocket_service import websocket_service
+from app.utils.qr_renderer import QRRenderBusyError, QRRenderTimeoutError
+from app.utils.qr_image import QR_FORMATS
 import asyncio
 
 class UserController:
@@ -46,12 +48,15 @@ class UserController:
             raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
     
     @staticmethod
-    def generate_qr(visit_data: VisitCreate):
+    async def generate_qr(visit_data: VisitCreate, image_format: str = "png"):
         try:
-            success, qr_code = UserService.generate_qr_code(
+            if image_format not in QR_FORMATS:
+                raise HTTPException(status_code=400, detail=f"Formato de QR no soportado: {image_format}")
+            success, qr_code = await UserService.generate_qr_code(
                 visit_data.user_id, 
                 visit_data.business_id, 
-                visit_data.visit_date
+                visit_data.visit_date,
+                image_format
             )
             if not success:
                 raise HTTPException(status_code=400, detail="No se pudo generar el código QR")
@@ -59,10 +64,15 @@ class UserController:
             return {
                 "success": True,
                 "message": "Código QR generado exitosamente",
+                "format": image_format,
                 "qr_code": qr_code
             }
         except HTTPException:
             raise
+        except QRRenderBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except QRRenderTimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
     
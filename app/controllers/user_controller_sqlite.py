@@ -1,9 +1,13 @@
 from fastapi import HTTPException
 from app.models.user_visit_sqlite import UserVisit
 from app.models.user_sqlite import User
+from app.utils.qr_renderer import qr_render_pool, QRRenderBusyError, QRRenderTimeoutError
+from app.utils.qr_image import QR_FORMATS, ERROR_CORRECTION_NAMES
+from app.utils.qr_token import VISIT_TOKEN, QRTokenError, decode_qr_token, encode_visit_token, is_compact_token
+from app.config.settings import settings
+import calendar
+import time
 import qrcode
-import io
-import base64
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 import os
@@ -32,73 +36,81 @@ class UserController:
     def get_visits(user_id: int):
         try:
             visits = UserVisit.get_user_visits_with_rounds(user_id)
-            total_visits = sum(visit.get('visit_count', 0) for visit in visits)
-            return {
-                "success": True,
-                "data": {
-                    "data": visits,
-                    "total_visits": total_visits
-                }
-            }
+            return {"success": True, "data": visits}
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
     
     @staticmethod
-    def generate_qr(visit_data):
+    async def generate_qr(visit_data, image_format: str = "png"):
         try:
-            # Crear payload para el JWT
-            payload = {
-                "user_id": visit_data.user_id,
-                "business_id": visit_data.business_id,
-                "visit_date": visit_data.visit_date.isoformat(),
-                "exp": datetime.utcnow() + timedelta(hours=24)  # Expira en 24 horas
-            }
+            if image_format not in QR_FORMATS:
+                raise HTTPException(status_code=400, detail=f"Formato de QR no soportado: {image_format}")
+            expires_at = datetime.utcnow() + timedelta(hours=24)  # Expira en 24 horas
             
-            # Generar token JWT
             secret_key = os.getenv("JWT_SECRET_KEY", "default-secret-key")
-            qr_token = jwt.encode(payload, secret_key, algorithm="HS256")
-            
-            # Generar código QR
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_token)
-            qr.make(fit=True)
-            
-            # Crear imagen QR
-            img = qr.make_image(fill_color="black", back_color="white")
+            if settings.qr_token_format == "compact":
+                # Token compacto: ids, fecha y expiración en epoch con HMAC truncado (base45)
+                qr_token = encode_visit_token(
+                    visit_data.user_id,
+                    visit_data.business_id,
+                    int(visit_data.visit_date.timestamp()),
+                    calendar.timegm(expires_at.utctimetuple()),
+                    secret_key
+                )
+            else:
+                # Crear payload para el JWT
+                payload = {
+                    "user_id": visit_data.user_id,
+                    "business_id": visit_data.business_id,
+                    "visit_date": visit_data.visit_date.isoformat(),
+                    "exp": expires_at
+                }
+                qr_token = jwt.encode(payload, secret_key, algorithm="HS256")
             
-            # Convertir a base64
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            qr_base64 = base64.b64encode(buffer.getvalue()).decode()
-            qr_data_url = f"data:image/png;base64,{qr_base64}"
+            # Parámetros con los que el cliente dibuja el mismo QR a partir de qr_token
+            data = {
+                "format": image_format,
+                "qr_token": qr_token,
+                "expires_at": expires_at.isoformat(),
+                "error_correction": ERROR_CORRECTION_NAMES[qrcode.constants.ERROR_CORRECT_L],
+                "border": 4
+            }
+            if image_format != "token":
+                # Matriz QR y PNG o SVG en el pool de procesos (fuera del event loop)
+                data["qr_code"] = await qr_render_pool.render(
+                    qr_token, image_format, border=4, error_correction=qrcode.constants.ERROR_CORRECT_L
+                )
             
             return {
                 "success": True,
                 "message": "Código QR generado exitosamente",
-                "data": {
-                    "qr_code": qr_data_url,
-                    "qr_token": qr_token,
-                    "expires_at": (datetime.utcnow() + timedelta(hours=24)).isoformat()
-                }
+                "data": data
             }
+        except HTTPException:
+            raise
+        except QRRenderBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except QRRenderTimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error generando código QR: {str(e)}")
     
     @staticmethod
     def validate_qr_visit(qr_token: str, business_id: int, current_user: dict):
         try:
-            # Decodificar y validar JWT
+            # Decodificar y validar el token (compacto o JWT de QR emitidos antes)
             secret_key = os.getenv("JWT_SECRET_KEY", "default-secret-key")
             
             try:
-                payload = jwt.decode(qr_token, secret_key, algorithms=["HS256"])
-            except JWTError:
+                if is_compact_token(qr_token):
+                    payload = decode_qr_token(qr_token, secret_key, VISIT_TOKEN)
+                    if payload["exp"] < time.time():
+                        raise QRTokenError("Código QR expirado")
+                    visit_date = datetime.fromtimestamp(payload["visit_timestamp"])
+                else:
+                    payload = jwt.decode(qr_token, secret_key, algorithms=["HS256"])
+                    visit_date = datetime.fromisoformat(payload.get("visit_date"))
+            except (JWTError, QRTokenError):
                 raise HTTPException(status_code=400, detail="Código QR inválido o expirado")
             
             # Validar que el business_id coincida
@@ -113,8 +125,10 @@ class UserController:
             visit_id = UserVisit.register_visit(
                 user_id=current_user["id"],
                 business_id=business_id,
-                visit_date=datetime.fromisoformat(payload.get("visit_date"))
+                visit_date=visit_date
             )
+            if visit_id is None:
+                raise HTTPException(status_code=400, detail="Esta visita ya fue registrada anteriormente")
             
             return {
                 "success": True,
@@ -123,7 +137,7 @@ class UserController:
                     "visit_id": visit_id,
                     "business_id": business_id,
                     "user_id": current_user["id"],
-                    "visit_date": payload.get("visit_date"),
+                    "visit_date": visit_date.isoformat(),
                     "points_earned": 1
                 }
             }
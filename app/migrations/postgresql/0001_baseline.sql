@@ -0,0 +1,199 @@
+-- Esquema base: equivale a lo que creaban init_database, create_missing_tables.py,
+-- add_owner_column.py, create_push_table.py y fix_postgresql.py.
+-- Todo es idempotente para poder adoptarlo sobre bases de datos existentes.
+
+CREATE TABLE IF NOT EXISTS user_types (
+    id SERIAL PRIMARY KEY,
+    type_name VARCHAR(50) NOT NULL UNIQUE,
+    type_hash VARCHAR(64) NOT NULL UNIQUE,
+    description VARCHAR(200),
+    active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tipos de usuario (datos de referencia, necesarios también en producción)
+INSERT INTO user_types (id, type_name, type_hash, description) VALUES
+    (1, 'cliente', 'a1b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456', 'Usuario cliente final'),
+    (2, 'negocio', 'b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456a1', 'Usuario propietario de negocio'),
+    (3, 'admin', 'c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456a1b2', 'Administrador del sistema')
+ON CONFLICT DO NOTHING;
+SELECT setval(pg_get_serial_sequence('user_types', 'id'), GREATEST((SELECT MAX(id) FROM user_types), 1));
+
+CREATE TABLE IF NOT EXISTS municipalities (
+    id BIGSERIAL PRIMARY KEY,
+    municipio VARCHAR(100) NOT NULL,
+    state VARCHAR(50) NOT NULL,
+    active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    email VARCHAR(100) UNIQUE,
+    telefono VARCHAR(20) UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    user_type_id INTEGER NOT NULL DEFAULT 1,
+    municipality_id BIGINT,
+    avatar VARCHAR(500),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT chk_contact CHECK (email IS NOT NULL OR telefono IS NOT NULL)
+);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_user_type') THEN
+        ALTER TABLE users ADD CONSTRAINT fk_user_type FOREIGN KEY (user_type_id) REFERENCES user_types(id);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_municipality') THEN
+        ALTER TABLE users ADD CONSTRAINT fk_municipality FOREIGN KEY (municipality_id) REFERENCES municipalities(id);
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS otp_codes (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(100) NOT NULL,
+    otp_code VARCHAR(6) NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_otp ON otp_codes(email, otp_code);
+CREATE INDEX IF NOT EXISTS idx_expires ON otp_codes(expires_at);
+
+CREATE TABLE IF NOT EXISTS businesses (
+    id BIGSERIAL PRIMARY KEY,
+    name VARCHAR(200) NOT NULL UNIQUE,
+    category VARCHAR(100) NOT NULL,
+    address TEXT,
+    municipality_id BIGINT REFERENCES municipalities(id),
+    phone VARCHAR(20),
+    email VARCHAR(100),
+    logo VARCHAR(500),
+    description TEXT,
+    rating DECIMAL(2,1) DEFAULT 0.0,
+    visits_for_prize INTEGER DEFAULT 6,
+    facebook VARCHAR(500),
+    instagram VARCHAR(500),
+    tiktok VARCHAR(500),
+    whatsapp VARCHAR(500),
+    owner_user_id INTEGER REFERENCES users(id),
+    active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Columnas agregadas con el tiempo (add_owner_column.py y scripts *.sql de la raíz)
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS owner_user_id INTEGER REFERENCES users(id);
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS image_url TEXT;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS logo_url TEXT;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS website VARCHAR(200);
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS opening_hours TEXT;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS working_days TEXT;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS delivery_available BOOLEAN DEFAULT FALSE;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS payment_methods TEXT;
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS delivery_options TEXT;
+
+CREATE TABLE IF NOT EXISTS business_menu (
+    id BIGSERIAL PRIMARY KEY,
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    producto VARCHAR(200) NOT NULL,
+    descripcion TEXT,
+    precio DECIMAL(10,2) NOT NULL,
+    categoria VARCHAR(100),
+    disponible BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_visits (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    visit_date TIMESTAMP NOT NULL,
+    visit_month VARCHAR(7) NOT NULL,
+    status VARCHAR(20) DEFAULT 'completed' CHECK (status IN ('pending', 'completed', 'cancelled')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_business_month ON user_visits(user_id, business_id, visit_month);
+
+CREATE TABLE IF NOT EXISTS user_rounds (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    round_number INTEGER NOT NULL DEFAULT 1,
+    progress_in_round INTEGER NOT NULL DEFAULT 0,
+    round_start_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL,
+    is_completed BOOLEAN NOT NULL DEFAULT FALSE,
+    is_reward_claimed BOOLEAN NOT NULL DEFAULT FALSE,
+    last_visit_id BIGINT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_rounds_user_business ON user_rounds(user_id, business_id);
+CREATE INDEX IF NOT EXISTS idx_user_rounds_completed ON user_rounds(is_completed);
+
+CREATE TABLE IF NOT EXISTS rewards (
+    id SERIAL PRIMARY KEY,
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    title VARCHAR(200) NOT NULL,
+    description TEXT,
+    terms_conditions TEXT,
+    validity_days INTEGER DEFAULT 30,
+    reward_type VARCHAR(50) DEFAULT 'discount',
+    value DECIMAL(10,2),
+    active BOOLEAN DEFAULT TRUE,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_rewards (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    reward_id INTEGER,
+    coupon_code VARCHAR(50) UNIQUE,
+    qr_code TEXT,
+    status VARCHAR(20) DEFAULT 'vigente' CHECK (status IN ('vigente', 'reclamado', 'usado', 'expirado')),
+    expires_at TIMESTAMP,
+    claimed_at TIMESTAMP,
+    redeemed_at TIMESTAMP,
+    reclamado BOOLEAN DEFAULT FALSE,
+    redimido BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER,
+    business_id BIGINT,
+    action_type VARCHAR(50) NOT NULL,
+    action_description TEXT,
+    old_values TEXT,
+    new_values TEXT,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS push_subscriptions (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    business_id BIGINT NULL,
+    endpoint TEXT NOT NULL,
+    p256dh_key TEXT NOT NULL,
+    auth_key TEXT NOT NULL,
+    user_agent TEXT NULL,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_user_endpoint UNIQUE (user_id, endpoint)
+);
+
+CREATE INDEX IF NOT EXISTS idx_push_user_id ON push_subscriptions(user_id);
+CREATE INDEX IF NOT EXISTS idx_push_business_id ON push_subscriptions(business_id);
+CREATE INDEX IF NOT EXISTS idx_push_active ON push_subscriptions(is_active);
@@ -0,0 +1,41 @@
+-- migrate:no-transaction
+-- Índices para las consultas calientes de UserReward, RewardService, DashboardService,
+-- AuditLog y PushSubscription. CONCURRENTLY evita bloquear escrituras en tablas grandes.
+-- user_rewards(coupon_code) ya está cubierto por su restricción UNIQUE.
+
+-- Premios abiertos por usuario/negocio (status = 'vigente' y expiración de vigentes/reclamados)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_rewards_open
+    ON user_rewards (user_id, business_id, expires_at)
+    WHERE status IN ('vigente', 'reclamado');
+
+-- Historial de premios del usuario ordenado por fecha
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_rewards_user_created
+    ON user_rewards (user_id, created_at DESC);
+
+-- Premios redimidos por negocio (dashboard)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_rewards_business_redeemed
+    ON user_rewards (business_id, redeemed_at)
+    WHERE redeemed_at IS NOT NULL;
+
+-- Visitas por negocio y fecha (dashboard)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_visits_business_date
+    ON user_visits (business_id, visit_date);
+
+-- Rondas abiertas por negocio ordenadas por progreso; reemplaza al índice sobre el booleano
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_rounds_open
+    ON user_rounds (business_id, progress_in_round DESC)
+    WHERE is_completed = FALSE;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_rounds_completed;
+
+-- Logs de auditoría por negocio y fecha
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_business_created
+    ON audit_logs (business_id, created_at DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_user_created
+    ON audit_logs (user_id, created_at DESC);
+
+-- Suscripciones push activas por usuario
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_push_user_active
+    ON push_subscriptions (user_id)
+    WHERE is_active = TRUE;
@@ -0,0 +1,3 @@
+-- Premio configurado por negocio (lo lee RewardService.check_and_generate_reward).
+-- Dentro de la transacción del escaneo un error de columna inexistente revertiría la visita.
+ALTER TABLE businesses ADD COLUMN IF NOT EXISTS reward_id INTEGER REFERENCES rewards(id);
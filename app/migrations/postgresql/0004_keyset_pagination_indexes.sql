@@ -0,0 +1,14 @@
+-- migrate:no-transaction
+-- Índices para paginación por cursor (created_at, id) en listados de administración y auditoría.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created_id
+    ON users (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_businesses_created_id
+    ON businesses (created_at DESC, id DESC);
+
+-- Reemplaza a idx_audit_logs_business_created agregando id como desempate del cursor
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_business_created_id
+    ON audit_logs (business_id, created_at DESC, id DESC);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_audit_logs_business_created;
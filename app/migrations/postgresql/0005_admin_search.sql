@@ -0,0 +1,35 @@
+-- Búsqueda indexada del panel de administración (negocios y usuarios).
+-- tsvector en español sin acentos para coincidencias por palabra/prefijo y pg_trgm
+-- para subcadenas y errores de tipeo. Son índices de expresión: SELECT * no cambia.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE; los índices de expresión requieren funciones IMMUTABLE
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+CREATE OR REPLACE FUNCTION business_search_document(name text, category text, address text)
+    RETURNS tsvector
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$
+        SELECT setweight(to_tsvector('spanish', immutable_unaccent(coalesce(name, ''))), 'A') ||
+               setweight(to_tsvector('spanish', immutable_unaccent(coalesce(category, ''))), 'B') ||
+               setweight(to_tsvector('spanish', immutable_unaccent(coalesce(address, ''))), 'C')
+    $$;
+
+-- Los nombres de persona no se reducen a su raíz: configuración 'simple'
+CREATE OR REPLACE FUNCTION user_search_document(nombre text) RETURNS tsvector
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT to_tsvector('simple', immutable_unaccent(coalesce(nombre, ''))) $$;
+
+CREATE INDEX IF NOT EXISTS idx_businesses_search
+    ON businesses USING GIN (business_search_document(name, category, address));
+CREATE INDEX IF NOT EXISTS idx_businesses_name_trgm
+    ON businesses USING GIN (immutable_unaccent(name) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_users_search ON users USING GIN (user_search_document(nombre));
+CREATE INDEX IF NOT EXISTS idx_users_nombre_trgm
+    ON users USING GIN (immutable_unaccent(nombre) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm
+    ON users USING GIN (lower(email) gin_trgm_ops);
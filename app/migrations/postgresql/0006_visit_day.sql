@@ -0,0 +1,18 @@
+-- migrate:no-transaction
+-- Día de la visita almacenado con clave única (usuario, negocio, día): el INSERT ... ON CONFLICT
+-- de UserVisit.register_visit descarta el segundo escaneo del mismo día sin consulta previa.
+ALTER TABLE user_visits ADD COLUMN IF NOT EXISTS visit_day DATE;
+
+-- Solo la primera visita de cada (usuario, negocio, día) recibe visit_day; los duplicados
+-- históricos quedan en NULL y no participan en la restricción.
+UPDATE user_visits uv
+SET visit_day = first_visit.day
+FROM (
+    SELECT MIN(id) AS id, visit_date::date AS day
+    FROM user_visits
+    GROUP BY user_id, business_id, visit_date::date
+) first_visit
+WHERE uv.id = first_visit.id AND uv.visit_day IS NULL;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_user_visits_day
+    ON user_visits (user_id, business_id, visit_day);
@@ -0,0 +1,81 @@
+-- Estado de lealtad por (usuario, negocio), mantenido en la misma transacción que las
+-- visitas, reclamos y redenciones (ver app/models/loyalty_state.py). Las lecturas de la
+-- lista de negocios, la tarjeta del usuario y el dashboard leen esta fila en lugar de
+-- agregar user_visits, user_rounds y user_rewards.
+CREATE TABLE IF NOT EXISTS loyalty_state (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    round_number INTEGER NOT NULL DEFAULT 1,
+    progress_in_round INTEGER NOT NULL DEFAULT 0,
+    completed_rounds INTEGER NOT NULL DEFAULT 0,
+    total_visits INTEGER NOT NULL DEFAULT 0,
+    visit_month VARCHAR(7),
+    month_visits INTEGER NOT NULL DEFAULT 0,
+    last_visit_id BIGINT,
+    last_visit_at TIMESTAMP,
+    active_coupons INTEGER NOT NULL DEFAULT 0,   -- vigentes + reclamados
+    claimed_coupons INTEGER NOT NULL DEFAULT 0,  -- reclamados sin redimir
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, business_id)
+);
+
+-- Rondas activas del dashboard del negocio
+CREATE INDEX IF NOT EXISTS idx_loyalty_state_business_progress
+    ON loyalty_state (business_id, progress_in_round DESC)
+    WHERE progress_in_round > 0;
+
+-- Últimos clientes del dashboard del negocio
+CREATE INDEX IF NOT EXISTS idx_loyalty_state_business_last_visit
+    ON loyalty_state (business_id, last_visit_at DESC);
+
+-- Carga inicial desde el historial
+INSERT INTO loyalty_state (
+    user_id, business_id, round_number, progress_in_round, completed_rounds,
+    total_visits, visit_month, month_visits, last_visit_id, last_visit_at,
+    active_coupons, claimed_coupons
+)
+SELECT pairs.user_id, pairs.business_id,
+       CASE WHEN latest.is_completed = FALSE THEN latest.round_number
+            ELSE COALESCE(latest.round_number, 0) + 1 END,
+       CASE WHEN latest.is_completed = FALSE THEN latest.progress_in_round ELSE 0 END,
+       COALESCE(rounds.completed_rounds, 0),
+       COALESCE(visits.total_visits, 0),
+       TO_CHAR(NOW(), 'YYYY-MM'),
+       COALESCE(visits.month_visits, 0),
+       visits.last_visit_id,
+       visits.last_visit_at,
+       COALESCE(coupons.active_coupons, 0),
+       COALESCE(coupons.claimed_coupons, 0)
+FROM (
+    SELECT user_id, business_id FROM user_visits
+    UNION
+    SELECT user_id, business_id FROM user_rounds
+    UNION
+    SELECT user_id, business_id FROM user_rewards
+) pairs
+LEFT JOIN (
+    SELECT user_id, business_id, COUNT(*) AS total_visits,
+           COUNT(*) FILTER (WHERE visit_month = TO_CHAR(NOW(), 'YYYY-MM')) AS month_visits,
+           MAX(id) AS last_visit_id, MAX(visit_date) AS last_visit_at
+    FROM user_visits
+    GROUP BY user_id, business_id
+) visits ON visits.user_id = pairs.user_id AND visits.business_id = pairs.business_id
+LEFT JOIN (
+    SELECT user_id, business_id, COUNT(*) FILTER (WHERE is_completed) AS completed_rounds
+    FROM user_rounds
+    GROUP BY user_id, business_id
+) rounds ON rounds.user_id = pairs.user_id AND rounds.business_id = pairs.business_id
+LEFT JOIN (
+    SELECT DISTINCT ON (user_id, business_id) user_id, business_id, round_number,
+           progress_in_round, is_completed
+    FROM user_rounds
+    ORDER BY user_id, business_id, round_number DESC
+) latest ON latest.user_id = pairs.user_id AND latest.business_id = pairs.business_id
+LEFT JOIN (
+    SELECT user_id, business_id,
+           COUNT(*) FILTER (WHERE status IN ('vigente', 'reclamado')) AS active_coupons,
+           COUNT(*) FILTER (WHERE status = 'reclamado') AS claimed_coupons
+    FROM user_rewards
+    GROUP BY user_id, business_id
+) coupons ON coupons.user_id = pairs.user_id AND coupons.business_id = pairs.business_id
+ON CONFLICT (user_id, business_id) DO NOTHING;
@@ -0,0 +1,121 @@
+-- Particionado mensual por rango de user_visits (por visit_day) y audit_logs (por created_at).
+-- Las tablas se reconstruyen como particionadas copiando los datos en esta transacción; las
+-- particiones futuras las crea el job de mantenimiento (maintain_partitions.py) y las antiguas
+-- se separan con DETACH PARTITION en lugar de borrarse fila por fila. Cada tabla tiene además una
+-- partición DEFAULT (<tabla>_default) para que un insert sin partición mensual (por ejemplo, si el
+-- job dejó de correr) no falle; ensure_future_partitions mueve esas filas a su partición mensual.
+--
+-- Toda restricción única debe incluir la llave de partición:
+--   * user_visits: PK (id, visit_day). Las visitas duplicadas del mismo día anteriores a la
+--     clave única (visit_day NULL desde 0006) reciben su día y un day_seq > 0; las visitas
+--     nuevas siempre tienen day_seq = 0, así que ux_user_visits_day sigue permitiendo una
+--     sola visita por (usuario, negocio, día).
+--   * audit_logs: PK (id, created_at); created_at pasa a NOT NULL.
+
+-- Crea (si no existe) la partición mensual <tabla>_pYYYYMM que contiene `month_start`
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent TEXT, month_start DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    first_day DATE := date_trunc('month', month_start)::date;
+    partition_name TEXT := parent || '_p' || to_char(first_day, 'YYYYMM');
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, first_day, (first_day + INTERVAL '1 month')::date
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$;
+
+-- user_visits ----------------------------------------------------------------------------
+
+ALTER TABLE user_visits RENAME TO user_visits_unpartitioned;
+ALTER SEQUENCE user_visits_id_seq OWNED BY NONE;
+
+CREATE TABLE user_visits (
+    id BIGINT NOT NULL DEFAULT nextval('user_visits_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    visit_date TIMESTAMP NOT NULL,
+    visit_month VARCHAR(7) NOT NULL,
+    status VARCHAR(20) DEFAULT 'completed' CHECK (status IN ('pending', 'completed', 'cancelled')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    visit_day DATE NOT NULL,
+    day_seq SMALLINT NOT NULL DEFAULT 0
+) PARTITION BY RANGE (visit_day);
+
+SELECT create_monthly_partition('user_visits', month::date)
+FROM generate_series(
+    date_trunc('month', LEAST(
+        (SELECT MIN(visit_date) FROM user_visits_unpartitioned), CURRENT_DATE
+    )),
+    date_trunc('month', CURRENT_DATE) + INTERVAL '3 months',
+    INTERVAL '1 month'
+) AS month;
+
+CREATE TABLE user_visits_default PARTITION OF user_visits DEFAULT;
+
+INSERT INTO user_visits (id, user_id, business_id, visit_date, visit_month, status,
+                         created_at, updated_at, visit_day, day_seq)
+SELECT id, user_id, business_id, visit_date, visit_month, status, created_at, updated_at,
+       visit_date::date,
+       ROW_NUMBER() OVER (PARTITION BY user_id, business_id, visit_date::date ORDER BY id) - 1
+FROM user_visits_unpartitioned;
+
+DROP TABLE user_visits_unpartitioned;
+ALTER SEQUENCE user_visits_id_seq OWNED BY user_visits.id;
+
+ALTER TABLE user_visits ADD PRIMARY KEY (id, visit_day);
+CREATE UNIQUE INDEX ux_user_visits_day ON user_visits (user_id, business_id, visit_day, day_seq);
+CREATE INDEX idx_user_business_month ON user_visits (user_id, business_id, visit_month);
+CREATE INDEX idx_user_visits_business_day ON user_visits (business_id, visit_day);
+
+-- audit_logs -----------------------------------------------------------------------------
+
+ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned;
+ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE;
+
+CREATE TABLE audit_logs (
+    id BIGINT NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+    user_id INTEGER,
+    business_id BIGINT,
+    action_type VARCHAR(50) NOT NULL,
+    action_description TEXT,
+    old_values TEXT,
+    new_values TEXT,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (created_at);
+
+SELECT create_monthly_partition('audit_logs', month::date)
+FROM generate_series(
+    date_trunc('month', LEAST(
+        (SELECT MIN(created_at) FROM audit_logs_unpartitioned), CURRENT_DATE
+    )),
+    date_trunc('month', CURRENT_DATE) + INTERVAL '3 months',
+    INTERVAL '1 month'
+) AS month;
+
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+INSERT INTO audit_logs (id, user_id, business_id, action_type, action_description, old_values,
+                        new_values, ip_address, user_agent, created_at)
+SELECT id, user_id, business_id, action_type, action_description, old_values, new_values,
+       ip_address, user_agent, COALESCE(created_at, CURRENT_TIMESTAMP)
+FROM audit_logs_unpartitioned;
+
+DROP TABLE audit_logs_unpartitioned;
+ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id;
+
+ALTER TABLE audit_logs ADD PRIMARY KEY (id, created_at);
+CREATE INDEX idx_audit_logs_business_created_id ON audit_logs (business_id, created_at DESC, id DESC);
+CREATE INDEX idx_audit_logs_user_created ON audit_logs (user_id, created_at DESC);
+
+ANALYZE user_visits;
+ANALYZE audit_logs;
@@ -0,0 +1,35 @@
+-- Una sola ronda abierta por (usuario, negocio). El índice único parcial es el árbitro
+-- del upsert de REGISTER_VISIT_SQL: dos escaneos concurrentes sin ronda abierta ya no
+-- pueden crear dos rondas, y el avance es un incremento atómico sobre la misma fila.
+
+-- Rondas abiertas duplicadas (creadas por carreras anteriores): su progreso se suma a la
+-- más reciente y las demás se eliminan
+WITH ranked AS (
+    SELECT id, user_id, business_id, progress_in_round,
+           ROW_NUMBER() OVER (PARTITION BY user_id, business_id ORDER BY round_number DESC, id DESC) AS position
+    FROM user_rounds
+    WHERE is_completed = FALSE
+), duplicates AS (
+    DELETE FROM user_rounds ur
+    USING ranked
+    WHERE ur.id = ranked.id AND ranked.position > 1
+    RETURNING ranked.user_id, ranked.business_id, ranked.progress_in_round
+), merged AS (
+    UPDATE user_rounds ur
+    SET progress_in_round = ur.progress_in_round + extra.progress
+    FROM (
+        SELECT user_id, business_id, SUM(progress_in_round) AS progress
+        FROM duplicates GROUP BY user_id, business_id
+    ) extra, ranked
+    WHERE ranked.position = 1 AND ur.id = ranked.id
+      AND ranked.user_id = extra.user_id AND ranked.business_id = extra.business_id
+    RETURNING ur.user_id, ur.business_id, ur.round_number, ur.progress_in_round
+)
+UPDATE loyalty_state ls
+SET round_number = merged.round_number, progress_in_round = merged.progress_in_round, updated_at = NOW()
+FROM merged
+WHERE ls.user_id = merged.user_id AND ls.business_id = merged.business_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_user_rounds_open
+    ON user_rounds (user_id, business_id)
+    WHERE is_completed = FALSE;
@@ -0,0 +1,36 @@
+-- Conteos diarios de visitas por negocio para los días cerrados. El job nocturno
+-- (VisitRollupService.run_nightly, desde maintain_partitions.py) los mantiene; el
+-- dashboard y las estadísticas leen rollups hasta rolled_through y user_visits solo
+-- después (normalmente, solo hoy). Con los rollups al día, las particiones antiguas de
+-- user_visits se pueden separar al esquema archive sin perder las métricas históricas.
+CREATE TABLE IF NOT EXISTS visit_daily_rollup (
+    business_id BIGINT NOT NULL REFERENCES businesses(id),
+    day DATE NOT NULL,
+    visits INTEGER NOT NULL,
+    unique_users INTEGER NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (business_id, day)
+);
+
+-- Totales de todo el sistema por rango de días (estadísticas de administración)
+CREATE INDEX IF NOT EXISTS idx_visit_daily_rollup_day ON visit_daily_rollup (day);
+
+-- Último día cerrado incluido en cada rollup
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    rollup VARCHAR(50) PRIMARY KEY,
+    rolled_through DATE NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO visit_daily_rollup (business_id, day, visits, unique_users)
+SELECT business_id, visit_day, COUNT(*), COUNT(DISTINCT user_id)
+FROM user_visits
+WHERE visit_day < CURRENT_DATE
+GROUP BY business_id, visit_day
+ON CONFLICT (business_id, day) DO NOTHING;
+
+INSERT INTO rollup_watermarks (rollup, rolled_through)
+VALUES ('visit_daily_rollup', CURRENT_DATE - 1)
+ON CONFLICT (rollup) DO NOTHING;
+
+ANALYZE visit_daily_rollup;
@@ -0,0 +1,25 @@
+-- Los cupones guardan solo el token firmado del QR (qr_token); la imagen se renderiza al
+-- pedirla en GET /api/rewards/coupons/{id}/qr (con caché). Se eliminan las data URL PNG
+-- base64 de qr_code, que viajaban en cada consulta `ur.*` de la cartera y de los cupones.
+-- Los cupones existentes quedan con qr_token NULL: su token se vuelve a firmar a partir
+-- de la fila (código, usuario, negocio y vencimiento) al renderizar la imagen.
+-- El espacio de la tabla se recupera en 0012 (VACUUM FULL).
+
+ALTER TABLE user_rewards ADD COLUMN IF NOT EXISTS qr_token VARCHAR(300);
+
+DO $$
+DECLARE
+    table_size BIGINT := pg_total_relation_size('user_rewards');
+    stripped_rows BIGINT;
+    stripped_bytes BIGINT;
+BEGIN
+    SELECT COUNT(*), COALESCE(SUM(pg_column_size(qr_code)), 0)
+    INTO stripped_rows, stripped_bytes
+    FROM user_rewards
+    WHERE qr_code IS NOT NULL;
+
+    RAISE NOTICE 'user_rewards: % imágenes QR eliminadas (% en qr_code); tamaño de la tabla antes: %',
+        stripped_rows, pg_size_pretty(stripped_bytes), pg_size_pretty(table_size);
+END $$;
+
+ALTER TABLE user_rewards DROP COLUMN IF EXISTS qr_code;
@@ -0,0 +1,8 @@
+-- migrate:no-transaction
+-- Reescribe user_rewards para liberar el espacio de la columna qr_code eliminada en 0011
+-- (DROP COLUMN solo la oculta; los datos y su TOAST siguen en disco hasta reescribir).
+-- Con las imágenes fuera, la tabla es pequeña y el bloqueo exclusivo dura poco.
+
+VACUUM (FULL, ANALYZE) user_rewards;
+
+DO $$ BEGIN RAISE NOTICE 'user_rewards: tamaño de la tabla tras recuperar el espacio: %', pg_size_pretty(pg_total_relation_size('user_rewards')); END $$;
@@ -0,0 +1,100 @@
+-- Esquema base de SQLite (desarrollo local): mismo esquema que auth_api.db.
+
+CREATE TABLE IF NOT EXISTS user_types (
+    id INTEGER PRIMARY KEY,
+    type_name TEXT UNIQUE,
+    type_hash TEXT UNIQUE,
+    description TEXT,
+    active BOOLEAN DEFAULT TRUE
+);
+
+INSERT OR IGNORE INTO user_types (id, type_name, type_hash, description) VALUES
+    (1, 'cliente', 'a1b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456', 'Usuario cliente final'),
+    (2, 'negocio', 'b2c3d4e5f6789012345678901234567890abcdef1234567890abcdef123456a1', 'Usuario propietario de negocio');
+
+CREATE TABLE IF NOT EXISTS municipalities (
+    id INTEGER PRIMARY KEY,
+    municipio TEXT NOT NULL,
+    state TEXT NOT NULL,
+    active BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    email TEXT UNIQUE,
+    telefono TEXT UNIQUE,
+    password TEXT NOT NULL,
+    user_type_id INTEGER DEFAULT 1,
+    municipality_id INTEGER,
+    avatar TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS businesses (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    category TEXT NOT NULL,
+    address TEXT,
+    municipality_id INTEGER,
+    phone TEXT,
+    email TEXT,
+    logo TEXT,
+    image_url TEXT,
+    description TEXT,
+    rating REAL DEFAULT 0.0,
+    visits_for_prize INTEGER DEFAULT 6,
+    facebook TEXT,
+    instagram TEXT,
+    whatsapp TEXT,
+    active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    owner_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS business_menus (
+    id INTEGER PRIMARY KEY,
+    business_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    item_name TEXT NOT NULL,
+    description TEXT,
+    price REAL NOT NULL,
+    image_url TEXT,
+    available BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (business_id) REFERENCES businesses (id)
+);
+
+CREATE TABLE IF NOT EXISTS user_visits (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    business_id INTEGER NOT NULL,
+    visit_date TIMESTAMP NOT NULL,
+    visit_month TEXT NOT NULL,
+    status TEXT DEFAULT 'completed',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_rounds (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    business_id INTEGER NOT NULL,
+    round_number INTEGER NOT NULL DEFAULT 1,
+    progress_in_round INTEGER NOT NULL DEFAULT 0,
+    round_start_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL,
+    is_completed BOOLEAN NOT NULL DEFAULT FALSE,
+    is_reward_claimed BOOLEAN NOT NULL DEFAULT FALSE,
+    last_visit_id INTEGER NULL
+);
+
+CREATE TABLE IF NOT EXISTS user_rewards (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    business_id INTEGER NOT NULL,
+    reward_type TEXT DEFAULT 'coupon',
+    status TEXT DEFAULT 'vigente',
+    reclamado BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP
+);
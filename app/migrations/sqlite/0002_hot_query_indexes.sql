@@ -0,0 +1,18 @@
+-- Índices para las consultas calientes (mismo criterio que la migración de PostgreSQL,
+-- limitado a las tablas que usan los modelos SQLite).
+
+-- Visitas del usuario agrupadas por negocio y verificación de visita duplicada
+CREATE INDEX IF NOT EXISTS idx_user_business_month
+    ON user_visits (user_id, business_id, visit_month);
+
+-- Visitas por negocio y fecha
+CREATE INDEX IF NOT EXISTS idx_user_visits_business_date
+    ON user_visits (business_id, visit_date);
+
+CREATE INDEX IF NOT EXISTS idx_user_rounds_user_business
+    ON user_rounds (user_id, business_id);
+
+-- Ronda abierta del usuario en un negocio (el predicado coincide con el de UserVisit)
+CREATE INDEX IF NOT EXISTS idx_user_rounds_open
+    ON user_rounds (user_id, business_id, round_number DESC)
+    WHERE is_completed = 0;
@@ -0,0 +1,49 @@
+-- Búsqueda de texto completo con FTS5 (equivalente SQLite de la búsqueda indexada de PostgreSQL).
+-- Tablas de contenido externo sincronizadas por triggers; remove_diacritics ignora acentos.
+CREATE VIRTUAL TABLE IF NOT EXISTS businesses_fts USING fts5(
+    name, category, address,
+    content='businesses', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS businesses_fts_insert AFTER INSERT ON businesses BEGIN
+    INSERT INTO businesses_fts (rowid, name, category, address)
+    VALUES (new.id, new.name, new.category, new.address);
+END;
+
+CREATE TRIGGER IF NOT EXISTS businesses_fts_delete AFTER DELETE ON businesses BEGIN
+    INSERT INTO businesses_fts (businesses_fts, rowid, name, category, address)
+    VALUES ('delete', old.id, old.name, old.category, old.address);
+END;
+
+CREATE TRIGGER IF NOT EXISTS businesses_fts_update AFTER UPDATE OF name, category, address ON businesses BEGIN
+    INSERT INTO businesses_fts (businesses_fts, rowid, name, category, address)
+    VALUES ('delete', old.id, old.name, old.category, old.address);
+    INSERT INTO businesses_fts (rowid, name, category, address)
+    VALUES (new.id, new.name, new.category, new.address);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+    nombre, email,
+    content='users', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+    INSERT INTO users_fts (rowid, nombre, email) VALUES (new.id, new.nombre, new.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+    INSERT INTO users_fts (users_fts, rowid, nombre, email)
+    VALUES ('delete', old.id, old.nombre, old.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF nombre, email ON users BEGIN
+    INSERT INTO users_fts (users_fts, rowid, nombre, email)
+    VALUES ('delete', old.id, old.nombre, old.email);
+    INSERT INTO users_fts (rowid, nombre, email) VALUES (new.id, new.nombre, new.email);
+END;
+
+-- Indexa las filas existentes
+INSERT INTO businesses_fts (businesses_fts) VALUES ('rebuild');
+INSERT INTO users_fts (users_fts) VALUES ('rebuild');
@@ -0,0 +1,11 @@
+-- Día de la visita con clave única (usuario, negocio, día); ver la migración de PostgreSQL.
+ALTER TABLE user_visits ADD COLUMN visit_day TEXT;
+
+-- Los duplicados históricos del mismo día quedan en NULL
+UPDATE user_visits SET visit_day = DATE(visit_date)
+WHERE id IN (
+    SELECT MIN(id) FROM user_visits GROUP BY user_id, business_id, DATE(visit_date)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_user_visits_day
+    ON user_visits (user_id, business_id, visit_day);
@@ -0,0 +1,32 @@
+-- Una sola ronda abierta por (usuario, negocio); ver la migración de PostgreSQL.
+
+-- El progreso de las rondas abiertas duplicadas se suma a la más reciente
+UPDATE user_rounds
+SET progress_in_round = (
+    SELECT SUM(other.progress_in_round) FROM user_rounds other
+    WHERE other.user_id = user_rounds.user_id AND other.business_id = user_rounds.business_id
+      AND other.is_completed = 0
+)
+WHERE is_completed = 0
+  AND id = (
+      SELECT latest.id FROM user_rounds latest
+      WHERE latest.user_id = user_rounds.user_id AND latest.business_id = user_rounds.business_id
+        AND latest.is_completed = 0
+      ORDER BY latest.round_number DESC, latest.id DESC LIMIT 1
+  );
+
+DELETE FROM user_rounds
+WHERE is_completed = 0
+  AND id != (
+      SELECT latest.id FROM user_rounds latest
+      WHERE latest.user_id = user_rounds.user_id AND latest.business_id = user_rounds.business_id
+        AND latest.is_completed = 0
+      ORDER BY latest.round_number DESC, latest.id DESC LIMIT 1
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_user_rounds_open
+    ON user_rounds (user_id, business_id)
+    WHERE is_completed = 0;
+
+-- La búsqueda de la ronda abierta ya la resuelve el índice único
+DROP INDEX IF EXISTS idx_user_rounds_open;
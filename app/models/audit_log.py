@@ -1,5 +1,7 @@
 from app.config.database import get_db_connection
+from app.config.database_async import get_async_connection
 from app.utils.logger import log_error
+from app.utils.pagination import keyset_query, build_page, total_count, InvalidCursorError
 from typing import Dict, List, Optional
 from datetime import datetime
 import json
@@ -58,6 +60,40 @@ class AuditLog:
         finally:
             connection.close()
     
+    @staticmethod
+    async def log_action_async(
+        user_id: int,
+        action_type: str,
+        description: str,
+        business_id: Optional[int] = None,
+        old_values: Optional[Dict] = None,
+        new_values: Optional[Dict] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> bool:
+        """Versión asíncrona de log_action para rutas async"""
+        try:
+            async with get_async_connection() as connection:
+                await connection.execute("""
+                    INSERT INTO audit_logs (
+                        user_id, business_id, action_type, action_description,
+                        old_values, new_values, ip_address, user_agent, created_at
+                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, NOW())
+                """,
+                    user_id,
+                    business_id,
+                    action_type,
+                    description,
+                    json.dumps(old_values) if old_values else None,
+                    json.dumps(new_values) if new_values else None,
+                    ip_address,
+                    user_agent
+                )
+                return True
+        except Exception as e:
+            log_error("Error registrando audit log", error=e)
+            return False
+    
     @staticmethod
     def get_business_logs(
         business_id: int,
@@ -65,49 +101,45 @@ class AuditLog:
         end_date: Optional[datetime] = None,
         action_type: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_total: bool = False
     ) -> Dict:
-        """Obtiene logs de auditoría de un negocio"""
+        """Obtiene logs de auditoría de un negocio paginados por cursor (created_at, id)"""
         connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
-                where_conditions = ["business_id = %s"]
+            with connection.cursor() as db_cursor:
+                where_conditions = ["al.business_id = %s"]
                 params = [business_id]
                 
                 if start_date:
-                    where_conditions.append("created_at >= %s")
+                    where_conditions.append("al.created_at >= %s")
                     params.append(start_date)
                 
                 if end_date:
-                    where_conditions.append("created_at <= %s")
+                    where_conditions.append("al.created_at <= %s")
                     params.append(end_date)
                 
                 if action_type:
-                    where_conditions.append("action_type = %s")
+                    where_conditions.append("al.action_type = %s")
                     params.append(action_type)
                 
                 where_clause = " AND ".join(where_conditions)
+                keyset_filter, keyset_params, order_by, direction = keyset_query("al", cursor)
+                if cursor:
+                    offset = 0
                 
-                # Obtener logs
-                cursor.execute(f"""
+                # Obtener logs (una fila extra para saber si hay más)
+                db_cursor.execute(f"""
                     SELECT al.*, u.nombre as user_name
                     FROM audit_logs al
                     LEFT JOIN users u ON al.user_id = u.id
-                    WHERE {where_clause}
-                    ORDER BY al.created_at DESC
+                    WHERE {where_clause}{keyset_filter}
+                    ORDER BY {order_by}
                     LIMIT %s OFFSET %s
-                """, params + [limit, offset])
+                """, params + keyset_params + [limit + 1, offset])
                 
-                logs = cursor.fetchall()
-                
-                # Contar total
-                cursor.execute(f"""
-                    SELECT COUNT(*) as total
-                    FROM audit_logs
-                    WHERE {where_clause}
-                """, params)
-                
-                total = cursor.fetchone()['total']
+                logs, pagination = build_page(db_cursor.fetchall(), limit, direction, bool(cursor) or offset > 0)
                 
                 # Procesar logs
                 processed_logs = []
@@ -119,15 +151,29 @@ class AuditLog:
                         processed_log['new_values'] = json.loads(processed_log['new_values'])
                     processed_logs.append(processed_log)
                 
-                return {
+                result = {
                     "audit_logs": processed_logs,
-                    "total_records": total,
                     "page": (offset // limit) + 1,
-                    "has_more": (offset + limit) < total
+                    "has_more": pagination["has_more"],
+                    "next_cursor": pagination["next_cursor"],
+                    "prev_cursor": pagination["prev_cursor"]
                 }
+                
+                # El total es opcional: exacto pero cacheado (siempre hay filtro por negocio)
+                if include_total:
+                    count = total_count(
+                        db_cursor, "audit_logs",
+                        f"SELECT COUNT(*) as total FROM audit_logs al WHERE {where_clause}",
+                        params, filtered=True
+                    )
+                    result["total_records"] = count["total"]
+                
+                return result
+        except InvalidCursorError:
+            raise
         except Exception as e:
             log_error("Error obteniendo audit logs", error=e)
-            return {"audit_logs": [], "total_records": 0, "page": 1, "has_more": False}
+            return {"audit_logs": [], "page": 1, "has_more": False, "next_cursor": None, "prev_cursor": None}
         finally:
             connection.close()
     
@@ -13,21 +13,13 @@ class Business:
                     cursor.execute("""
                         SELECT b.*, m.municipio,
                                CASE 
-                                   WHEN ur.total_coupons IS NULL THEN NULL
-                                   WHEN ur.reclamado = FALSE THEN 0
-                                   WHEN ur.reclamado = TRUE THEN 1
-                                   ELSE NULL
+                                   WHEN COALESCE(ls.active_coupons, 0) = 0 THEN NULL
+                                   WHEN ls.claimed_coupons > 0 THEN 1
+                                   ELSE 0
                                END as unclaimed_coupons
                         FROM businesses b 
                         LEFT JOIN municipalities m ON b.municipality_id = m.id 
-                        LEFT JOIN (
-                            SELECT business_id, 
-                                   COUNT(*) as total_coupons,
-                                   BOOL_OR(reclamado) as reclamado
-                            FROM user_rewards 
-                            WHERE user_id = %s AND status IN ('vigente', 'reclamado')
-                            GROUP BY business_id
-                        ) ur ON b.id = ur.business_id
+                        LEFT JOIN loyalty_state ls ON ls.business_id = b.id AND ls.user_id = %s
                         WHERE b.active = TRUE 
                         ORDER BY b.name
                     """, (user_id,))
@@ -57,21 +49,13 @@ class Business:
                     cursor.execute("""
                         SELECT b.*, m.municipio,
                                CASE 
-                                   WHEN ur.total_coupons IS NULL THEN NULL
-                                   WHEN ur.reclamado = FALSE THEN 0
-                                   WHEN ur.reclamado = TRUE THEN 1
-                                   ELSE NULL
+                                   WHEN COALESCE(ls.active_coupons, 0) = 0 THEN NULL
+                                   WHEN ls.claimed_coupons > 0 THEN 1
+                                   ELSE 0
                                END as unclaimed_coupons
                         FROM businesses b 
                         LEFT JOIN municipalities m ON b.municipality_id = m.id 
-                        LEFT JOIN (
-                            SELECT business_id, 
-                                   COUNT(*) as total_coupons,
-                                   BOOL_OR(reclamado) as reclamado
-                            FROM user_rewards 
-                            WHERE user_id = %s AND status IN ('vigente', 'reclamado')
-                            GROUP BY business_id
-                        ) ur ON b.id = ur.business_id
+                        LEFT JOIN loyalty_state ls ON ls.business_id = b.id AND ls.user_id = %s
                         WHERE b.id = %s AND b.active = TRUE
                     """, (user_id, business_id))
                 else:
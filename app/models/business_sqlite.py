@@ -1,5 +1,7 @@
 from app.config.database_sqlite import get_db_connection
+from app.config.database_sqlite_async import get_async_db_connection
 from app.utils.logger import log_error
+from app.utils.search import fts5_query
 from typing import List, Dict, Optional
 
 class Business:
@@ -24,6 +26,24 @@ class Business:
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_all_async(user_id: int = None) -> List[Dict]:
+        """Versión asíncrona de get_all para rutas async"""
+        try:
+            async with get_async_db_connection() as connection:
+                async with connection.execute("""
+                    SELECT b.*, m.municipio, 0 as unclaimed_coupons
+                    FROM businesses b 
+                    LEFT JOIN municipalities m ON b.municipality_id = m.id 
+                    WHERE b.active = 1 
+                    ORDER BY b.name
+                """) as cursor:
+                    businesses = await cursor.fetchall()
+                    return [dict(business) for business in businesses]
+        except Exception as e:
+            log_error("Error obteniendo negocios", error=e)
+            return []
+    
     @staticmethod
     def get_by_id(business_id: int, user_id: int = None) -> Optional[Dict]:
         connection = get_db_connection()
@@ -42,4 +62,30 @@ class Business:
             log_error("Error obteniendo negocio", error=e)
             return None
         finally:
-            connection.close()
\ No newline at end of file
+            connection.close()
+    
+    @staticmethod
+    def search(term: str, limit: int = 20) -> List[Dict]:
+        """Busca negocios por nombre, categoría o dirección con FTS5, ordenados por relevancia (bm25)"""
+        match = fts5_query(term)
+        if not match:
+            return []
+        connection = get_db_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT b.*, m.municipio, 0 as unclaimed_coupons,
+                       bm25(businesses_fts, 10.0, 4.0, 1.0) as search_rank
+                FROM businesses_fts
+                JOIN businesses b ON b.id = businesses_fts.rowid
+                LEFT JOIN municipalities m ON b.municipality_id = m.id
+                WHERE businesses_fts MATCH ? AND b.active = 1
+                ORDER BY search_rank
+                LIMIT ?
+            """, (match, limit))
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            log_error("Error buscando negocios", error=e)
+            return []
+        finally:
+            connection.close()
@@ -0,0 +1,70 @@
+from typing import Dict, List
+from collections import Counter
+
+class LoyaltyState:
+    """Estado de lealtad por (usuario, negocio) mantenido de forma incremental
+    
+    Los métodos record_* reciben el cursor del llamador para escribir en la misma
+    transacción que el cambio que registran (visita, ronda completada, cupón).
+    """
+    
+    @staticmethod
+    def lock(cursor, user_id: int, business_id: int):
+        """Serializa la generación y el reclamo de premios del (usuario, negocio)
+        
+        Advisory lock de transacción: se libera con el commit o rollback del llamador.
+        """
+        cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", (user_id, business_id))
+    
+    @staticmethod
+    def record_round_completed(cursor, user_id: int, business_id: int):
+        """La ronda actual se completó: la siguiente queda virtual con progreso 0"""
+        cursor.execute("""
+            UPDATE loyalty_state
+            SET completed_rounds = completed_rounds + 1, round_number = round_number + 1,
+                progress_in_round = 0, updated_at = NOW()
+            WHERE user_id = %s AND business_id = %s
+        """, (user_id, business_id))
+    
+    @staticmethod
+    def record_coupon_created(cursor, user_id: int, business_id: int):
+        cursor.execute("""
+            INSERT INTO loyalty_state (user_id, business_id, active_coupons)
+            VALUES (%s, %s, 1)
+            ON CONFLICT (user_id, business_id) DO UPDATE
+            SET active_coupons = loyalty_state.active_coupons + 1, updated_at = NOW()
+        """, (user_id, business_id))
+    
+    @staticmethod
+    def record_coupon_claimed(cursor, user_id: int, business_id: int):
+        cursor.execute("""
+            UPDATE loyalty_state
+            SET claimed_coupons = claimed_coupons + 1, updated_at = NOW()
+            WHERE user_id = %s AND business_id = %s
+        """, (user_id, business_id))
+    
+    @staticmethod
+    def record_coupon_redeemed(cursor, user_id: int, business_id: int):
+        cursor.execute("""
+            UPDATE loyalty_state
+            SET active_coupons = GREATEST(active_coupons - 1, 0),
+                claimed_coupons = GREATEST(claimed_coupons - 1, 0), updated_at = NOW()
+            WHERE user_id = %s AND business_id = %s
+        """, (user_id, business_id))
+    
+    @staticmethod
+    def record_coupons_expired(cursor, user_id: int, expired: List[Dict]):
+        """Descuenta cupones expirados; `expired` son filas (business_id, previous_status)"""
+        active, claimed = Counter(), Counter()
+        for coupon in expired:
+            active[coupon['business_id']] += 1
+            if coupon['previous_status'] == 'reclamado':
+                claimed[coupon['business_id']] += 1
+        
+        for business_id, count in active.items():
+            cursor.execute("""
+                UPDATE loyalty_state
+                SET active_coupons = GREATEST(active_coupons - %s, 0),
+                    claimed_coupons = GREATEST(claimed_coupons - %s, 0), updated_at = NOW()
+                WHERE user_id = %s AND business_id = %s
+            """, (count, claimed[business_id], user_id, business_id))
@@ -4,36 +4,6 @@ from typing import Dict, List, Optional
 import json
 
 class PushSubscription:
-    @staticmethod
-    def create_table():
-        """Crea la tabla de suscripciones push si no existe"""
-        connection = get_db_connection()
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS push_subscriptions (
-                        id BIGINT AUTO_INCREMENT PRIMARY KEY,
-                        user_id INT NOT NULL,
-                        business_id BIGINT NULL,
-                        endpoint TEXT NOT NULL,
-                        p256dh_key TEXT NOT NULL,
-                        auth_key TEXT NOT NULL,
-                        user_agent TEXT NULL,
-                        is_active BOOLEAN DEFAULT TRUE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                        UNIQUE KEY unique_user_endpoint (user_id, endpoint(255)),
-                        INDEX idx_user_id (user_id),
-                        INDEX idx_business_id (business_id),
-                        INDEX idx_active (is_active)
-                    )
-                """)
-                connection.commit()
-        except Exception as e:
-            log_error("Error creando tabla push_subscriptions", error=e)
-        finally:
-            connection.close()
-    
     @staticmethod
     def subscribe(user_id: int, subscription_data: Dict, business_id: int = None) -> bool:
         """Registra una nueva suscripción push"""
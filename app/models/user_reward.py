@@ -3,11 +3,10 @@ from app.utils.logger import log_error, log_info
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import uuid
-import qrcode
-import io
-import base64
 from jose import jwt
 from app.config.settings import settings
+from app.models.loyalty_state import LoyaltyState
+from app.utils.qr_token import COUPON_TOKEN, decode_qr_token, encode_coupon_token, is_compact_token
 
 class UserReward:
     @staticmethod
@@ -16,29 +15,31 @@ class UserReward:
         return f"CPN-{uuid.uuid4().hex[:8].upper()}"
     
     @staticmethod
-    def generate_qr_code(coupon_code: str, user_id: int, business_id: int, expires_at: datetime) -> str:
-        """Genera código QR para el cupón"""
-        try:
-            qr_payload = {
-                "coupon_code": coupon_code,
-                "user_id": user_id,
-                "business_id": business_id,
-                "expires_at": expires_at.isoformat(),
-                "type": "reward_coupon"
-            }
-            qr_data = jwt.encode(qr_payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
-            
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
-        except Exception as e:
-            log_error("Error generando QR del cupón", error=e)
-            return None
+    def create_qr_token(coupon_code: str, user_id: int, business_id: int, expires_at: datetime) -> str:
+        """Token firmado del QR del cupón; la imagen se renderiza al pedirla (qr_image_url)"""
+        if settings.qr_token_format == "compact":
+            return encode_coupon_token(
+                coupon_code, user_id, business_id, int(expires_at.timestamp()), settings.jwt_secret_key
+            )
+        qr_payload = {
+            "coupon_code": coupon_code,
+            "user_id": user_id,
+            "business_id": business_id,
+            "expires_at": expires_at.isoformat(),
+            "type": "reward_coupon"
+        }
+        return jwt.encode(qr_payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    
+    @staticmethod
+    def coupon_qr_token(coupon: Dict) -> str:
+        """Token guardado del cupón; los anteriores a qr_token (sin él) se vuelven a firmar desde la fila"""
+        return coupon.get("qr_token") or UserReward.create_qr_token(
+            coupon["coupon_code"], coupon["user_id"], coupon["business_id"], coupon["expires_at"]
+        )
+    
+    @staticmethod
+    def qr_image_url(coupon_id: int) -> str:
+        return f"/api/rewards/coupons/{coupon_id}/qr"
     
     @staticmethod
     def create_reward(user_id: int, business_id: int, reward_id: int, validity_days: int = 30) -> Optional[Dict]:
@@ -59,16 +60,17 @@ class UserReward:
                 # Generar datos del cupón
                 coupon_code = UserReward.generate_coupon_code()
                 expires_at = datetime.now() + timedelta(days=validity_days)
-                qr_code = UserReward.generate_qr_code(coupon_code, user_id, business_id, expires_at)
+                qr_token = UserReward.create_qr_token(coupon_code, user_id, business_id, expires_at)
                 
-                # Insertar cupón
+                # Insertar cupón (solo el token; la imagen se renderiza al pedirla)
                 cursor.execute("""
-                    INSERT INTO user_rewards (user_id, business_id, reward_id, coupon_code, qr_code, expires_at, reclamado, redimido)
+                    INSERT INTO user_rewards (user_id, business_id, reward_id, coupon_code, qr_token, expires_at, reclamado, redimido)
                     VALUES (%s, %s, %s, %s, %s, %s, FALSE, FALSE)
                     RETURNING id
-                """, (user_id, business_id, reward_id, coupon_code, qr_code, expires_at))
+                """, (user_id, business_id, reward_id, coupon_code, qr_token, expires_at))
                 
                 reward_id = cursor.fetchone()['id']
+                LoyaltyState.record_coupon_created(cursor, user_id, business_id)
                 connection.commit()
                 
                 log_info(f"Cupón creado: {coupon_code} para usuario {user_id}")
@@ -76,7 +78,8 @@ class UserReward:
                 return {
                     "id": reward_id,
                     "coupon_code": coupon_code,
-                    "qr_code": qr_code,
+                    "qr_token": qr_token,
+                    "qr_image_url": UserReward.qr_image_url(reward_id),
                     "expires_at": expires_at,
                     "status": "vigente"
                 }
@@ -94,10 +97,17 @@ class UserReward:
             with connection.cursor() as cursor:
                 # Actualizar estados expirados
                 cursor.execute("""
-                    UPDATE user_rewards 
-                    SET status = 'expirado' 
-                    WHERE user_id = %s AND status IN ('vigente', 'reclamado') AND expires_at < NOW()
+                    UPDATE user_rewards ur
+                    SET status = 'expirado'
+                    FROM (
+                        SELECT id, status AS previous_status FROM user_rewards
+                        WHERE user_id = %s AND status IN ('vigente', 'reclamado') AND expires_at < NOW()
+                        FOR UPDATE
+                    ) old
+                    WHERE ur.id = old.id
+                    RETURNING ur.business_id, old.previous_status
                 """, (user_id,))
+                LoyaltyState.record_coupons_expired(cursor, user_id, cursor.fetchall())
                 
                 # Obtener cupones con información del negocio y premio
                 cursor.execute("""
@@ -119,6 +129,7 @@ class UserReward:
                 }
                 
                 for reward in all_rewards:
+                    reward['qr_image_url'] = UserReward.qr_image_url(reward['id'])
                     # Vigentes: cupones activos (reclamados y no reclamados)
                     if reward['status'] in ('vigente', 'reclamado'):
                         result['vigentes'].append(reward)
@@ -149,11 +160,15 @@ class UserReward:
                     UPDATE user_rewards 
                     SET status = 'reclamado', claimed_at = NOW(), reclamado = TRUE
                     WHERE id = %s AND user_id = %s AND status = 'vigente'
+                    RETURNING business_id
                 """, (coupon_id, user_id))
                 
+                claimed = cursor.fetchone()
+                if claimed:
+                    LoyaltyState.record_coupon_claimed(cursor, user_id, claimed['business_id'])
                 connection.commit()
                 
-                if cursor.rowcount > 0:
+                if claimed:
                     log_info(f"Cupón {coupon_id} reclamado por usuario {user_id}")
                     return True
                 return False
@@ -173,11 +188,15 @@ class UserReward:
                     UPDATE user_rewards 
                     SET status = 'usado', redeemed_at = NOW(), redimido = TRUE
                     WHERE id = %s AND user_id = %s AND status = 'reclamado'
+                    RETURNING business_id
                 """, (coupon_id, user_id))
                 
+                redeemed = cursor.fetchone()
+                if redeemed:
+                    LoyaltyState.record_coupon_redeemed(cursor, user_id, redeemed['business_id'])
                 connection.commit()
                 
-                if cursor.rowcount > 0:
+                if redeemed:
                     log_info(f"Cupón {coupon_id} redimido por usuario {user_id}")
                     return True
                 return False
@@ -189,8 +208,13 @@ class UserReward:
     
     @staticmethod
     def verify_coupon_qr(qr_token: str) -> Optional[Dict]:
-        """Verifica y decodifica un código QR de cupón"""
+        """Verifica y decodifica un código QR de cupón (token compacto o JWT)"""
         try:
+            if is_compact_token(qr_token):
+                payload = decode_qr_token(qr_token, settings.jwt_secret_key, COUPON_TOKEN)
+                payload["expires_at"] = datetime.fromtimestamp(payload["expires_at"]).isoformat()
+                return payload
+            
             payload = jwt.decode(qr_token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
             
             if payload.get("type") != "reward_coupon":
@@ -224,4 +248,22 @@ class UserReward:
             log_error("Error obteniendo cupón por código", error=e)
             return None
         finally:
-            connection.close()
\ No newline at end of file
+            connection.close()
+    
+    @staticmethod
+    def get_coupon_qr(coupon_id: int, user_id: int) -> Optional[Dict]:
+        """Datos del QR de un cupón del usuario (sin el resto de la fila)"""
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, user_id, business_id, coupon_code, expires_at, qr_token
+                    FROM user_rewards
+                    WHERE id = %s AND user_id = %s
+                """, (coupon_id, user_id))
+                return cursor.fetchone()
+        except Exception as e:
+            log_error("Error obteniendo QR del cupón", error=e, coupon_id=coupon_id)
+            return None
+        finally:
+            connection.close()
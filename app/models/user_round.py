@@ -2,128 +2,79 @@ from app.config.database import get_db_connection
 from app.utils.logger import log_error, log_info
 from typing import Dict, Optional, List
 from datetime import datetime
+from app.models.loyalty_state import LoyaltyState
 
 class UserRound:
     @staticmethod
-    def get_or_create_current_round(user_id: int, business_id: int) -> Dict:
-        """Obtiene la ronda actual del usuario para un negocio o crea una nueva"""
+    def get_current_round(user_id: int, business_id: int) -> Optional[Dict]:
+        """Ronda actual sin escribir en la BD
+        
+        Las rondas solo se crean al registrar una visita. Si no hay ronda abierta se
+        devuelve una ronda virtual (la siguiente, con progreso 0) sin id.
+        """
         connection = get_db_connection()
         try:
             with connection.cursor() as cursor:
-                # Buscar ronda actual (no completada)
                 cursor.execute("""
                     SELECT * FROM user_rounds 
-                    WHERE user_id = %s AND business_id = %s AND is_completed = FALSE
-                    ORDER BY round_number DESC LIMIT 1
-                """, (user_id, business_id))
-                
-                current_round = cursor.fetchone()
-                
-                if current_round:
-                    return dict(current_round)
-                
-                # No hay ronda actual, crear nueva
-                # Obtener el número de la siguiente ronda
-                cursor.execute("""
-                    SELECT COALESCE(MAX(round_number), 0) + 1 as next_round
-                    FROM user_rounds 
                     WHERE user_id = %s AND business_id = %s
+                    ORDER BY round_number DESC LIMIT 1
                 """, (user_id, business_id))
                 
-                result = cursor.fetchone()
-                next_round_number = result['next_round'] if result else 1
-                
-                # Crear nueva ronda
-                cursor.execute("""
-                    INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, 
-                                           round_start_date, is_completed, is_reward_claimed)
-                    VALUES (%s, %s, %s, 0, NOW(), FALSE, FALSE)
-                    RETURNING id
-                """, (user_id, business_id, next_round_number))
-                
-                round_id = cursor.fetchone()['id']
-                connection.commit()
-                
-                # Retornar la nueva ronda
-                cursor.execute("SELECT * FROM user_rounds WHERE id = %s", (round_id,))
-                new_round = cursor.fetchone()
-                
-                log_info(f"Nueva ronda {next_round_number} creada para usuario {user_id} en negocio {business_id}")
-                return dict(new_round)
+                latest_round = cursor.fetchone()
+                if latest_round and not latest_round['is_completed']:
+                    return dict(latest_round)
                 
+                next_round = latest_round['round_number'] + 1 if latest_round else 1
+                return UserRound.virtual_round(user_id, business_id, next_round)
         except Exception as e:
-            log_error("Error obteniendo/creando ronda actual", error=e)
+            log_error("Error obteniendo ronda actual", error=e)
             return None
         finally:
             connection.close()
     
     @staticmethod
-    def update_round_progress(user_id: int, business_id: int, visit_id: int) -> bool:
-        """Actualiza el progreso de la ronda actual al registrar una visita"""
-        connection = get_db_connection()
-        try:
-            with connection.cursor() as cursor:
-                # Obtener ronda actual (no completada)
-                current_round = UserRound.get_or_create_current_round(user_id, business_id)
-                if not current_round:
-                    return False
-                
-                # Solo incrementar si la ronda no está completada
-                if not current_round['is_completed']:
-                    new_progress = current_round['progress_in_round'] + 1
-                    
-                    cursor.execute("""
-                        UPDATE user_rounds 
-                        SET progress_in_round = %s, last_visit_id = %s
-                        WHERE id = %s
-                    """, (new_progress, visit_id, current_round['id']))
-                    
-                    connection.commit()
-                    log_info(f"Progreso actualizado a {new_progress} para ronda {current_round['round_number']}")
-                
-                return True
-                
-        except Exception as e:
-            log_error("Error actualizando progreso de ronda", error=e)
-            return False
-        finally:
-            connection.close()
+    def virtual_round(user_id: int, business_id: int, round_number: int = 1) -> Dict:
+        """Ronda aún no materializada: se crea con la primera visita"""
+        return {
+            "id": None,
+            "user_id": user_id,
+            "business_id": business_id,
+            "round_number": round_number,
+            "progress_in_round": 0,
+            "round_start_date": None,
+            "completed_at": None,
+            "is_completed": False,
+            "is_reward_claimed": False,
+            "last_visit_id": None
+        }
     
     @staticmethod
     def complete_round_and_claim_reward(user_id: int, business_id: int) -> bool:
-        """Marca la ronda como completada, premio reclamado y crea nueva ronda"""
+        """Marca la ronda abierta como completada y el premio como reclamado
+        
+        Una sola sentencia condicionada a is_completed = FALSE: de dos reclamos
+        concurrentes solo uno completa la ronda; el otro no encuentra ronda abierta.
+        """
         connection = get_db_connection()
         try:
             with connection.cursor() as cursor:
-                # Obtener ronda actual
                 cursor.execute("""
-                    SELECT * FROM user_rounds 
+                    UPDATE user_rounds 
+                    SET is_completed = TRUE, is_reward_claimed = TRUE, completed_at = NOW()
                     WHERE user_id = %s AND business_id = %s AND is_completed = FALSE
-                    ORDER BY round_number DESC LIMIT 1
+                    RETURNING round_number
                 """, (user_id, business_id))
                 
                 current_round = cursor.fetchone()
                 if not current_round:
                     return False
+                LoyaltyState.record_round_completed(cursor, user_id, business_id)
                 
-                # Marcar como completada y premio reclamado
-                cursor.execute("""
-                    UPDATE user_rounds 
-                    SET is_completed = TRUE, is_reward_claimed = TRUE, completed_at = NOW()
-                    WHERE id = %s
-                """, (current_round['id'],))
-                
-                # Crear nueva ronda con progreso 0
-                next_round_number = current_round['round_number'] + 1
-                cursor.execute("""
-                    INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round,
-                                           round_start_date, is_completed, is_reward_claimed)
-                    VALUES (%s, %s, %s, 0, NOW(), FALSE, FALSE)
-                """, (user_id, business_id, next_round_number))
-                
+                # La siguiente ronda se crea con la próxima visita (UserVisit.register_visit)
                 connection.commit()
                 
-                log_info(f"Ronda {current_round['round_number']} completada, iniciada ronda {next_round_number}")
+                log_info(f"Ronda {current_round['round_number']} completada")
                 return True
                 
         except Exception as e:
@@ -132,50 +83,29 @@ class UserRound:
         finally:
             connection.close()
     
-    @staticmethod
-    def get_current_round_only(user_id: int, business_id: int) -> Optional[Dict]:
-        """Obtiene SOLO la ronda actual (no completada) para el endpoint /visits"""
-        connection = get_db_connection()
-        try:
-            with connection.cursor() as cursor:
-                # Buscar ronda actual (no completada)
-                cursor.execute("""
-                    SELECT * FROM user_rounds 
-                    WHERE user_id = %s AND business_id = %s AND is_completed = FALSE
-                    ORDER BY round_number DESC LIMIT 1
-                """, (user_id, business_id))
-                
-                result = cursor.fetchone()
-                return dict(result) if result else None
-                
-        except Exception as e:
-            log_error("Error obteniendo ronda actual", error=e)
-            return None
-        finally:
-            connection.close()
-    
     @staticmethod
     def get_user_round_stats(user_id: int, business_id: int) -> Dict:
-        """Obtiene estadísticas de rondas del usuario para un negocio"""
+        """Estadísticas de rondas del usuario para un negocio, leídas de loyalty_state"""
         connection = get_db_connection()
         try:
             with connection.cursor() as cursor:
-                # Obtener ronda actual
-                current_round = UserRound.get_or_create_current_round(user_id, business_id)
-                
-                # Contar rondas completadas
                 cursor.execute("""
-                    SELECT COUNT(*) as completed_rounds
-                    FROM user_rounds 
-                    WHERE user_id = %s AND business_id = %s AND is_completed = TRUE
+                    SELECT round_number, progress_in_round, completed_rounds
+                    FROM loyalty_state
+                    WHERE user_id = %s AND business_id = %s
                 """, (user_id, business_id))
                 
-                result = cursor.fetchone()
-                completed_rounds = result['completed_rounds'] if result else 0
+                state = cursor.fetchone()
+                if not state:
+                    return {"current_round": UserRound.virtual_round(user_id, business_id), "completed_rounds": 0}
+                
+                # La ronda abierta (o la siguiente, virtual, si la última se completó)
+                current_round = UserRound.virtual_round(user_id, business_id, state['round_number'])
+                current_round['progress_in_round'] = state['progress_in_round']
                 
                 return {
                     "current_round": current_round,
-                    "completed_rounds": completed_rounds
+                    "completed_rounds": state['completed_rounds']
                 }
                 
         except Exception as e:
@@ -185,51 +115,66 @@ class UserRound:
             connection.close()
     
     @staticmethod
-    def migrate_existing_visits(user_id: int, business_id: int) -> bool:
-        """Migra visitas existentes al sistema de rondas"""
+    def migrate_legacy_visits(batch_size: int = 1000) -> int:
+        """Migración única de visitas anteriores al sistema de rondas
+        
+        Cada (usuario, negocio) con visitas del mes actual y sin ninguna ronda recibe la
+        ronda 1 con ese progreso (tope: la meta de visitas del negocio). Procesa rangos de user_id de `batch_size`
+        usuarios con un INSERT ... SELECT por lote y commit por lote; es idempotente.
+        loyalty_state (ronda, progreso y contadores de visitas) se actualiza en la misma sentencia. Devuelve cuántas rondas creó.
+        """
         connection = get_db_connection()
+        created = 0
         try:
             with connection.cursor() as cursor:
-                # Verificar si ya tiene rondas
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM user_rounds 
-                    WHERE user_id = %s AND business_id = %s
-                """, (user_id, business_id))
+                cursor.execute("SELECT COALESCE(MIN(user_id), 0) AS first, COALESCE(MAX(user_id), -1) AS last FROM user_visits")
+                bounds = cursor.fetchone()
+                visit_month = datetime.now().strftime('%Y-%m')
                 
-                result = cursor.fetchone()
-                if result['count'] > 0:
-                    return True  # Ya migrado
-                
-                # Contar visitas existentes del mes actual
-                cursor.execute("""
-                    SELECT COUNT(*) as visits FROM user_visits 
-                    WHERE user_id = %s AND business_id = %s 
-                    AND visit_month = TO_CHAR(NOW(), 'YYYY-MM')
-                """, (user_id, business_id))
-                
-                result = cursor.fetchone()
-                existing_visits = result['visits'] if result else 0
-                
-                if existing_visits > 0:
-                    # Obtener max_visits_per_round del negocio (asumiendo 6 por defecto)
-                    max_visits = 6
-                    
-                    # Crear ronda inicial con el progreso actual
-                    progress = min(existing_visits, max_visits)
-                    
+                for start in range(bounds['first'], bounds['last'] + 1, batch_size):
                     cursor.execute("""
-                        INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round,
-                                               round_start_date, is_completed, is_reward_claimed)
-                        VALUES (%s, %s, 1, %s, NOW(), FALSE, FALSE)
-                    """, (user_id, business_id, progress))
-                    
+                        WITH created AS (
+                            INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round,
+                                                     round_start_date, is_completed, is_reward_claimed)
+                            SELECT uv.user_id, uv.business_id, 1, LEAST(COUNT(*), COALESCE(b.visits_for_prize, 6)),
+                                   NOW(), FALSE, FALSE
+                            FROM user_visits uv
+                            JOIN businesses b ON b.id = uv.business_id
+                            WHERE uv.user_id >= %s AND uv.user_id < %s AND uv.visit_month = %s
+                              AND NOT EXISTS (
+                                  SELECT 1 FROM user_rounds ur
+                                  WHERE ur.user_id = uv.user_id AND ur.business_id = uv.business_id
+                              )
+                            GROUP BY uv.user_id, uv.business_id, b.visits_for_prize
+                            RETURNING user_id, business_id, round_number, progress_in_round
+                        )
+                        INSERT INTO loyalty_state (user_id, business_id, round_number, progress_in_round,
+                                                   total_visits, visit_month, month_visits, last_visit_id, last_visit_at)
+                        SELECT c.user_id, c.business_id, c.round_number, c.progress_in_round,
+                               visits.total_visits, %s, visits.month_visits, visits.last_visit_id, visits.last_visit_at
+                        FROM created c
+                        CROSS JOIN LATERAL (
+                            SELECT COUNT(*) AS total_visits,
+                                   COUNT(*) FILTER (WHERE uv.visit_month = %s) AS month_visits,
+                                   MAX(uv.id) AS last_visit_id, MAX(uv.visit_date) AS last_visit_at
+                            FROM user_visits uv
+                            WHERE uv.user_id = c.user_id AND uv.business_id = c.business_id
+                        ) visits
+                        ON CONFLICT (user_id, business_id) DO UPDATE
+                        SET round_number = EXCLUDED.round_number,
+                            progress_in_round = EXCLUDED.progress_in_round,
+                            total_visits = EXCLUDED.total_visits, visit_month = EXCLUDED.visit_month,
+                            month_visits = EXCLUDED.month_visits, last_visit_id = EXCLUDED.last_visit_id,
+                            last_visit_at = EXCLUDED.last_visit_at, updated_at = NOW()
+                    """, (start, start + batch_size, visit_month, visit_month, visit_month))
+                    created += cursor.rowcount
                     connection.commit()
-                    log_info(f"Migración completada: {existing_visits} visitas -> ronda 1 con progreso {progress}")
-                
-                return True
                 
+                log_info("Migración de visitas a rondas completada", rounds_created=created)
+                return created
         except Exception as e:
+            connection.rollback()
             log_error("Error en migración de visitas", error=e)
-            return False
+            raise
         finally:
-            connection.close()
\ No newline at end of file
+            connection.close()
@@ -1,7 +1,9 @@
 from app.config.database_sqlite import get_db_connection
+from app.config.sqlite_writer import run_write
 from app.utils.logger import log_info, log_error
 from app.models.user_type import UserType
-from typing import Optional, Dict
+from app.utils.search import fts5_query
+from typing import Optional, Dict, List
 
 class User:
     """Modelo para operaciones de usuario en la base de datos"""
@@ -9,9 +11,7 @@ class User:
     @staticmethod
     def create(nombre: str, email: Optional[str], telefono: Optional[str], hashed_password: str, user_type_hash: str) -> Dict:
         """Crea un nuevo usuario en la base de datos"""
-        connection = get_db_connection()
         try:
-            cursor = connection.cursor()
             # Obtener user_type_id por hash con fallback
             try:
                 user_type = UserType.get_by_hash(user_type_hash)
@@ -20,12 +20,7 @@ class User:
             except Exception:
                 user_type = {'id': 1, 'type_name': 'cliente'}
             
-            cursor.execute(
-                "INSERT INTO users (nombre, email, telefono, password, user_type_id) VALUES (?, ?, ?, ?, ?)",
-                (nombre, email, telefono, hashed_password, user_type['id'])
-            )
-            user_id = cursor.lastrowid
-            connection.commit()
+            user_id = run_write(User._insert_user_job, nombre, email, telefono, hashed_password, user_type['id'])
             return {
                 "id": user_id,
                 "nombre": nombre,
@@ -36,8 +31,15 @@ class User:
         except Exception as e:
             log_error("Error creando usuario", error=e)
             raise
-        finally:
-            connection.close()
+    
+    @staticmethod
+    def _insert_user_job(connection, nombre: str, email: Optional[str], telefono: Optional[str], hashed_password: str, user_type_id: int) -> int:
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO users (nombre, email, telefono, password, user_type_id) VALUES (?, ?, ?, ?, ?)",
+            (nombre, email, telefono, hashed_password, user_type_id)
+        )
+        return cursor.lastrowid
     
     @staticmethod
     def get_by_email(email: str) -> Optional[Dict]:
@@ -79,4 +81,29 @@ class User:
             row = cursor.fetchone()
             return dict(row) if row else None
         finally:
-            connection.close()
\ No newline at end of file
+            connection.close()
+    
+    @staticmethod
+    def search(term: str, limit: int = 20) -> List[Dict]:
+        """Busca usuarios por nombre o email con FTS5, ordenados por relevancia (bm25)"""
+        match = fts5_query(term)
+        if not match:
+            return []
+        connection = get_db_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT u.id, u.nombre, u.email, u.telefono, u.user_type_id as user_type,
+                       bm25(users_fts, 10.0, 5.0) as search_rank
+                FROM users_fts
+                JOIN users u ON u.id = users_fts.rowid
+                WHERE users_fts MATCH ?
+                ORDER BY search_rank
+                LIMIT ?
+            """, (match, limit))
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            log_error("Error buscando usuarios", error=e)
+            return []
+        finally:
+            connection.close()
@@ -1,76 +1,147 @@
 from app.config.database import get_db_connection
 from app.utils.logger import log_error, log_info
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, date, timedelta
+import time
 from jose import jwt
 from app.config.settings import settings
-import qrcode
-import io
-import base64
+from app.utils.qr_token import VISIT_TOKEN, decode_qr_token, encode_visit_token, is_compact_token
+from psycopg2.extras import execute_values
+
+# Inserta la visita (ON CONFLICT descarta el duplicado del día) y, solo si se insertó,
+# incrementa la ronda abierta o crea la siguiente y actualiza loyalty_state. Todo en un
+# viaje a la base de datos. La ronda es un upsert sobre el índice único de la ronda
+# abierta (ux_user_rounds_open): escaneos concurrentes se serializan en esa fila y cada
+# uno suma 1 al valor ya confirmado, sin incrementos perdidos ni rondas duplicadas.
+REGISTER_VISIT_SQL = """
+    WITH visit AS (
+        INSERT INTO user_visits (user_id, business_id, visit_date, visit_month, visit_day)
+        VALUES (%(user_id)s, %(business_id)s, %(visit_date)s, %(visit_month)s, %(visit_day)s)
+        ON CONFLICT (user_id, business_id, visit_day, day_seq) DO NOTHING
+        RETURNING id
+    ), round_state AS (
+        INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round,
+                                 round_start_date, is_completed, is_reward_claimed, last_visit_id)
+        SELECT %(user_id)s, %(business_id)s,
+               COALESCE((SELECT MAX(round_number) FROM user_rounds
+                         WHERE user_id = %(user_id)s AND business_id = %(business_id)s), 0) + 1,
+               1, NOW(), FALSE, FALSE, visit.id
+        FROM visit
+        ON CONFLICT (user_id, business_id) WHERE is_completed = FALSE DO UPDATE
+        SET progress_in_round = user_rounds.progress_in_round + 1,
+            last_visit_id = EXCLUDED.last_visit_id
+        RETURNING id, round_number, progress_in_round
+    ), state AS (
+        INSERT INTO loyalty_state (user_id, business_id, round_number, progress_in_round, total_visits,
+                                   visit_month, month_visits, last_visit_id, last_visit_at)
+        SELECT %(user_id)s, %(business_id)s, round_state.round_number, round_state.progress_in_round,
+               1, %(visit_month)s, 1, visit.id, %(visit_date)s
+        FROM visit, round_state
+        ON CONFLICT (user_id, business_id) DO UPDATE
+        SET round_number = EXCLUDED.round_number,
+            progress_in_round = EXCLUDED.progress_in_round,
+            total_visits = loyalty_state.total_visits + 1,
+            month_visits = CASE
+                WHEN loyalty_state.visit_month = EXCLUDED.visit_month THEN loyalty_state.month_visits + 1
+                WHEN loyalty_state.visit_month IS NULL OR loyalty_state.visit_month < EXCLUDED.visit_month THEN 1
+                ELSE loyalty_state.month_visits END,
+            visit_month = GREATEST(loyalty_state.visit_month, EXCLUDED.visit_month),
+            last_visit_id = CASE WHEN loyalty_state.last_visit_at > EXCLUDED.last_visit_at
+                                 THEN loyalty_state.last_visit_id ELSE EXCLUDED.last_visit_id END,
+            last_visit_at = GREATEST(loyalty_state.last_visit_at, EXCLUDED.last_visit_at),
+            updated_at = NOW()
+    )
+    SELECT visit.id AS visit_id, round_state.id AS round_id, round_state.round_number,
+           round_state.progress_in_round,
+           (SELECT visits_for_prize FROM businesses WHERE id = %(business_id)s) AS visits_for_prize
+    FROM visit, round_state
+"""
+
+# Tarjeta del usuario por negocio visitado, leída de loyalty_state (una fila por negocio,
+# sin agregar el historial de visitas ni rondas)
+USER_VISITS_SQL = """
+    SELECT ls.business_id, b.name AS business_name,
+           CASE WHEN ls.visit_month = %(visit_month)s THEN ls.month_visits ELSE 0 END AS visit_count,
+           ls.last_visit_at AS last_visit_date, ls.last_visit_id AS latest_visit_id,
+           SUM(ls.total_visits) OVER () AS total_visits,
+           ls.round_number, ls.progress_in_round, FALSE AS is_reward_claimed,
+           b.visits_for_prize AS max_visits_per_round
+    FROM loyalty_state ls
+    JOIN businesses b ON b.id = ls.business_id
+    WHERE ls.user_id = %(user_id)s AND ls.total_visits > 0
+    ORDER BY ls.last_visit_at DESC
+"""
+
+# Visitas de un lote offline: un INSERT de varias filas; devuelve solo las insertadas
+BULK_INSERT_VISITS_SQL = """
+    INSERT INTO user_visits (user_id, business_id, visit_date, visit_month, visit_day)
+    VALUES %s
+    ON CONFLICT (user_id, business_id, visit_day, day_seq) DO NOTHING
+    RETURNING id, user_id, visit_date, visit_day
+"""
+
+# Avance de rondas y loyalty_state para todos los clientes del lote en una sentencia:
+# cada fila de `batch` trae las visitas nuevas de un cliente (ver REGISTER_VISIT_SQL)
+BULK_ADVANCE_ROUNDS_SQL = """
+    WITH batch (user_id, business_id, visits, last_visit_id, last_visit_at, visit_month, month_visits) AS (
+        VALUES %s
+    ), round_state AS (
+        INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round,
+                                 round_start_date, is_completed, is_reward_claimed, last_visit_id)
+        SELECT batch.user_id, batch.business_id,
+               COALESCE((SELECT MAX(round_number) FROM user_rounds
+                         WHERE user_id = batch.user_id AND business_id = batch.business_id), 0) + 1,
+               batch.visits, NOW(), FALSE, FALSE, batch.last_visit_id
+        FROM batch
+        ON CONFLICT (user_id, business_id) WHERE is_completed = FALSE DO UPDATE
+        SET progress_in_round = user_rounds.progress_in_round + EXCLUDED.progress_in_round,
+            last_visit_id = EXCLUDED.last_visit_id
+        RETURNING user_id, id, round_number, progress_in_round
+    ), state AS (
+        INSERT INTO loyalty_state (user_id, business_id, round_number, progress_in_round, total_visits,
+                                   visit_month, month_visits, last_visit_id, last_visit_at)
+        SELECT batch.user_id, batch.business_id, round_state.round_number, round_state.progress_in_round,
+               batch.visits, batch.visit_month, batch.month_visits, batch.last_visit_id, batch.last_visit_at
+        FROM batch
+        JOIN round_state ON round_state.user_id = batch.user_id
+        ON CONFLICT (user_id, business_id) DO UPDATE
+        SET round_number = EXCLUDED.round_number,
+            progress_in_round = EXCLUDED.progress_in_round,
+            total_visits = loyalty_state.total_visits + EXCLUDED.total_visits,
+            month_visits = CASE
+                WHEN loyalty_state.visit_month = EXCLUDED.visit_month THEN loyalty_state.month_visits + EXCLUDED.month_visits
+                WHEN loyalty_state.visit_month IS NULL OR loyalty_state.visit_month < EXCLUDED.visit_month THEN EXCLUDED.month_visits
+                ELSE loyalty_state.month_visits END,
+            visit_month = GREATEST(loyalty_state.visit_month, EXCLUDED.visit_month),
+            last_visit_id = CASE WHEN loyalty_state.last_visit_at > EXCLUDED.last_visit_at
+                                 THEN loyalty_state.last_visit_id ELSE EXCLUDED.last_visit_id END,
+            last_visit_at = GREATEST(loyalty_state.last_visit_at, EXCLUDED.last_visit_at),
+            updated_at = NOW()
+    )
+    SELECT round_state.user_id, round_state.id AS round_id, round_state.round_number,
+           round_state.progress_in_round
+    FROM round_state
+"""
 
 class UserVisit:
     @staticmethod
-    def get_user_visits(user_id: int) -> List[Dict]:
-        from app.models.user_round import UserRound
-        
+    def get_user_visits(user_id: int) -> Dict:
+        """Ronda actual, visitas del mes y última visita por negocio en una sola consulta"""
         connection = get_db_connection()
         try:
             with connection.cursor() as cursor:
-                # Obtener negocios donde el usuario tiene visitas
-                cursor.execute("""
-                    SELECT DISTINCT uv.business_id, b.name as business_name,
-                           b.visits_for_prize as max_visits_per_round,
-                           MAX(uv.visit_date) as last_visit_date,
-                           MAX(uv.id) as latest_visit_id
-                    FROM user_visits uv
-                    JOIN businesses b ON uv.business_id = b.id
-                    WHERE uv.user_id = %s
-                    GROUP BY uv.business_id, b.name, b.visits_for_prize
-                    ORDER BY last_visit_date DESC
-                """, (user_id,))
-                businesses = cursor.fetchall()
+                visit_month = datetime.now().strftime('%Y-%m')
+                cursor.execute(USER_VISITS_SQL, {"user_id": user_id, "visit_month": visit_month})
+                rows = cursor.fetchall()
                 
-                # Para cada negocio, obtener SOLO la ronda actual
+                total = rows[0]['total_visits'] if rows else 0
                 current_rounds = []
-                for business in businesses:
-                    business_id = business['business_id']
-                    
-                    # Migrar visitas existentes si es necesario
-                    UserRound.migrate_existing_visits(user_id, business_id)
-                    
-                    # Obtener SOLO la ronda actual
-                    current_round = UserRound.get_current_round_only(user_id, business_id)
-                    
-                    if not current_round:
-                        # Si no hay ronda actual, crear una
-                        current_round = UserRound.get_or_create_current_round(user_id, business_id)
-                    
-                    if current_round:
-                        # Contar visitas del mes actual para esta ronda
-                        cursor.execute("""
-                            SELECT COUNT(*) as visit_count FROM user_visits 
-                            WHERE user_id = %s AND business_id = %s 
-                            AND visit_month = TO_CHAR(NOW(), 'YYYY-MM')
-                        """, (user_id, business_id))
-                        
-                        visit_count = cursor.fetchone()['visit_count']
-                        
-                        round_data = {
-                            'business_id': business_id,
-                            'visit_month': datetime.now().strftime('%Y-%m'),
-                            'business_name': business['business_name'],
-                            'visit_count': visit_count,
-                            'round_number': current_round['round_number'],
-                            'progress_in_round': current_round['progress_in_round'],
-                            'max_visits_per_round': business['max_visits_per_round'] or 6,
-                            'is_reward_claimed': current_round['is_reward_claimed'],
-                            'last_visit_date': business['last_visit_date'],
-                            'latest_visit_id': business['latest_visit_id']
-                        }
-                        current_rounds.append(round_data)
-                
-                cursor.execute("SELECT COUNT(*) as total FROM user_visits WHERE user_id = %s", (user_id,))
-                total = cursor.fetchone()['total']
+                for row in rows:
+                    round_data = dict(row)
+                    round_data.pop('total_visits')
+                    round_data['visit_month'] = visit_month
+                    round_data['max_visits_per_round'] = round_data['max_visits_per_round'] or 6
+                    current_rounds.append(round_data)
                 
                 return {"data": current_rounds, "total_visits": total}
         except Exception as e:
@@ -80,62 +151,148 @@ class UserVisit:
             connection.close()
     
     @staticmethod
-    def generate_qr_code(user_id: int, business_id: int, visit_date: datetime) -> Optional[str]:
-        """Genera código QR sin guardarlo en BD"""
+    def create_qr_token(user_id: int, business_id: int, visit_date: datetime) -> str:
+        """Token firmado del QR de visita (la imagen la renderiza app.utils.qr_renderer)"""
+        if settings.qr_token_format == "compact":
+            return encode_visit_token(
+                user_id, business_id, int(visit_date.timestamp()), int(time.time()) + 24 * 3600, settings.jwt_secret_key
+            )
+        qr_payload = {
+            "user_id": user_id,
+            "business_id": business_id,
+            "visit_timestamp": int(visit_date.timestamp()),
+            "exp": datetime.utcnow() + timedelta(hours=24)
+        }
+        return jwt.encode(qr_payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    
+    @staticmethod
+    def register_visit(user_id: int, business_id: int, visit_date: datetime) -> Optional[Dict]:
+        """Registra la visita y avanza la ronda abierta en una sola sentencia
+        
+        La clave única (user_id, business_id, visit_day) descarta el segundo escaneo del
+        mismo día: en ese caso devuelve None. Si no hay ronda abierta se crea la siguiente
+        con progreso 1. Devuelve visit_id, round_id, round_number, progress_in_round y
+        visits_for_prize.
+        """
+        connection = get_db_connection()
         try:
-            qr_payload = {
-                "user_id": user_id,
-                "business_id": business_id,
-                "visit_timestamp": int(visit_date.timestamp()),
-                "exp": datetime.utcnow() + timedelta(hours=24)
-            }
-            qr_data = jwt.encode(qr_payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+            with connection.cursor() as cursor:
+                cursor.execute(REGISTER_VISIT_SQL, {
+                    "user_id": user_id,
+                    "business_id": business_id,
+                    "visit_date": visit_date,
+                    "visit_month": visit_date.strftime("%Y-%m"),
+                    "visit_day": visit_date.date()
+                })
+                registered = cursor.fetchone()
+                connection.commit()
+                
+                if not registered:
+                    return None
+                
+                log_info(
+                    "Visita registrada",
+                    user_id=user_id, business_id=business_id,
+                    round=registered['round_number'], progress=registered['progress_in_round']
+                )
+                return dict(registered)
         except Exception as e:
-            log_error("Error generando QR code", error=e)
-            return None
+            connection.rollback()
+            log_error("Error registrando visita", error=e)
+            raise
+        finally:
+            connection.close()
     
     @staticmethod
-    def register_visit(user_id: int, business_id: int, visit_date: datetime) -> bool:
-        """Registra visita efectiva en BD y actualiza progreso de ronda"""
-        from app.models.user_round import UserRound
+    def register_visits_bulk(business_id: int, visits: List[Tuple[int, datetime]]) -> Dict[Tuple[int, date], Dict]:
+        """Registra un lote de visitas (user_id, visit_date) de un negocio en una transacción
+        
+        Inserta todas las visitas con un INSERT de varias filas; la clave única del día
+        descarta las ya registradas. Luego avanza la ronda y loyalty_state de cada cliente
+        con las visitas nuevas en una sola sentencia. Devuelve, por (user_id, visit_day)
+        insertado, visit_id, round_number, progress_in_round y visits_for_prize.
+        """
+        if not visits:
+            return {}
         
         connection = get_db_connection()
         try:
             with connection.cursor() as cursor:
-                visit_month = visit_date.strftime("%Y-%m")
-                cursor.execute("""
-                    INSERT INTO user_visits (user_id, business_id, visit_date, visit_month)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                """, (user_id, business_id, visit_date, visit_month))
+                # Orden estable por cliente para que lotes concurrentes bloqueen en el mismo orden
+                rows = [
+                    (user_id, business_id, visit_date, visit_date.strftime("%Y-%m"), visit_date.date())
+                    for user_id, visit_date in sorted(visits, key=lambda visit: (visit[0], visit[1]))
+                ]
+                inserted = execute_values(cursor, BULK_INSERT_VISITS_SQL, rows, page_size=len(rows), fetch=True)
+                if not inserted:
+                    connection.commit()
+                    return {}
+                
+                # Visitas nuevas por cliente: total, la más reciente y las del mes más reciente
+                per_user: Dict[int, Dict] = {}
+                for visit in sorted(inserted, key=lambda visit: visit['visit_date']):
+                    month = visit['visit_date'].strftime("%Y-%m")
+                    summary = per_user.setdefault(visit['user_id'], {"visits": 0, "month": month, "month_visits": 0})
+                    summary['visits'] += 1
+                    summary['month_visits'] = summary['month_visits'] + 1 if summary['month'] == month else 1
+                    summary.update(month=month, last_visit_id=visit['id'], last_visit_at=visit['visit_date'])
+                
+                batch = [
+                    (user_id, business_id, summary['visits'], summary['last_visit_id'],
+                     summary['last_visit_at'], summary['month'], summary['month_visits'])
+                    for user_id, summary in sorted(per_user.items())
+                ]
+                rounds = execute_values(cursor, BULK_ADVANCE_ROUNDS_SQL, batch, page_size=len(batch), fetch=True)
                 
-                visit_id = cursor.fetchone()['id']
+                cursor.execute("SELECT visits_for_prize FROM businesses WHERE id = %s", (business_id,))
+                business = cursor.fetchone()
                 connection.commit()
                 
-                # Actualizar progreso de ronda
-                UserRound.update_round_progress(user_id, business_id, visit_id)
+                visits_for_prize = business['visits_for_prize'] if business else None
+                round_by_user = {round_data['user_id']: round_data for round_data in rounds}
+                registered = {}
+                for visit in inserted:
+                    round_data = round_by_user[visit['user_id']]
+                    registered[(visit['user_id'], visit['visit_day'])] = {
+                        "visit_id": visit['id'],
+                        "round_id": round_data['round_id'],
+                        "round_number": round_data['round_number'],
+                        "progress_in_round": round_data['progress_in_round'],
+                        "visits_for_prize": visits_for_prize
+                    }
                 
-                log_info(f"Visita registrada: usuario {user_id}, negocio {business_id}")
-                return True
+                log_info("Lote de visitas registrado", business_id=business_id,
+                         received=len(rows), inserted=len(inserted), customers=len(batch))
+                return registered
         except Exception as e:
-            log_error("Error registrando visita", error=e)
-            return False
+            connection.rollback()
+            log_error("Error registrando lote de visitas", error=e)
+            raise
         finally:
             connection.close()
     
     @staticmethod
-    def verify_qr_code(qr_token: str) -> Optional[Dict]:
-        """Verifica y decodifica un código QR encriptado"""
+    def verify_qr_code(qr_token: str, scanned_at: Optional[datetime] = None) -> Optional[Dict]:
+        """Verifica y decodifica un código QR encriptado (token compacto o JWT)
+        
+        Con `scanned_at` (escaneos offline) la expiración se evalúa contra el momento del
+        escaneo y no contra el de la carga.
+        """
         try:
-            payload = jwt.decode(qr_token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+            if is_compact_token(qr_token):
+                payload = decode_qr_token(qr_token, settings.jwt_secret_key, VISIT_TOKEN)
+                checked_at = scanned_at.timestamp() if scanned_at else time.time()
+                if payload["exp"] < checked_at:
+                    return None
+            elif scanned_at is None:
+                payload = jwt.decode(qr_token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+            else:
+                payload = jwt.decode(
+                    qr_token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm],
+                    options={"verify_exp": False}
+                )
+                if payload.get("exp") is not None and payload["exp"] < scanned_at.timestamp():
+                    return None
             return {
                 "user_id": payload.get("user_id"),
                 "business_id": payload.get("business_id"),
@@ -1,112 +1,114 @@
 from app.config.database_sqlite import get_db_connection
+from app.config.sqlite_writer import run_write
 from app.utils.logger import log_error
-from typing import List, Dict
+from typing import Dict, Optional
 from datetime import datetime
 
+# Mismo resultado que la consulta de PostgreSQL; SQLite no tiene LATERAL, así que la ronda
+# más reciente de cada negocio se elige con ROW_NUMBER() sobre las rondas del usuario.
+USER_VISITS_SQL = """
+    WITH visit_stats AS (
+        SELECT business_id,
+               SUM(visit_month = :visit_month) AS visit_count,
+               MAX(visit_date) AS last_visit_date,
+               MAX(id) AS latest_visit_id,
+               SUM(COUNT(*)) OVER () AS total_visits
+        FROM user_visits
+        WHERE user_id = :user_id
+        GROUP BY business_id
+    ), latest_round AS (
+        SELECT business_id, round_number, progress_in_round, is_completed, is_reward_claimed,
+               ROW_NUMBER() OVER (PARTITION BY business_id ORDER BY round_number DESC) AS position
+        FROM user_rounds
+        WHERE user_id = :user_id
+    )
+    SELECT vs.business_id, b.name AS business_name,
+           vs.visit_count, vs.last_visit_date, vs.latest_visit_id, vs.total_visits,
+           CASE WHEN r.is_completed = 0 THEN r.round_number
+                ELSE COALESCE(r.round_number, 0) + 1 END AS round_number,
+           CASE WHEN r.is_completed = 0 THEN r.progress_in_round ELSE 0 END AS progress_in_round,
+           CASE WHEN r.is_completed = 0 THEN r.is_reward_claimed ELSE 0 END AS is_reward_claimed,
+           b.visits_for_prize AS max_visits_per_round
+    FROM visit_stats vs
+    JOIN businesses b ON b.id = vs.business_id
+    LEFT JOIN latest_round r ON r.business_id = vs.business_id AND r.position = 1
+    ORDER BY vs.last_visit_date DESC
+"""
+
 class UserVisit:
     @staticmethod
-    def get_user_visits_with_rounds(user_id: int) -> List[Dict]:
+    def get_user_visits_with_rounds(user_id: int) -> Dict:
+        """Una fila por negocio visitado: ronda actual, visitas del mes y última visita"""
         connection = get_db_connection()
         try:
             cursor = connection.cursor()
-            cursor.execute("""
-                SELECT 
-                    b.id as business_id,
-                    b.name as business_name,
-                    COUNT(v.id) as visit_count,
-                    MAX(v.visit_date) as last_visit_date,
-                    MAX(v.id) as latest_visit_id,
-                    COALESCE(r.round_number, 1) as round_number,
-                    COALESCE(r.progress_in_round, 0) as progress_in_round,
-                    b.visits_for_prize as max_visits_per_round,
-                    COALESCE(r.is_reward_claimed, 0) as is_reward_claimed,
-                    v.visit_month
-                FROM user_visits v
-                JOIN businesses b ON v.business_id = b.id
-                LEFT JOIN user_rounds r ON r.user_id = v.user_id AND r.business_id = v.business_id
-                WHERE v.user_id = ?
-                GROUP BY b.id, b.name, v.visit_month, r.round_number, r.progress_in_round, r.is_reward_claimed
-                ORDER BY last_visit_date DESC
-            """, (user_id,))
+            visit_month = datetime.now().strftime('%Y-%m')
+            cursor.execute(USER_VISITS_SQL, {"user_id": user_id, "visit_month": visit_month})
             
-            visits = cursor.fetchall()
-            return [dict(visit) for visit in visits]
+            rows = cursor.fetchall()
+            total = rows[0]['total_visits'] if rows else 0
+            visits = []
+            for row in rows:
+                visit = dict(row)
+                visit.pop('total_visits')
+                visit['visit_month'] = visit_month
+                visits.append(visit)
+            return {"data": visits, "total_visits": total}
         except Exception as e:
             log_error("Error obteniendo visitas del usuario", error=e)
-            return []
+            return {"data": [], "total_visits": 0}
         finally:
             connection.close()
     
     @staticmethod
-    def register_visit(user_id: int, business_id: int, visit_date: datetime) -> int:
-        """Registra una nueva visita en la base de datos"""
-        connection = get_db_connection()
+    def register_visit(user_id: int, business_id: int, visit_date: datetime) -> Optional[int]:
+        """Registra una nueva visita; None si ya hay una visita ese día en el negocio"""
         try:
-            cursor = connection.cursor()
-            
-            # Verificar si ya existe una visita para este usuario, negocio y fecha
-            visit_month = visit_date.strftime('%Y-%m')
-            cursor.execute("""
-                SELECT id FROM user_visits 
-                WHERE user_id = ? AND business_id = ? AND visit_month = ?
-                AND DATE(visit_date) = DATE(?)
-            """, (user_id, business_id, visit_month, visit_date.isoformat()))
-            
-            existing_visit = cursor.fetchone()
-            if existing_visit:
-                return existing_visit['id']
-            
-            # Insertar nueva visita
-            cursor.execute("""
-                INSERT INTO user_visits (user_id, business_id, visit_date, visit_month)
-                VALUES (?, ?, ?, ?)
-            """, (user_id, business_id, visit_date.isoformat(), visit_month))
-            
-            visit_id = cursor.lastrowid
-            connection.commit()
-            
-            # Actualizar progreso en rondas
-            UserVisit._update_user_round(user_id, business_id, visit_id, connection)
-            
-            return visit_id
+            return run_write(UserVisit._register_visit_job, user_id, business_id, visit_date)
         except Exception as e:
-            connection.rollback()
             log_error("Error registrando visita", error=e)
             raise e
-        finally:
-            connection.close()
+    
+    @staticmethod
+    def _register_visit_job(connection, user_id: int, business_id: int, visit_date: datetime) -> Optional[int]:
+        """Inserta la visita y avanza la ronda en la misma transacción (sin commit)
+        
+        La clave única (user_id, business_id, visit_day) descarta el duplicado del día sin
+        consulta previa. SQLite no admite INSERT/UPDATE dentro de un CTE, así que la ronda
+        se actualiza con una segunda sentencia solo cuando la visita se insertó.
+        """
+        cursor = connection.cursor()
+        cursor.execute("""
+            INSERT INTO user_visits (user_id, business_id, visit_date, visit_month, visit_day)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, business_id, visit_day) DO NOTHING
+            RETURNING id
+        """, (user_id, business_id, visit_date.isoformat(), visit_date.strftime('%Y-%m'), visit_date.date().isoformat()))
+        
+        inserted = cursor.fetchone()
+        if not inserted:
+            return None
+        
+        visit_id = inserted['id']
+        UserVisit._update_user_round(user_id, business_id, visit_id, connection)
+        return visit_id
     
     @staticmethod
     def _update_user_round(user_id: int, business_id: int, visit_id: int, connection):
-        """Actualiza el progreso del usuario en la ronda actual"""
+        """Avanza la ronda abierta o crea la siguiente (el llamador hace commit)
+        
+        Upsert sobre el índice único de la ronda abierta (ux_user_rounds_open): el
+        incremento ocurre en la base de datos, nunca leído y reescrito desde Python.
+        """
         try:
             cursor = connection.cursor()
-            
-            # Obtener o crear ronda actual
             cursor.execute("""
-                SELECT id, progress_in_round FROM user_rounds
-                WHERE user_id = ? AND business_id = ? AND is_completed = 0
-                ORDER BY round_number DESC LIMIT 1
-            """, (user_id, business_id))
-            
-            current_round = cursor.fetchone()
-            
-            if current_round:
-                # Actualizar progreso en ronda existente
-                new_progress = current_round['progress_in_round'] + 1
-                cursor.execute("""
-                    UPDATE user_rounds 
-                    SET progress_in_round = ?, last_visit_id = ?
-                    WHERE id = ?
-                """, (new_progress, visit_id, current_round['id']))
-            else:
-                # Crear nueva ronda
-                cursor.execute("""
-                    INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, last_visit_id)
-                    VALUES (?, ?, 1, 1, ?)
-                """, (user_id, business_id, visit_id))
-            
-            connection.commit()
+                INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, last_visit_id)
+                SELECT ?, ?, COALESCE(MAX(round_number), 0) + 1, 1, ?
+                FROM user_rounds WHERE user_id = ? AND business_id = ?
+                ON CONFLICT (user_id, business_id) WHERE is_completed = 0 DO UPDATE
+                SET progress_in_round = progress_in_round + 1, last_visit_id = excluded.last_visit_id
+            """, (user_id, business_id, visit_id, user_id, business_id))
         except Exception as e:
             log_error("Error actualizando ronda de usuario", error=e)
-            raise e
\ No newline at end of file
+            raise e
@@ -38,22 +38,33 @@ async def get_system_stats(
     """Obtiene estadísticas generales del sistema"""
     return AdminController.get_system_stats()
 
+@router.get("/metrics")
+async def get_runtime_metrics(
+    current_user: dict = Depends(AdminMiddleware.require_admin)
+):
+    """Obtiene métricas de ejecución (pool de conexiones a base de datos)"""
+    return AdminController.get_runtime_metrics()
+
 # Gestión de Negocios
 @router.get("/businesses")
 async def get_all_businesses(
-    page: int = Query(1, ge=1, description="Número de página"),
+    page: int = Query(1, ge=1, description="Número de página (obsoleto, usar cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Elementos por página"),
-    search: Optional[str] = Query(None, description="Búsqueda por nombre, categoría o dirección"),
+    search: Optional[str] = Query(None, description="Búsqueda indexada por nombre, categoría o dirección (ordenada por relevancia)"),
+    cursor: Optional[str] = Query(None, description="Cursor next_cursor/prev_cursor de la respuesta anterior"),
+    include_total: bool = Query(False, description="Incluir total (aproximado sin filtros)"),
     current_user: dict = Depends(AdminMiddleware.require_admin)
 ):
     """
-    Obtiene todos los negocios con paginación y búsqueda
+    Obtiene todos los negocios con paginación por cursor y búsqueda
     
-    - **page**: Número de página (mínimo 1)
     - **limit**: Elementos por página (1-100)
-    - **search**: Término de búsqueda (opcional)
+    - **search**: Término de búsqueda; resultados por relevancia (opcional)
+    - **cursor**: Cursor opaco de la página siguiente/anterior (opcional)
+    - **include_total**: Incluir total de registros (opcional)
+    - **page**: Número de página con OFFSET (obsoleto)
     """
-    return AdminController.get_all_businesses(page, limit, search)
+    return AdminController.get_all_businesses(page, limit, search, cursor, include_total)
 
 @router.post("/businesses")
 async def create_business(
@@ -102,19 +113,23 @@ async def delete_business(
 # Gestión de Usuarios
 @router.get("/users")
 async def get_all_users(
-    page: int = Query(1, ge=1, description="Número de página"),
+    page: int = Query(1, ge=1, description="Número de página (obsoleto, usar cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Elementos por página"),
-    search: Optional[str] = Query(None, description="Búsqueda por nombre o email"),
+    search: Optional[str] = Query(None, description="Búsqueda indexada por nombre o email (ordenada por relevancia)"),
     user_type: Optional[str] = Query(None, description="Filtro por tipo de usuario (1=cliente, 2=negocio, 3=admin)"),
+    cursor: Optional[str] = Query(None, description="Cursor next_cursor/prev_cursor de la respuesta anterior"),
+    include_total: bool = Query(False, description="Incluir total (aproximado sin filtros)"),
     current_user: dict = Depends(AdminMiddleware.require_admin)
 ):
     """
-    Obtiene todos los usuarios con paginación y filtros
+    Obtiene todos los usuarios con paginación por cursor y filtros
     
-    - **page**: Número de página (mínimo 1)
     - **limit**: Elementos por página (1-100)
-    - **search**: Término de búsqueda (opcional)
+    - **search**: Término de búsqueda; resultados por relevancia (opcional)
     - **user_type**: Filtro por tipo (1=cliente, 2=negocio, 3=admin)
+    - **cursor**: Cursor opaco de la página siguiente/anterior (opcional)
+    - **include_total**: Incluir total de registros (opcional)
+    - **page**: Número de página con OFFSET (obsoleto)
     """
     # Convertir user_type de string a int o None
     user_type_int = None
@@ -124,7 +139,7 @@ async def get_all_users(
         except ValueError:
             pass
     
-    return AdminController.get_all_users(page, limit, search, user_type_int)
+    return AdminController.get_all_users(page, limit, search, user_type_int, cursor, include_total)
 
 @router.post("/users")
 async def create_user(
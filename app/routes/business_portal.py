@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Header, Response
 from app.controllers.dashboard_controller import DashboardController
 from app.controllers.reward_controller import RewardController
 from app.controllers.menu_controller import MenuController
 from app.models.audit_log import AuditLog
 from app.utils.role_middleware import require_business, RoleMiddleware
+from app.utils.idempotency import idempotency_store
 from app.schemas.reward import RewardCreate, RewardUpdate
-from app.schemas.business import MenuItemCreate, MenuItemUpdate, LoyaltyConfigUpdate, QRValidation, BusinessProfileUpdate
+from app.schemas.business import MenuItemCreate, MenuItemUpdate, LoyaltyConfigUpdate, QRValidation, QRBatchValidation, BusinessProfileUpdate
 from typing import Optional
 from datetime import datetime
 
@@ -18,7 +19,7 @@ async def get_dashboard(
     current_user: dict = Depends(RoleMiddleware.validate_business_ownership)
 ):
     """Dashboard completo del negocio"""
-    return DashboardController.get_business_dashboard(business_id, current_user)
+    return await DashboardController.get_business_dashboard(business_id, current_user)
 
 # Perfil del Negocio
 @router.get("/{business_id}/profile")
@@ -172,22 +173,34 @@ async def get_audit_logs(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     action_type: Optional[str] = Query(None),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
     current_user: dict = Depends(RoleMiddleware.validate_business_ownership)
 ):
-    """Obtiene logs de auditoría del negocio"""
+    """Obtiene logs de auditoría del negocio (paginación por cursor; offset es obsoleto)"""
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    from app.utils.pagination import InvalidCursorError
+    
     start_dt = datetime.fromisoformat(start_date) if start_date else None
     end_dt = datetime.fromisoformat(end_date) if end_date else None
     
-    logs = AuditLog.get_business_logs(
-        business_id=business_id,
-        start_date=start_dt,
-        end_date=end_dt,
-        action_type=action_type,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        logs = await run_in_threadpool(
+            AuditLog.get_business_logs,
+            business_id=business_id,
+            start_date=start_dt,
+            end_date=end_dt,
+            action_type=action_type,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {"success": True, "data": logs}
 
@@ -206,11 +219,30 @@ async def get_customer_progress(
 @router.post("/validate-qr")
 async def validate_qr(
     qr_data: QRValidation,
-    current_user: dict = Depends(RoleMiddleware.validate_business_user)
+    response: Response,
+    current_user: dict = Depends(RoleMiddleware.validate_business_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
-    """Valida código QR para registrar visita"""
+    """Valida código QR para registrar visita
+    
+    Con el header Idempotency-Key, los reintentos del escáner reciben la primera
+    respuesta sin volver a ejecutar el registro. Las fallas transitorias responden
+    5xx y no se guardan: el reintento con la misma clave vuelve a intentar el registro.
+    """
+    return await idempotency_store.run(
+        idempotency_key,
+        f"business.validate-qr:{current_user['id']}",
+        qr_data,
+        lambda: _register_scan(qr_data, current_user),
+        response
+    )
+
+async def _register_scan(qr_data: QRValidation, current_user: dict):
+    """Verifica el QR, la propiedad del negocio y registra la visita"""
     from app.models.user_visit import UserVisit
-    from app.config.database import get_db_connection
+    from app.config.database_async import get_async_connection
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
     from datetime import datetime
     
     try:
@@ -235,136 +267,143 @@ async def validate_qr(
             }
         
         # Verificar ownership del negocio
-        connection = get_db_connection()
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT owner_user_id, name FROM businesses 
-                    WHERE id = %s AND active = 1
-                """, (qr_data.business_id,))
-                
-                business = cursor.fetchone()
-                if not business:
-                    return {
-                        "success": False, 
-                        "error": "Negocio no encontrado",
-                        "message": "No se pudo encontrar la información del negocio. Contacta al soporte técnico."
-                    }
-                
-                if business['owner_user_id'] != current_user['id']:
-                    return {
-                        "success": False, 
-                        "error": "Sin permisos",
-                        "message": "No tienes permisos para registrar visitas en este negocio. Verifica que estés usando la cuenta correcta."
-                    }
-                
-                # Obtener nombre del usuario
-                cursor.execute("SELECT nombre FROM users WHERE id = %s", (user_id,))
-                user = cursor.fetchone()
-                if not user:
-                    return {
-                        "success": False, 
-                        "error": "Cliente no encontrado",
-                        "message": "No se pudo encontrar la información del cliente. Es posible que la cuenta haya sido eliminada."
-                    }
-                
-                # Verificar si ya visitó en los últimos 5 minutos
-                from datetime import timedelta
-                five_minutes_ago = datetime.now() - timedelta(minutes=5)
-                
-                cursor.execute("""
-                    SELECT visit_date FROM user_visits 
-                    WHERE user_id = %s AND business_id = %s AND visit_date >= %s
-                    ORDER BY visit_date DESC LIMIT 1
-                """, (user_id, qr_data.business_id, five_minutes_ago))
-                
-                recent_visit = cursor.fetchone()
-                if recent_visit:
-                    last_visit = recent_visit['visit_date']
-                    time_diff = datetime.now() - last_visit
-                    minutes_ago = int(time_diff.total_seconds() / 60)
-                    
-                    return {
-                        "success": False, 
-                        "error": "Visita ya registrada",
-                        "message": f"{user['nombre']} ya registró una visita hace {minutes_ago} minuto(s). Debe esperar 5 minutos entre visitas."
-                    }
-                
-                # Registrar visita
-                success = UserVisit.register_visit(user_id, qr_data.business_id, datetime.now())
-                if not success:
-                    return {
-                        "success": False, 
-                        "error": "Error al registrar",
-                        "message": "Ocurrió un problema al registrar la visita. Inténtalo nuevamente en unos momentos."
-                    }
-                
-                # Enviar notificaciones push al cliente
-                from app.services.push_notification_service import PushNotificationService
-                from app.services.websocket_service import websocket_service
-                import asyncio
-                
-                try:
-                    # Obtener progreso actual del usuario
-                    cursor.execute("""
-                        SELECT ur.progress_in_round, b.visits_for_prize
-                        FROM user_rounds ur
-                        JOIN businesses b ON ur.business_id = b.id
-                        WHERE ur.user_id = %s AND ur.business_id = %s AND ur.is_completed = 0
-                        ORDER BY ur.id DESC LIMIT 1
-                    """, (user_id, qr_data.business_id))
-                    
-                    progress_data = cursor.fetchone()
-                    if progress_data:
-                        progress = progress_data['progress_in_round']
-                        max_visits = progress_data['visits_for_prize']
-                    else:
-                        progress = 1
-                        max_visits = 6
-                    
-                    # Preparar datos para notificación
-                    visit_notification_data = {
-                        'id': None,
-                        'progress_in_round': progress,
-                        'max_visits_per_round': max_visits
-                    }
-                    
-                    # Enviar notificación push
-                    push_service = PushNotificationService()
-                    push_service.notify_visit_registered(
-                        user_id,
-                        business['name'],
-                        visit_notification_data
-                    )
-                    
-                    # Enviar WebSocket
-                    asyncio.create_task(
-                        websocket_service.notify_visit_registered(
-                            user_id,
-                            qr_data.business_id,
-                            visit_notification_data
-                        )
-                    )
-                    
-                except Exception as notification_error:
-                    # Log error pero no fallar la respuesta
-                    print(f"Error enviando notificaciones: {notification_error}")
-                
+        async with get_async_connection() as connection:
+            business = await connection.fetchrow("""
+                SELECT owner_user_id, name FROM businesses 
+                WHERE id = $1 AND active = TRUE
+            """, qr_data.business_id)
+            
+            if not business:
+                return {
+                    "success": False, 
+                    "error": "Negocio no encontrado",
+                    "message": "No se pudo encontrar la información del negocio. Contacta al soporte técnico."
+                }
+            
+            if business['owner_user_id'] != current_user['id']:
                 return {
-                    "success": True,
-                    "message": f"¡Visita registrada exitosamente para {user['nombre']}!",
-                    "data": {
-                        "customer_name": user['nombre'],
-                        "business_name": business['name'],
-                        "visit_date": datetime.now().isoformat()
-                    }
+                    "success": False, 
+                    "error": "Sin permisos",
+                    "message": "No tienes permisos para registrar visitas en este negocio. Verifica que estés usando la cuenta correcta."
                 }
-        finally:
-            connection.close()
             
-    except Exception as e:
+            # Obtener nombre del usuario
+            user = await connection.fetchrow("SELECT nombre FROM users WHERE id = $1", user_id)
+            if not user:
+                return {
+                    "success": False, 
+                    "error": "Cliente no encontrado",
+                    "message": "No se pudo encontrar la información del cliente. Es posible que la cuenta haya sido eliminada."
+                }
+        
+        # Registrar visita (la clave única del día descarta el escaneo repetido). Fuera del bloque
+        # async: la conexión asyncpg ya volvió al pool mientras se espera la del pool síncrono
+        try:
+            registered = await run_in_threadpool(UserVisit.register_visit, user_id, qr_data.business_id, datetime.now())
+        except Exception:
+            # Falla transitoria: con excepción (y no con un cuerpo) para que la
+            # Idempotency-Key no la guarde y el reintento vuelva a registrar
+            raise HTTPException(
+                status_code=503,
+                detail="Ocurrió un problema al registrar la visita. Inténtalo nuevamente en unos momentos."
+            )
+        
+        if not registered:
+            return {
+                "success": False, 
+                "error": "Visita ya registrada",
+                "message": f"{user['nombre']} ya registró su visita de hoy en este negocio."
+            }
+        
+        # Enviar notificaciones push al cliente
+        from app.services.push_notification_service import PushNotificationService
+        from app.services.websocket_service import websocket_service
+        import asyncio
+        
+        try:
+            # Progreso devuelto por el mismo INSERT que registró la visita
+            progress = registered['progress_in_round']
+            max_visits = registered['visits_for_prize'] or 6
+            
+            # Preparar datos para notificación
+            visit_notification_data = {
+                'id': None,
+                'progress_in_round': progress,
+                'max_visits_per_round': max_visits
+            }
+            
+            # Enviar notificación push
+            push_service = PushNotificationService()
+            push_service.notify_visit_registered(
+                user_id,
+                business['name'],
+                visit_notification_data
+            )
+            
+            # Enviar WebSocket
+            asyncio.create_task(
+                websocket_service.notify_visit_registered(
+                    user_id,
+                    qr_data.business_id,
+                    visit_notification_data
+                )
+            )
+            
+        except Exception as notification_error:
+            # Log error pero no fallar la respuesta
+            print(f"Error enviando notificaciones: {notification_error}")
+        
         return {
-            "success": False, 
-            "error": "Error del sistema",
-            "message": "Ocurrió un error inesperado en el sistema. Por favor, inténtalo nuevamente. Si el problema persiste, contacta al soporte técnico."
-        }
\ No newline at end of file
+            "success": True,
+            "message": f"¡Visita registrada exitosamente para {user['nombre']}!",
+            "data": {
+                "customer_name": user['nombre'],
+                "business_name": business['name'],
+                "visit_date": datetime.now().isoformat()
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail="Ocurrió un error inesperado en el sistema. Por favor, inténtalo nuevamente. Si el problema persiste, contacta al soporte técnico."
+        )
+
+# Carga de escaneos offline
+@router.post("/validate-qr/batch")
+async def validate_qr_batch(
+    batch: QRBatchValidation,
+    current_user: dict = Depends(RoleMiddleware.validate_business_user)
+):
+    """Registra en una sola petición los escaneos guardados por el escáner sin conexión
+    
+    Cada escaneo trae el token QR y la fecha en que se hizo. Responde un resultado por
+    escaneo (registrada, duplicada o rechazada) en el mismo orden del lote.
+    """
+    from app.services.scan_batch_service import ScanBatchService
+    from app.config.settings import settings
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    
+    if len(batch.scans) > settings.offline_scan_batch_limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote excede el máximo de {settings.offline_scan_batch_limit} escaneos"
+        )
+    
+    try:
+        result = await run_in_threadpool(
+            ScanBatchService.process_batch,
+            batch.business_id,
+            current_user['id'],
+            [scan.model_dump() for scan in batch.scans]
+        )
+    except Exception:
+        raise HTTPException(status_code=500, detail="Error procesando el lote de escaneos")
+    
+    if not result["success"]:
+        status_code = {"Sin permisos": 403, "Negocio no encontrado": 404}.get(result["error"], 500)
+        raise HTTPException(status_code=status_code, detail=result["error"])
+    return result
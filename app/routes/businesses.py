@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
 from app.controllers.business_controller import BusinessController
 from app.utils.auth_simple import get_current_user
 
 router = APIRouter(prefix="/api/businesses", tags=["businesses"])
 
 @router.get("")
-async def get_businesses(current_user: dict = Depends(get_current_user)):
+async def get_businesses(
+    search: Optional[str] = Query(None, description="Búsqueda por nombre, categoría o dirección (ordenada por relevancia)"),
+    current_user: dict = Depends(get_current_user)
+):
     """Lista todos los negocios disponibles"""
-    return BusinessController.get_businesses(current_user)
+    return await BusinessController.get_businesses_async(current_user, search)
 
 @router.get("/{business_id}")
 async def get_business(business_id: int, current_user: dict = Depends(get_current_user)):
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Response
 from app.controllers.reward_controller import RewardController
 from app.schemas.reward import RewardCreate, RewardUpdate, CouponGenerate, CouponClaim, CouponRedeem, CouponQRValidation
 from app.utils.auth_middleware import get_current_user
+from app.utils.idempotency import idempotency_store
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
 
 router = APIRouter(prefix="/api/rewards", tags=["rewards"])
 
@@ -68,29 +71,71 @@ async def get_user_rewards(user_id: int, current_user: dict = Depends(get_curren
     """
     return RewardController.get_user_rewards(user_id)
 
+@router.get("/coupons/{coupon_id}/qr")
+async def get_coupon_qr_image(
+    coupon_id: int,
+    current_user: dict = Depends(get_current_user),
+    qr_format: str = Query("png", alias="format", pattern="^(png|svg)$"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
+):
+    """
+    Imagen del código QR de un cupón del usuario
+    
+    - **coupon_id**: ID del cupón
+    - **format**: `png` (por defecto) o `svg`
+    
+    El cupón guarda solo el token firmado; la imagen se renderiza al pedirla, pasa por
+    la caché de QR y se responde con ETag y Cache-Control (304 con If-None-Match).
+    """
+    return await RewardController.get_coupon_qr_image(coupon_id, current_user["id"], qr_format, if_none_match)
+
 @router.patch("/{coupon_id}/claim")
-async def claim_coupon(coupon_id: int, current_user: dict = Depends(get_current_user)):
+async def claim_coupon(
+    coupon_id: int,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Reclamar un cupón (usuario lo acepta)
     
     - **coupon_id**: ID del cupón a reclamar
     
     Cambia el estado de 'vigente' a 'reclamado'. El usuario acepta el premio.
+    Con el header Idempotency-Key, los reintentos reciben la primera respuesta.
     """
     coupon_data = CouponClaim(coupon_id=coupon_id)
-    return RewardController.claim_coupon(coupon_data, current_user["id"])
+    return await idempotency_store.run(
+        idempotency_key,
+        f"rewards.claim:{current_user['id']}",
+        coupon_data,
+        lambda: run_in_threadpool(RewardController.claim_coupon, coupon_data, current_user["id"]),
+        response
+    )
 
 @router.patch("/{coupon_id}/redeem")
-async def redeem_coupon(coupon_id: int, current_user: dict = Depends(get_current_user)):
+async def redeem_coupon(
+    coupon_id: int,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Redimir un cupón (usado en el negocio)
     
     - **coupon_id**: ID del cupón a redimir
     
     Cambia el estado de 'reclamado' a 'usado'. Se usa físicamente en el negocio.
+    Con el header Idempotency-Key, los reintentos reciben la primera respuesta.
     """
     coupon_data = CouponRedeem(coupon_id=coupon_id)
-    return RewardController.redeem_coupon(coupon_data, current_user["id"])
+    return await idempotency_store.run(
+        idempotency_key,
+        f"rewards.redeem:{current_user['id']}",
+        coupon_data,
+        lambda: run_in_threadpool(RewardController.redeem_coupon, coupon_data, current_user["id"]),
+        response
+    )
 
 @router.post("/validate-qr")
 async def validate_coupon_qr(qr_data: CouponQRValidation, current_user: dict = Depends(get_current_user)):
@@ -102,4 +147,4 @@ async def validate_coupon_qr(qr_data: CouponQRValidation, current_user: dict = D
     
     Verifica que el cupón sea válido y esté vigente para el negocio.
     """
-    return RewardController.validate_coupon_qr(qr_data)
\ No newline at end of file
+    return await run_in_threadpool(RewardController.validate_coupon_qr, qr_data)
\ No newline at end of file
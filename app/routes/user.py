@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Response
 from app.controllers.user_controller_sqlite import UserController
 from app.schemas.user import UserProfileUpdate, VisitCreate, QRValidation
 from app.utils.auth_simple import get_current_user
+from app.utils.idempotency import idempotency_store
+from app.utils.qr_token import is_compact_token
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional, Tuple
 
 router = APIRouter(prefix="/api/user", tags=["user"])
 
@@ -17,10 +21,27 @@ async def update_profile(data: UserProfileUpdate, current_user: dict = Depends(g
 async def get_visits(current_user: dict = Depends(get_current_user)):
     return UserController.get_visits(current_user["id"])
 
+# Tipos de Accept que piden el QR sin sobre JSON: SVG listo para <img> o solo el token
+RAW_QR_MEDIA_TYPES = {"image/svg+xml": "svg", "text/plain": "token", "application/jwt": "token"}
+
+def _negotiate_qr_format(qr_format: Optional[str], accept: Optional[str]) -> Tuple[str, bool]:
+    """Formato del QR y si va sin sobre JSON; ?format= tiene prioridad sobre Accept"""
+    if qr_format:
+        return qr_format, False
+    media_types = [media_type.split(";")[0].strip().lower() for media_type in (accept or "").split(",")]
+    for media_type in media_types:
+        if media_type in ("application/json", "*/*"):
+            break
+        if media_type in RAW_QR_MEDIA_TYPES:
+            return RAW_QR_MEDIA_TYPES[media_type], True
+    return "png", False
+
 @router.post("/generate-qr")
 async def generate_qr(
     visit_data: VisitCreate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    qr_format: Optional[str] = Query(None, alias="format", pattern="^(png|svg|token)$"),
+    accept: Optional[str] = Header(None)
 ):
     """
     Genera código QR para visita
@@ -28,16 +49,39 @@ async def generate_qr(
     - **user_id**: ID del usuario
     - **business_id**: ID del negocio
     - **visit_date**: Fecha y hora de la visita
+    - **format**: `png` (data URL base64, por defecto), `svg` (un solo path) o `token`
+      (solo el token firmado y los parámetros para dibujarlo: error_correction y border)
     
-    Retorna el código QR en formato Base64 sin guardarlo en la base de datos.
-    El QR debe ser validado posteriormente con el endpoint validate-qr.
+    Sin `format`, el header Accept decide: `image/svg+xml` devuelve el SVG y
+    `text/plain` (o `application/jwt`) el token, sin sobre JSON (token y expiración en
+    headers X-QR-*). El token es compacto (base45) salvo con QR_TOKEN_FORMAT=jwt.
+    No guarda nada en la base de datos: el QR debe validarse con validate-qr. Las
+    imágenes se renderizan en el pool de procesos de QR: 503 si la cola está llena,
+    504 si vence.
     """
-    return UserController.generate_qr(visit_data)
+    image_format, raw = _negotiate_qr_format(qr_format, accept)
+    result = await UserController.generate_qr(visit_data, image_format)
+    if not raw:
+        return result
+    
+    data = result["data"]
+    headers = {
+        "X-QR-Expires-At": data["expires_at"],
+        "X-QR-Error-Correction": data["error_correction"],
+        "X-QR-Border": str(data["border"])
+    }
+    if image_format == "svg":
+        headers["X-QR-Token"] = data["qr_token"]
+        return Response(content=data["qr_code"], media_type="image/svg+xml", headers=headers)
+    media_type = "text/plain" if is_compact_token(data["qr_token"]) else "application/jwt"
+    return Response(content=data["qr_token"], media_type=media_type, headers=headers)
 
 @router.post("/validate-qr")
 async def validate_qr_visit(
     qr_data: QRValidation, 
-    current_user: dict = Depends(get_current_user)
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Valida código QR y registra visita efectiva
@@ -46,6 +90,13 @@ async def validate_qr_visit(
     - **business_id**: ID del negocio donde se valida
     
     Este endpoint valida el QR y registra la visita en la base de datos.
-    Solo aquí se crea el registro efectivo de la visita.
+    Solo aquí se crea el registro efectivo de la visita. Con el header
+    Idempotency-Key, los reintentos reciben la primera respuesta.
     """
-    return UserController.validate_qr_visit(qr_data.qr_token, qr_data.business_id, current_user)
\ No newline at end of file
+    return await idempotency_store.run(
+        idempotency_key,
+        f"user.validate-qr:{current_user['id']}",
+        qr_data,
+        lambda: run_in_threadpool(UserController.validate_qr_visit, qr_data.qr_token, qr_data.business_id, current_user),
+        response
+    )
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List, Union
 from decimal import Decimal
+from datetime import datetime
 
 class MenuItemCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -35,6 +36,14 @@ class QRValidation(BaseModel):
     qr_token: str = Field(..., min_length=1)
     business_id: int = Field(..., gt=0)
 
+class OfflineScan(BaseModel):
+    qr_token: str = Field(..., min_length=1)
+    scanned_at: datetime
+
+class QRBatchValidation(BaseModel):
+    business_id: int = Field(..., gt=0)
+    scans: List[OfflineScan] = Field(..., min_length=1)
+
 class BusinessProfileUpdate(BaseModel):
     phone: Optional[str] = Field(None, max_length=20)
     email: Optional[str] = Field(None, max_length=100)
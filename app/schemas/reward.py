@@ -47,7 +47,8 @@ class UserRewardResponse(BaseModel):
     business_id: int
     reward_id: int
     coupon_code: str
-    qr_code: str
+    qr_token: Optional[str] = None
+    qr_image_url: Optional[str] = None
     expires_at: datetime
     claimed_at: Optional[datetime] = None
     redeemed_at: Optional[datetime] = None
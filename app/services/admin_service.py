@@ -1,7 +1,13 @@
-from app.config.database import get_db_connection
+from app.config.database import get_db_connection, get_pool_stats
+from app.config.database_async import get_async_pool_stats
+from app.config.sqlite_writer import get_writer_stats
+from app.utils.idempotency import get_idempotency_stats
+from app.utils.qr_renderer import get_qr_render_stats
 from app.schemas.admin import BusinessCreate, BusinessUpdate, UserCreate, UserUpdate, AdminDashboardFilters
 from app.models.user import User
 from app.utils.logger import log_info, log_error
+from app.utils.pagination import keyset_query, build_page, build_ranked_page, decode_offset_cursor, total_count
+from app.utils.search import ranked_search
 from typing import Dict, List, Optional
 import bcrypt
 import json
@@ -86,51 +92,67 @@ class AdminService:
             connection.close()
     
     @staticmethod
-    def get_all_businesses(page: int = 1, limit: int = 20, search: Optional[str] = None) -> Dict:
-        """Obtiene todos los negocios con paginación"""
+    def get_all_businesses(
+        page: int = 1,
+        limit: int = 20,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
+        """Obtiene negocios paginados por cursor (created_at, id); `page` > 1 sin cursor usa OFFSET (obsoleto)
+        
+        Con `search` la búsqueda es indexada (texto completo + trigramas) y los resultados
+        se ordenan por relevancia.
+        """
         connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
-                offset = (page - 1) * limit
-                
-                # Construir query con búsqueda
+            with connection.cursor() as db_cursor:
                 search_filter = ""
                 search_params = []
-                if search:
-                    search_filter = " AND (b.name ILIKE %s OR b.category ILIKE %s OR b.address ILIKE %s)"
-                    search_term = f"%{search}%"
-                    search_params = [search_term, search_term, search_term]
-                
-                # Obtener total
-                cursor.execute(f"""
-                    SELECT COUNT(*) as total 
-                    FROM businesses b 
-                    WHERE 1=1{search_filter}
-                """, search_params)
-                total = cursor.fetchone()['total']
-                
-                # Obtener negocios
-                cursor.execute(f"""
-                    SELECT b.*, m.municipio, u.nombre as owner_name, u.email as owner_email
-                    FROM businesses b
-                    LEFT JOIN municipalities m ON b.municipality_id = m.id
-                    LEFT JOIN users u ON b.owner_user_id = u.id
-                    WHERE 1=1{search_filter}
-                    ORDER BY b.created_at DESC
-                    LIMIT %s OFFSET %s
-                """, search_params + [limit, offset])
-                
-                businesses = cursor.fetchall()
+                if search and search.strip():
+                    search_filter, search_params, rank_sql, rank_params = ranked_search(
+                        "business_search_document(b.name, b.category, b.address)", "spanish",
+                        ["immutable_unaccent(b.name)"], search
+                    )
+                    offset = decode_offset_cursor(cursor) if cursor else (page - 1) * limit
+                    
+                    db_cursor.execute(f"""
+                        SELECT b.*, m.municipio, u.nombre as owner_name, u.email as owner_email,
+                               {rank_sql} as search_rank
+                        FROM businesses b
+                        LEFT JOIN municipalities m ON b.municipality_id = m.id
+                        LEFT JOIN users u ON b.owner_user_id = u.id
+                        WHERE 1=1{search_filter}
+                        ORDER BY search_rank DESC, b.id DESC
+                        LIMIT %s OFFSET %s
+                    """, rank_params + search_params + [limit + 1, offset])
+                    
+                    businesses, pagination = build_ranked_page(db_cursor.fetchall(), limit, offset)
+                else:
+                    keyset_filter, keyset_params, order_by, direction = keyset_query("b", cursor)
+                    offset = (page - 1) * limit if not cursor and page > 1 else 0
+                    
+                    # Se pide una fila extra para saber si hay más páginas
+                    db_cursor.execute(f"""
+                        SELECT b.*, m.municipio, u.nombre as owner_name, u.email as owner_email
+                        FROM businesses b
+                        LEFT JOIN municipalities m ON b.municipality_id = m.id
+                        LEFT JOIN users u ON b.owner_user_id = u.id
+                        WHERE 1=1{keyset_filter}
+                        ORDER BY {order_by}
+                        LIMIT %s OFFSET %s
+                    """, keyset_params + [limit + 1, offset])
+                    
+                    businesses, pagination = build_page(db_cursor.fetchall(), limit, direction, bool(cursor) or offset > 0)
                 
-                return {
-                    "businesses": businesses,
-                    "pagination": {
-                        "page": page,
-                        "limit": limit,
-                        "total": total,
-                        "pages": (total + limit - 1) // limit
-                    }
-                }
+                if include_total:
+                    pagination.update(total_count(
+                        db_cursor, "businesses",
+                        f"SELECT COUNT(*) as total FROM businesses b WHERE 1=1{search_filter}",
+                        search_params, filtered=bool(search_filter)
+                    ))
+                
+                return {"businesses": businesses, "pagination": pagination}
                 
         except Exception as e:
             log_error("Error obteniendo negocios", error=e)
@@ -262,58 +284,79 @@ class AdminService:
             connection.close()
     
     @staticmethod
-    def get_all_users(page: int = 1, limit: int = 20, search: Optional[str] = None, user_type: Optional[int] = None) -> Dict:
-        """Obtiene todos los usuarios con paginación"""
+    def get_all_users(
+        page: int = 1,
+        limit: int = 20,
+        search: Optional[str] = None,
+        user_type: Optional[int] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> Dict:
+        """Obtiene usuarios paginados por cursor (created_at, id); `page` > 1 sin cursor usa OFFSET (obsoleto)
+        
+        Con `search` la búsqueda es indexada (nombre y email) y los resultados se ordenan
+        por relevancia.
+        """
         connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
-                offset = (page - 1) * limit
-                
+            with connection.cursor() as db_cursor:
                 # Construir filtros
                 filters = []
                 params = []
                 
-                if search:
-                    filters.append("(u.nombre ILIKE %s OR u.email ILIKE %s)")
-                    search_term = f"%{search}%"
-                    params.extend([search_term, search_term])
-                
                 if user_type is not None:
                     filters.append("u.user_type_id = %s")
                     params.append(user_type)
                 
                 where_clause = " AND ".join(filters) if filters else "1=1"
                 
-                # Obtener total
-                cursor.execute(f"""
-                    SELECT COUNT(*) as total 
-                    FROM users u 
-                    WHERE {where_clause}
-                """, params)
-                total = cursor.fetchone()['total']
-                
-                # Obtener usuarios
-                cursor.execute(f"""
-                    SELECT u.id, u.nombre, u.email, u.telefono, u.created_at,
-                           ut.type_name as user_type_name, u.user_type_id
-                    FROM users u
-                    LEFT JOIN user_types ut ON u.user_type_id = ut.id
-                    WHERE {where_clause}
-                    ORDER BY u.created_at DESC
-                    LIMIT %s OFFSET %s
-                """, params + [limit, offset])
-                
-                users = cursor.fetchall()
+                if search and search.strip():
+                    search_filter, search_params, rank_sql, rank_params = ranked_search(
+                        "user_search_document(u.nombre)", "simple",
+                        ["immutable_unaccent(u.nombre)", "lower(u.email)"], search
+                    )
+                    where_clause += search_filter
+                    params.extend(search_params)
+                    filters.append(search_filter)
+                    offset = decode_offset_cursor(cursor) if cursor else (page - 1) * limit
+                    
+                    db_cursor.execute(f"""
+                        SELECT u.id, u.nombre, u.email, u.telefono, u.created_at,
+                               ut.type_name as user_type_name, u.user_type_id,
+                               {rank_sql} as search_rank
+                        FROM users u
+                        LEFT JOIN user_types ut ON u.user_type_id = ut.id
+                        WHERE {where_clause}
+                        ORDER BY search_rank DESC, u.id DESC
+                        LIMIT %s OFFSET %s
+                    """, rank_params + params + [limit + 1, offset])
+                    
+                    users, pagination = build_ranked_page(db_cursor.fetchall(), limit, offset)
+                else:
+                    keyset_filter, keyset_params, order_by, direction = keyset_query("u", cursor)
+                    offset = (page - 1) * limit if not cursor and page > 1 else 0
+                    
+                    # Se pide una fila extra para saber si hay más páginas
+                    db_cursor.execute(f"""
+                        SELECT u.id, u.nombre, u.email, u.telefono, u.created_at,
+                               ut.type_name as user_type_name, u.user_type_id
+                        FROM users u
+                        LEFT JOIN user_types ut ON u.user_type_id = ut.id
+                        WHERE {where_clause}{keyset_filter}
+                        ORDER BY {order_by}
+                        LIMIT %s OFFSET %s
+                    """, params + keyset_params + [limit + 1, offset])
+                    
+                    users, pagination = build_page(db_cursor.fetchall(), limit, direction, bool(cursor) or offset > 0)
                 
-                return {
-                    "users": users,
-                    "pagination": {
-                        "page": page,
-                        "limit": limit,
-                        "total": total,
-                        "pages": (total + limit - 1) // limit
-                    }
-                }
+                if include_total:
+                    pagination.update(total_count(
+                        db_cursor, "users",
+                        f"SELECT COUNT(*) as total FROM users u WHERE {where_clause}",
+                        params, filtered=bool(filters)
+                    ))
+                
+                return {"users": users, "pagination": pagination}
                 
         except Exception as e:
             log_error("Error obteniendo usuarios", error=e)
@@ -426,7 +469,16 @@ class AdminService:
                 cursor.execute("SELECT COUNT(*) as total FROM user_rewards")
                 stats['total_rewards'] = cursor.fetchone()['total']
                 
-                cursor.execute("SELECT COUNT(*) as total FROM user_visits")
+                # Días cerrados desde visit_daily_rollup (las particiones archivadas no se
+                # recorren); visitas crudas solo después de la marca del job nocturno
+                cursor.execute("""
+                    SELECT COALESCE((SELECT SUM(visits) FROM visit_daily_rollup WHERE day <= w.rolled_through), 0)
+                         + (SELECT COUNT(*) FROM user_visits WHERE visit_day > w.rolled_through) AS total
+                    FROM (
+                        SELECT COALESCE(MAX(rolled_through), DATE '0001-01-01') AS rolled_through
+                        FROM rollup_watermarks WHERE rollup = 'visit_daily_rollup'
+                    ) w
+                """)
                 stats['total_visits'] = cursor.fetchone()['total']
                 
                 # Estadísticas de actividad (último mes)
@@ -438,9 +490,14 @@ class AdminService:
                 stats['new_users_last_month'] = cursor.fetchone()['count']
                 
                 cursor.execute("""
-                    SELECT COUNT(*) as count 
-                    FROM user_visits 
-                    WHERE visit_date >= CURRENT_DATE - INTERVAL '30 days'
+                    SELECT COALESCE((SELECT SUM(visits) FROM visit_daily_rollup
+                                     WHERE day >= CURRENT_DATE - 30 AND day <= w.rolled_through), 0)
+                         + (SELECT COUNT(*) FROM user_visits
+                            WHERE visit_day >= GREATEST(CURRENT_DATE - 30, w.rolled_through + 1)) AS count
+                    FROM (
+                        SELECT COALESCE(MAX(rolled_through), DATE '0001-01-01') AS rolled_through
+                        FROM rollup_watermarks WHERE rollup = 'visit_daily_rollup'
+                    ) w
                 """)
                 stats['visits_last_month'] = cursor.fetchone()['count']
                 
@@ -450,4 +507,15 @@ class AdminService:
             log_error("Error obteniendo estadísticas del sistema", error=e)
             raise
         finally:
-            connection.close()
\ No newline at end of file
+            connection.close()
+    
+    @staticmethod
+    def get_runtime_metrics() -> Dict:
+        """Obtiene métricas de ejecución del proceso actual"""
+        return {
+            "db_pool": get_pool_stats(),
+            "db_async_pool": get_async_pool_stats(),
+            "sqlite_writer": get_writer_stats(),
+            "idempotency": get_idempotency_stats(),
+            "qr_render": get_qr_render_stats()
+        }
@@ -6,6 +6,14 @@ class BusinessService:
     def get_all_businesses(user_id: int = None) -> List[Dict]:
         return Business.get_all(user_id)
     
+    @staticmethod
+    async def get_all_businesses_async(user_id: int = None) -> List[Dict]:
+        return await Business.get_all_async(user_id)
+    
+    @staticmethod
+    def search_businesses(term: str, limit: int = 20) -> List[Dict]:
+        return Business.search(term, limit)
+    
     @staticmethod
     def get_business_by_id(business_id: int, user_id: int = None) -> Optional[Dict]:
         return Business.get_by_id(business_id, user_id)
@@ -25,12 +25,8 @@ class CustomerService:
                 business = cursor.fetchone()
                 max_visits = business['visits_for_prize'] if business else 6
                 
-                # Obtener ronda actual
-                current_round = UserRound.get_current_round_only(user_id, business_id)
-                
-                if not current_round:
-                    # Crear ronda inicial si no existe
-                    current_round = UserRound.get_or_create_current_round(user_id, business_id)
+                # Ronda actual (virtual si el cliente aún no visita en esta ronda)
+                current_round = UserRound.get_current_round(user_id, business_id)
                 
                 # Obtener cupones disponibles
                 cursor.execute("""
@@ -1,110 +1,116 @@
-from app.config.database import get_db_connection
+from app.config.database_async import get_async_connection
 from app.utils.logger import log_error
 from typing import Dict
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 class DashboardService:
     """Servicio para dashboard de negocios"""
     
     @staticmethod
-    def get_business_dashboard(business_id: int) -> Dict:
+    async def get_business_dashboard(business_id: int) -> Dict:
         """Obtiene datos completos del dashboard del negocio"""
-        connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
+            async with get_async_connection() as connection:
                 today = datetime.now().date()
                 month_start = today.replace(day=1)
+                # Rangos de timestamps (no DATE(columna)) para que apliquen los índices por fecha
+                today_start = datetime.combine(today, datetime.min.time())
+                tomorrow_start = today_start + timedelta(days=1)
+                month_start_dt = datetime.combine(month_start, datetime.min.time())
                 
-                # Visitas de hoy
-                cursor.execute("""
+                # Días cerrados desde visit_daily_rollup; visitas crudas solo desde live_from (hoy,
+                # salvo que el job nocturno esté atrasado)
+                rolled_through = await connection.fetchval(
+                    "SELECT rolled_through FROM rollup_watermarks WHERE rollup = 'visit_daily_rollup'"
+                )
+                live_from = min(today, rolled_through + timedelta(days=1)) if rolled_through else date.min
+                
+                # Las visitas se filtran por visit_day (llave de partición) para podar particiones
+                visits_today = await connection.fetchval("""
                     SELECT COUNT(*) as visits_today
                     FROM user_visits
-                    WHERE business_id = %s AND DATE(visit_date) = %s
-                """, (business_id, today))
-                visits_today = cursor.fetchone()['visits_today']
+                    WHERE business_id = $1 AND visit_day = $2
+                """, business_id, today)
                 
                 # Visitas del mes
-                cursor.execute("""
-                    SELECT COUNT(*) as visits_month
-                    FROM user_visits
-                    WHERE business_id = %s AND DATE(visit_date) >= %s
-                """, (business_id, month_start))
-                visits_month = cursor.fetchone()['visits_month']
+                visits_month = await connection.fetchval("""
+                    SELECT COALESCE((SELECT SUM(visits) FROM visit_daily_rollup
+                                     WHERE business_id = $1 AND day >= $2 AND day < $3), 0)
+                         + (SELECT COUNT(*) FROM user_visits WHERE business_id = $1 AND visit_day >= $4)
+                """, business_id, month_start, live_from, max(month_start, live_from))
                 
                 # Premios redimidos hoy
-                cursor.execute("""
+                rewards_today = await connection.fetchval("""
                     SELECT COUNT(*) as rewards_today
                     FROM user_rewards
-                    WHERE business_id = %s AND DATE(redeemed_at) = %s
-                """, (business_id, today))
-                rewards_today = cursor.fetchone()['rewards_today']
+                    WHERE business_id = $1 AND redeemed_at >= $2 AND redeemed_at < $3
+                """, business_id, today_start, tomorrow_start)
                 
                 # Premios redimidos del mes
-                cursor.execute("""
+                rewards_month = await connection.fetchval("""
                     SELECT COUNT(*) as rewards_month
                     FROM user_rewards
-                    WHERE business_id = %s AND DATE(redeemed_at) >= %s
-                """, (business_id, month_start))
-                rewards_month = cursor.fetchone()['rewards_month']
+                    WHERE business_id = $1 AND redeemed_at >= $2
+                """, business_id, month_start_dt)
                 
-                # Rondas activas
-                cursor.execute("""
-                    SELECT ur.user_id, ur.round_number, ur.progress_in_round, 
+                # Rondas activas (estado de lealtad con progreso en la ronda abierta)
+                active_rounds = await connection.fetch("""
+                    SELECT ls.user_id, ls.round_number, ls.progress_in_round, 
                            b.visits_for_prize as goal, u.nombre as user_name
-                    FROM user_rounds ur
-                    JOIN users u ON ur.user_id = u.id
-                    JOIN businesses b ON ur.business_id = b.id
-                    WHERE ur.business_id = %s AND ur.is_completed = 0
-                    ORDER BY ur.progress_in_round DESC
+                    FROM loyalty_state ls
+                    JOIN users u ON ls.user_id = u.id
+                    JOIN businesses b ON ls.business_id = b.id
+                    WHERE ls.business_id = $1 AND ls.progress_in_round > 0
+                    ORDER BY ls.progress_in_round DESC
                     LIMIT 10
-                """, (business_id,))
-                active_rounds = cursor.fetchall()
+                """, business_id)
                 
                 # Visitas por día (últimos 7 días)
-                cursor.execute("""
-                    SELECT DATE(visit_date) as visit_date, COUNT(*) as visits
+                week_start = today - timedelta(days=7)
+                breakdown_rows = await connection.fetch("""
+                    SELECT day as visit_date, visits
+                    FROM visit_daily_rollup
+                    WHERE business_id = $1 AND day >= $2 AND day < $3
+                    UNION ALL
+                    SELECT visit_day, COUNT(*)
                     FROM user_visits
-                    WHERE business_id = %s AND visit_date >= %s
-                    GROUP BY DATE(visit_date)
+                    WHERE business_id = $1 AND visit_day >= $4
+                    GROUP BY visit_day
                     ORDER BY visit_date DESC
-                """, (business_id, today - timedelta(days=7)))
-                visits_breakdown = {str(row['visit_date']): row['visits'] for row in cursor.fetchall()}
+                """, business_id, week_start, live_from, max(week_start, live_from))
+                visits_breakdown = {str(row['visit_date']): row['visits'] for row in breakdown_rows}
                 
                 # Últimos clientes del mes actual con municipio
-                cursor.execute("""
-                    SELECT DISTINCT u.id, u.nombre, m.municipio, MAX(uv.visit_date) as last_visit
-                    FROM user_visits uv
-                    JOIN users u ON uv.user_id = u.id
+                recent_customers = await connection.fetch("""
+                    SELECT u.id, u.nombre, m.municipio, ls.last_visit_at as last_visit
+                    FROM loyalty_state ls
+                    JOIN users u ON ls.user_id = u.id
                     LEFT JOIN municipalities m ON u.municipality_id = m.id
-                    WHERE uv.business_id = %s AND DATE(uv.visit_date) >= %s
-                    GROUP BY u.id, u.nombre, m.municipio
-                    ORDER BY last_visit DESC
+                    WHERE ls.business_id = $1 AND ls.last_visit_at >= $2
+                    ORDER BY ls.last_visit_at DESC
                     LIMIT 5
-                """, (business_id, month_start))
-                recent_customers = cursor.fetchall()
+                """, business_id, month_start_dt)
                 
                 # Nuevos clientes del negocio (primera visita en el mes actual)
-                cursor.execute("""
+                new_customers = await connection.fetch("""
                     SELECT u.id, u.nombre, m.municipio, MIN(uv.visit_date) as first_visit
                     FROM user_visits uv
                     JOIN users u ON uv.user_id = u.id
                     LEFT JOIN municipalities m ON u.municipality_id = m.id
-                    WHERE uv.business_id = %s AND DATE(uv.visit_date) >= %s
+                    WHERE uv.business_id = $1 AND uv.visit_day >= $2
                     GROUP BY u.id, u.nombre, m.municipio
-                    HAVING MIN(uv.visit_date) >= %s
+                    HAVING MIN(uv.visit_day) >= $2
                     ORDER BY first_visit DESC
                     LIMIT 10
-                """, (business_id, month_start, month_start))
-                new_customers = cursor.fetchall()
+                """, business_id, month_start)
                 
                 # Estado del programa y datos del negocio
-                cursor.execute("""
+                business_info = await connection.fetchrow("""
                     SELECT b.name, b.address, m.municipio, b.visits_for_prize, b.active as program_active
                     FROM businesses b
                     LEFT JOIN municipalities m ON b.municipality_id = m.id
-                    WHERE b.id = %s
-                """, (business_id,))
-                business_info = cursor.fetchone()
+                    WHERE b.id = $1
+                """, business_id)
                 
                 return {
                     "business_id": business_id,
@@ -151,6 +157,4 @@ class DashboardService:
                 }
         except Exception as e:
             log_error("Error obteniendo dashboard", error=e)
-            return {}
-        finally:
-            connection.close()
\ No newline at end of file
+            return {}
\ No newline at end of file
@@ -1,6 +1,7 @@
 from app.config.database import get_db_connection
 from app.utils.logger import log_error
 from app.models.audit_log import AuditLog
+from app.services.round_rebuild_service import RoundRebuildService
 from app.schemas.business import LoyaltyConfigUpdate
 from typing import Dict
 
@@ -98,13 +99,19 @@ class LoyaltyService:
                         new_values=new_values
                     )
                     
+                    data = {
+                        "changes_applied": changes_applied,
+                        "updated_fields": list(new_values.keys())
+                    }
+                    
+                    # Con otra meta de visitas las rondas existentes se recalculan desde las visitas
+                    if new_values.get('visits_per_round', old_values['visits_per_round']) != old_values['visits_per_round']:
+                        data["rounds_rebuild"] = LoyaltyService._rebuild_rounds(business_id)
+                    
                     return {
                         "success": True,
                         "message": "Configuración actualizada exitosamente",
-                        "data": {
-                            "changes_applied": changes_applied,
-                            "updated_fields": list(new_values.keys())
-                        }
+                        "data": data
                     }
                 else:
                     return {
@@ -117,4 +124,15 @@ class LoyaltyService:
             log_error("Error actualizando configuración de lealtad", error=e)
             return {"success": False, "error": "Error interno del servidor"}
         finally:
-            connection.close()
\ No newline at end of file
+            connection.close()
+    
+    @staticmethod
+    def _rebuild_rounds(business_id: int) -> Dict:
+        """Reconstruye las rondas del negocio; si falla, la configuración ya quedó guardada
+        y se puede repetir con rebuild_rounds.py"""
+        try:
+            stats = RoundRebuildService.rebuild(business_id)
+            return {"success": True, "pairs": stats["pairs"], "rounds": stats["rounds"], "seconds": stats["seconds"]}
+        except Exception as e:
+            log_error("Error reconstruyendo rondas tras cambiar la meta", error=e, business_id=business_id)
+            return {"success": False, "error": "No se pudieron recalcular las rondas"}
\ No newline at end of file
@@ -0,0 +1,213 @@
+from app.config.database import get_db_connection
+from app.config.settings import settings
+from app.utils.logger import log_info, log_error
+from app.services.visit_rollup_service import VisitRollupService
+from psycopg2 import sql
+from typing import Dict, List, Optional
+from datetime import date
+import re
+
+# Tablas particionadas por mes (migración 0008) y su retención configurada
+PARTITIONED_TABLES = {
+    "user_visits": "visit_partition_retention_months",
+    "audit_logs": "audit_log_partition_retention_months"
+}
+
+# Llave de partición de cada tabla; lo que no cae en una partición mensual va a <tabla>_default
+PARTITION_KEYS = {
+    "user_visits": "visit_day",
+    "audit_logs": "created_at"
+}
+
+# Las particiones separadas se mueven a este esquema salvo que se pida borrarlas
+ARCHIVE_SCHEMA = "archive"
+
+PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+def add_months(day: date, months: int) -> date:
+    """Primer día del mes que está `months` meses después (o antes) del de `day`"""
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+class PartitionService:
+    """Mantenimiento de las particiones mensuales de user_visits y audit_logs"""
+    
+    @staticmethod
+    def list_partitions(table: str) -> List[Dict]:
+        """Particiones de la tabla con su mes, rango y tamaño en disco"""
+        PartitionService._check_table(table)
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT child.relname AS name,
+                           pg_get_expr(child.relpartbound, child.oid) AS bound,
+                           pg_total_relation_size(child.oid) AS size_bytes
+                    FROM pg_inherits i
+                    JOIN pg_class parent ON parent.oid = i.inhparent
+                    JOIN pg_class child ON child.oid = i.inhrelid
+                    WHERE parent.relname = %s
+                    ORDER BY child.relname
+                """, (table,))
+                
+                partitions = []
+                for row in cursor.fetchall():
+                    match = PARTITION_NAME.search(row['name'])
+                    month = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+                    partitions.append({**row, "month": month})
+                return partitions
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def ensure_future_partitions(months_ahead: Optional[int] = None) -> List[str]:
+        """Crea las particiones del mes actual y los `months_ahead` siguientes que falten
+        
+        También crea la de cada mes con filas en la partición DEFAULT (si el job dejó de
+        correr) y mueve esas filas a la partición nueva. Cada partición se confirma por
+        separado para no retener el bloqueo de la DEFAULT más de lo necesario.
+        """
+        months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+        current_month = date.today().replace(day=1)
+        created = []
+        
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                for table in PARTITIONED_TABLES:
+                    default = sql.Identifier(f"{table}_default")
+                    key = sql.Identifier(PARTITION_KEYS[table])
+                    cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT").format(
+                        default, sql.Identifier(table)
+                    ))
+                    cursor.execute(sql.SQL("SELECT DISTINCT date_trunc('month', {})::date AS month FROM {}").format(
+                        key, default
+                    ))
+                    months = {row['month'] for row in cursor.fetchall()}
+                    months.update(add_months(current_month, offset) for offset in range(months_ahead + 1))
+                    connection.commit()
+                    
+                    for month in sorted(months):
+                        name = f"{table}_p{month:%Y%m}"
+                        cursor.execute("SELECT to_regclass(%s) IS NULL AS missing", (name,))
+                        if cursor.fetchone()['missing']:
+                            moved = PartitionService._create_partition(cursor, table, month)
+                            connection.commit()
+                            created.append(name)
+                            if moved:
+                                log_info("Filas movidas desde la partición DEFAULT", partition=name, rows=moved)
+            
+            if created:
+                log_info("Particiones creadas", partitions=",".join(created))
+            return created
+        except Exception as e:
+            connection.rollback()
+            log_error("Error creando particiones", error=e)
+            raise
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def _create_partition(cursor, table: str, month: date) -> int:
+        """Crea la partición mensual sacando antes de la DEFAULT las filas de su rango
+        
+        PostgreSQL no crea la partición si la DEFAULT ya tiene filas de ese mes: se pasan a
+        una tabla temporal, se crea la partición y se reinsertan (ya caen en la nueva). El
+        bloqueo de la DEFAULT evita que entre otra fila del mes mientras tanto. Devuelve
+        cuántas filas se movieron.
+        """
+        default = sql.Identifier(f"{table}_default")
+        key = sql.Identifier(PARTITION_KEYS[table])
+        cursor.execute(sql.SQL("LOCK TABLE {} IN EXCLUSIVE MODE").format(default))
+        cursor.execute(sql.SQL("CREATE TEMP TABLE partition_rows (LIKE {})").format(default))
+        cursor.execute(sql.SQL("""
+            WITH moved AS (
+                DELETE FROM {default} WHERE {key} >= %s AND {key} < %s RETURNING *
+            )
+            INSERT INTO partition_rows SELECT * FROM moved
+        """).format(default=default, key=key), (month, add_months(month, 1)))
+        moved = cursor.rowcount
+        cursor.execute("SELECT create_monthly_partition(%s, %s)", (table, month))
+        if moved:
+            cursor.execute(sql.SQL("INSERT INTO {} SELECT * FROM partition_rows").format(sql.Identifier(table)))
+        cursor.execute("DROP TABLE partition_rows")
+        return moved
+    
+    @staticmethod
+    def detach_partitions_before(table: str, cutoff: date, drop: bool = False) -> List[str]:
+        """Separa las particiones de meses anteriores a `cutoff`
+        
+        DETACH PARTITION solo cambia el catálogo: no recorre filas. La partición separada
+        se mueve al esquema archive (consultable y exportable) o se borra con `drop`. Las
+        visitas se consolidan antes en visit_daily_rollup.
+        """
+        PartitionService._check_table(table)
+        cutoff = cutoff.replace(day=1)
+        if cutoff > date.today().replace(day=1):
+            raise ValueError("No se puede separar la partición del mes actual ni las futuras")
+        
+        old = [
+            partition for partition in PartitionService.list_partitions(table)
+            if partition['month'] and partition['month'] < cutoff
+        ]
+        # Las métricas históricas de visitas siguen disponibles en visit_daily_rollup
+        if table == "user_visits" and old:
+            VisitRollupService.rollup_range(min(partition['month'] for partition in old), cutoff)
+        old = [partition['name'] for partition in old]
+        detached = []
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                for name in old:
+                    cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                        sql.Identifier(table), sql.Identifier(name)
+                    ))
+                    if drop:
+                        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+                    else:
+                        cursor.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(ARCHIVE_SCHEMA)))
+                        cursor.execute(sql.SQL("ALTER TABLE {} SET SCHEMA {}").format(
+                            sql.Identifier(name), sql.Identifier(ARCHIVE_SCHEMA)
+                        ))
+                    connection.commit()
+                    detached.append(name)
+            
+            if detached:
+                log_info("Particiones separadas", table=table, dropped=drop, partitions=",".join(detached))
+            return detached
+        except Exception as e:
+            connection.rollback()
+            log_error("Error separando particiones", error=e, table=table)
+            raise
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def apply_retention() -> Dict[str, List[str]]:
+        """Archiva las particiones que exceden la retención configurada de cada tabla"""
+        current_month = date.today().replace(day=1)
+        archived = {}
+        for table, setting in PARTITIONED_TABLES.items():
+            retention = getattr(settings, setting)
+            if retention > 0:
+                archived[table] = PartitionService.detach_partitions_before(
+                    table, add_months(current_month, -retention)
+                )
+        return archived
+    
+    @staticmethod
+    def run_maintenance() -> Dict:
+        """Job periódico: rollups de visitas, particiones futuras y retención
+        
+        Los rollups van primero para que la retención nunca separe días sin consolidar.
+        """
+        return {
+            "rolled_up": VisitRollupService.run_nightly(),
+            "created": PartitionService.ensure_future_partitions(),
+            "archived": PartitionService.apply_retention()
+        }
+    
+    @staticmethod
+    def _check_table(table: str):
+        if table not in PARTITIONED_TABLES:
+            raise ValueError(f"Tabla no particionada: {table}")
@@ -1,5 +1,6 @@
 from app.models.reward import Reward
 from app.models.user_reward import UserReward
+from app.models.loyalty_state import LoyaltyState
 from app.utils.logger import log_info, log_error
 from typing import Dict, Optional, List
 
@@ -26,91 +27,80 @@ class RewardService:
     
     @staticmethod
     def check_and_generate_reward(user_id: int, business_id: int) -> Optional[Dict]:
-        """Verifica si el usuario merece un premio basado en rondas y lo genera"""
-        from app.config.database import get_db_connection
-        from app.models.user_round import UserRound
+        """Verifica si el usuario merece un premio basado en rondas y lo genera
+        
+        La verificación y el cupón se confirman juntos bajo el lock del (usuario, negocio):
+        dos escaneos concurrentes que alcanzan la meta generan un solo cupón.
+        """
+        from app.config.database import get_db_connection, unit_of_work
         
-        connection = get_db_connection()
         try:
-            with connection.cursor() as cursor:
-                # Obtener información del negocio
-                cursor.execute("""
-                    SELECT visits_for_prize, reward_id FROM businesses 
-                    WHERE id = %s AND active = 1
-                """, (business_id,))
-                
-                business = cursor.fetchone()
-                if not business:
-                    return None
-                
-                visits_needed = business['visits_for_prize'] or 6
-                reward_id = business['reward_id']
-                
-                # Obtener estadísticas de ronda
-                round_stats = UserRound.get_user_round_stats(user_id, business_id)
-                current_round = round_stats['current_round']
-                
-                if not current_round:
-                    return None
-                
-                # Verificar si alcanzó las visitas necesarias en la ronda actual
-                if current_round['progress_in_round'] >= visits_needed:
-                    # Verificar si ya tiene un cupón vigente para esta ronda
+            with unit_of_work():
+                connection = get_db_connection()
+                with connection.cursor() as cursor:
+                    LoyaltyState.lock(cursor, user_id, business_id)
+                    
+                    # Configuración del negocio y estado de lealtad del usuario en una sola lectura
                     cursor.execute("""
-                        SELECT COUNT(*) as count FROM user_rewards 
-                        WHERE user_id = %s AND business_id = %s AND status = 'vigente'
+                        SELECT b.visits_for_prize, b.reward_id,
+                               COALESCE(ls.round_number, 1) AS round_number,
+                               COALESCE(ls.progress_in_round, 0) AS progress_in_round,
+                               COALESCE(ls.active_coupons - ls.claimed_coupons, 0) AS open_coupons
+                        FROM businesses b
+                        LEFT JOIN loyalty_state ls ON ls.business_id = b.id AND ls.user_id = %s
+                        WHERE b.id = %s AND b.active = TRUE
                     """, (user_id, business_id))
                     
-                    if cursor.fetchone()['count'] > 0:
-                        log_info(f"Usuario {user_id} ya tiene cupón vigente para negocio {business_id}")
+                    state = cursor.fetchone()
+                    if not state:
                         return None
                     
-                    # Verificar si ya reclamó premio de esta ronda
-                    if current_round['is_reward_claimed']:
-                        log_info(f"Usuario {user_id} ya reclamó premio de ronda {current_round['round_number']}")
-                        return None
+                    visits_needed = state['visits_for_prize'] or 6
+                    reward_id = state['reward_id']
                     
-                    # Marcar que hay premio pendiente (is_reward_claimed = 0 por defecto)
-                    # No cambiar el estado hasta que se reclame
-                    
-                    # Obtener premio del negocio
-                    if reward_id:
-                        cursor.execute("SELECT * FROM rewards WHERE id = %s AND is_active = 1", (reward_id,))
-                    else:
-                        cursor.execute("""
-                            SELECT * FROM rewards 
-                            WHERE business_id = %s AND is_active = 1 
-                            ORDER BY created_at DESC LIMIT 1
-                        """, (business_id,))
-                    
-                    reward = cursor.fetchone()
-                    if not reward:
-                        log_error(f"No hay premio configurado para negocio {business_id}")
-                        return None
+                    # Verificar si alcanzó las visitas necesarias en la ronda actual
+                    if state['progress_in_round'] >= visits_needed:
+                        # Un cupón vigente sin reclamar ya corresponde a esta ronda
+                        if state['open_coupons'] > 0:
+                            log_info(f"Usuario {user_id} ya tiene cupón vigente para negocio {business_id}")
+                            return None
+                        
+                        # Obtener premio del negocio
+                        if reward_id:
+                            cursor.execute("SELECT * FROM rewards WHERE id = %s AND is_active = TRUE", (reward_id,))
+                        else:
+                            cursor.execute("""
+                                SELECT * FROM rewards 
+                                WHERE business_id = %s AND is_active = TRUE 
+                                ORDER BY created_at DESC LIMIT 1
+                            """, (business_id,))
+                        
+                        reward = cursor.fetchone()
+                        if not reward:
+                            log_error(f"No hay premio configurado para negocio {business_id}")
+                            return None
+                        
+                        # Generar cupón
+                        coupon = UserReward.create_reward(
+                            user_id, 
+                            business_id, 
+                            reward['id'], 
+                            reward['validity_days']
+                        )
+                        
+                        if coupon:
+                            log_info(f"Premio generado para usuario {user_id} en ronda {state['round_number']}")
+                            return {
+                                **coupon,
+                                "reward_title": reward['title'],
+                                "reward_description": reward['description'],
+                                "round_number": state['round_number']
+                            }
                     
-                    # Generar cupón
-                    coupon = UserReward.create_reward(
-                        user_id, 
-                        business_id, 
-                        reward['id'], 
-                        reward['validity_days']
-                    )
-                    
-                    if coupon:
-                        log_info(f"Premio generado para usuario {user_id} en ronda {current_round['round_number']}")
-                        return {
-                            **coupon,
-                            "reward_title": reward['title'],
-                            "reward_description": reward['description'],
-                            "round_number": current_round['round_number']
-                        }
-                
-                return None
+                    return None
         except Exception as e:
             log_error("Error verificando y generando premio con rondas", error=e)
             return None
-        finally:
-            connection.close()
     
     @staticmethod
     def _reset_visit_counter(user_id: int, business_id: int):
@@ -124,81 +114,97 @@ class RewardService:
         """Obtiene todos los cupones del usuario"""
         return UserReward.get_user_rewards(user_id)
     
+    @staticmethod
+    def get_coupon_qr_token(coupon_id: int, user_id: int) -> Optional[str]:
+        """Token del QR de un cupón del usuario; None si no existe o es de otro usuario"""
+        coupon = UserReward.get_coupon_qr(coupon_id, user_id)
+        return UserReward.coupon_qr_token(coupon) if coupon else None
+    
     @staticmethod
     def claim_coupon(coupon_id: int, user_id: int) -> Dict:
         """Reclama un cupón y completa la ronda"""
         from app.models.user_round import UserRound
-        from app.config.database import get_db_connection
+        from app.config.database import get_db_connection, unit_of_work
         
-        connection = get_db_connection()
+        # Cupón, ronda y loyalty_state se confirman juntos
         try:
-            with connection.cursor() as cursor:
-                # Obtener información del cupón
-                cursor.execute("""
-                    SELECT ur.*, b.visits_for_prize 
-                    FROM user_rewards ur
-                    JOIN businesses b ON ur.business_id = b.id
-                    WHERE ur.id = %s AND ur.user_id = %s AND ur.status = 'vigente'
-                """, (coupon_id, user_id))
-                
-                coupon = cursor.fetchone()
-                if not coupon:
-                    return {"success": False, "error": "Cupón no válido o ya reclamado"}
-                
-                business_id = coupon['business_id']
-                max_visits = coupon['visits_for_prize'] or 6
-                
-                # Si el cupón existe y está vigente, significa que ya alcanzó la meta cuando se generó
-                # No necesitamos verificar el progreso actual de la ronda
-                
-                # Obtener la ronda donde se generó este cupón
-                cursor.execute("""
-                    SELECT * FROM user_rounds 
-                    WHERE user_id = %s AND business_id = %s 
-                    AND progress_in_round >= %s
-                    ORDER BY round_number DESC LIMIT 1
-                """, (user_id, business_id, max_visits))
-                
-                completed_round = cursor.fetchone()
-                
-                # Si no hay ronda completada, verificar ronda actual
-                if not completed_round:
-                    round_stats = UserRound.get_user_round_stats(user_id, business_id)
-                    current_round = round_stats['current_round']
-                    
-                    if not current_round or current_round['progress_in_round'] < max_visits:
-                        return {
-                            "success": False, 
-                            "error": f"Necesitas {max_visits} visitas para reclamar el premio. Tienes {current_round['progress_in_round'] if current_round else 0}"
-                        }
-                    completed_round = current_round
-                
-                # Verificar que no haya reclamado ya esta ronda
-                if completed_round['is_reward_claimed']:
-                    return {"success": False, "error": "Ya reclamaste el premio de esta ronda"}
-                
-                # Reclamar cupón
-                success = UserReward.claim_coupon(coupon_id, user_id)
-                if not success:
-                    return {"success": False, "error": "Error reclamando cupón"}
-                
-                # Completar ronda, reclamar premio e iniciar nueva
-                UserRound.complete_round_and_claim_reward(user_id, business_id)
-                
-                log_info(f"Cupón {coupon_id} reclamado y ronda completada para usuario {user_id}")
-                
-                return {
-                    "success": True,
-                    "message": "Premio reclamado exitosamente. Nueva ronda iniciada.",
-                    "round_completed": completed_round['round_number'],
-                    "new_round_started": completed_round['round_number'] + 1
-                }
-                
+            with unit_of_work():
+                connection = get_db_connection()
+                with connection.cursor() as cursor:
+                    # Un solo reclamo a la vez por (usuario, negocio)
+                    cursor.execute("SELECT business_id FROM user_rewards WHERE id = %s AND user_id = %s", (coupon_id, user_id))
+                    owner = cursor.fetchone()
+                    if not owner:
+                        return {"success": False, "error": "Cupón no válido o ya reclamado"}
+                    LoyaltyState.lock(cursor, user_id, owner['business_id'])
+                    
+                    # Obtener información del cupón
+                    cursor.execute("""
+                        SELECT ur.*, b.visits_for_prize 
+                        FROM user_rewards ur
+                        JOIN businesses b ON ur.business_id = b.id
+                        WHERE ur.id = %s AND ur.user_id = %s AND ur.status = 'vigente'
+                    """, (coupon_id, user_id))
+                    
+                    coupon = cursor.fetchone()
+                    if not coupon:
+                        return {"success": False, "error": "Cupón no válido o ya reclamado"}
+                    
+                    business_id = coupon['business_id']
+                    max_visits = coupon['visits_for_prize'] or 6
+                    
+                    # Si el cupón existe y está vigente, significa que ya alcanzó la meta cuando se generó
+                    # No necesitamos verificar el progreso actual de la ronda
+                    
+                    # Obtener la ronda donde se generó este cupón
+                    cursor.execute("""
+                        SELECT * FROM user_rounds 
+                        WHERE user_id = %s AND business_id = %s 
+                        AND progress_in_round >= %s
+                        ORDER BY round_number DESC LIMIT 1
+                    """, (user_id, business_id, max_visits))
+                    
+                    completed_round = cursor.fetchone()
+                    
+                    # Si no hay ronda completada, verificar ronda actual
+                    if not completed_round:
+                        round_stats = UserRound.get_user_round_stats(user_id, business_id)
+                        current_round = round_stats['current_round']
+                        
+                        if not current_round or current_round['progress_in_round'] < max_visits:
+                            return {
+                                "success": False, 
+                                "error": f"Necesitas {max_visits} visitas para reclamar el premio. Tienes {current_round['progress_in_round'] if current_round else 0}"
+                            }
+                        completed_round = current_round
+                    
+                    # Verificar que no haya reclamado ya esta ronda
+                    if completed_round['is_reward_claimed']:
+                        return {"success": False, "error": "Ya reclamaste el premio de esta ronda"}
+                    
+                    # Reclamar cupón
+                    success = UserReward.claim_coupon(coupon_id, user_id)
+                    if not success:
+                        return {"success": False, "error": "Error reclamando cupón"}
+                    
+                    # Completar ronda, reclamar premio e iniciar nueva. Sin ronda abierta
+                    # se revierte también el cupón: la unidad de trabajo no confirma nada
+                    if not UserRound.complete_round_and_claim_reward(user_id, business_id):
+                        connection.rollback()
+                        return {"success": False, "error": "No hay una ronda abierta para completar"}
+                    
+                    log_info(f"Cupón {coupon_id} reclamado y ronda completada para usuario {user_id}")
+                    
+                    return {
+                        "success": True,
+                        "message": "Premio reclamado exitosamente. Nueva ronda iniciada.",
+                        "round_completed": completed_round['round_number'],
+                        "new_round_started": completed_round['round_number'] + 1
+                    }
+                    
         except Exception as e:
             log_error("Error reclamando cupón con rondas", error=e)
             return {"success": False, "error": "Error interno del servidor"}
-        finally:
-            connection.close()
     
     @staticmethod
     def redeem_coupon(coupon_id: int, user_id: int) -> bool:
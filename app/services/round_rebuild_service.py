@@ -0,0 +1,226 @@
+from app.config.database import get_db_connection
+from app.services.partition_service import ARCHIVE_SCHEMA
+from app.utils.logger import log_info, log_error
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import io
+import time
+import psycopg2.extensions
+from psycopg2 import sql
+
+# Columnas escritas con COPY en la tabla temporal y luego en user_rounds
+ROUND_COLUMNS = (
+    "user_id", "business_id", "round_number", "progress_in_round", "round_start_date",
+    "completed_at", "is_completed", "is_reward_claimed", "last_visit_id"
+)
+
+# Visitas ordenadas por (usuario, negocio, fecha) con la meta del negocio y cuántas rondas
+# ya tenían el premio reclamado (se conservan al reconstruir)
+VISIT_STREAM_SQL = """
+    SELECT uv.user_id, uv.business_id, uv.id, uv.visit_date,
+           COALESCE(b.visits_for_prize, 6) AS visits_for_prize,
+           COALESCE(claims.claimed_rounds, 0) AS claimed_rounds
+    FROM {visits} uv
+    JOIN businesses b ON b.id = uv.business_id
+    LEFT JOIN (
+        SELECT user_id, business_id, COUNT(*) FILTER (WHERE is_reward_claimed) AS claimed_rounds
+        FROM user_rounds
+        {round_filter}
+        GROUP BY user_id, business_id
+    ) claims ON claims.user_id = uv.user_id AND claims.business_id = uv.business_id
+    {visit_filter}
+    ORDER BY uv.user_id, uv.business_id, uv.visit_date, uv.id
+"""
+
+# Particiones de user_visits que la retención movió al esquema archive
+ARCHIVED_VISITS_SQL = """
+    SELECT tablename FROM pg_tables
+    WHERE schemaname = %s AND tablename LIKE 'user\\_visits\\_p%%'
+    ORDER BY tablename
+"""
+
+def visit_source(archived: List[str]) -> sql.Composable:
+    """user_visits más sus particiones archivadas: la historia completa de visitas
+    
+    Sin ellas, la reconstrucción recalcularía las rondas solo con los meses adjuntos y
+    perdería las rondas completadas y el progreso de los meses archivados.
+    """
+    if not archived:
+        return sql.Identifier("user_visits")
+    branches = [sql.SQL("SELECT id, user_id, business_id, visit_date FROM user_visits")]
+    branches.extend(
+        sql.SQL("SELECT id, user_id, business_id, visit_date FROM {}").format(sql.Identifier(ARCHIVE_SCHEMA, name))
+        for name in archived
+    )
+    return sql.SQL("({})").format(sql.SQL(" UNION ALL ").join(branches))
+
+def compute_rounds(
+    user_id: int,
+    business_id: int,
+    visits: List[Tuple[int, object]],
+    visits_for_prize: int,
+    claimed_rounds: int
+) -> List[Tuple]:
+    """Rondas de un (usuario, negocio) a partir de sus visitas (id, fecha) en orden
+    
+    Cada ronda agrupa `visits_for_prize` visitas. Se cierran tantas rondas completas como
+    premios se habían reclamado; el resto de las visitas forma la ronda abierta, que (como
+    en el registro en línea) puede superar la meta mientras el premio está pendiente.
+    """
+    completed = min(claimed_rounds, len(visits) // visits_for_prize)
+    rounds = []
+    for index in range(completed):
+        first, last = visits[index * visits_for_prize], visits[(index + 1) * visits_for_prize - 1]
+        rounds.append((
+            user_id, business_id, index + 1, visits_for_prize, first[1], last[1], True, True, last[0]
+        ))
+    
+    rest = visits[completed * visits_for_prize:]
+    if rest:
+        rounds.append((
+            user_id, business_id, completed + 1, len(rest), rest[0][1], None, False, False, rest[-1][0]
+        ))
+    return rounds
+
+def iter_pair_rounds(rows: Iterable[Tuple]) -> Iterable[Tuple[int, List[Tuple]]]:
+    """Agrupa el flujo ordenado de visitas por (usuario, negocio) y produce sus rondas
+    
+    Devuelve pares (visitas consumidas, rondas) para reportar progreso por visita.
+    """
+    current_key, visits, goal, claimed = None, [], 6, 0
+    for user_id, business_id, visit_id, visit_date, visits_for_prize, claimed_rounds in rows:
+        key = (user_id, business_id)
+        if key != current_key:
+            if visits:
+                yield len(visits), compute_rounds(current_key[0], current_key[1], visits, goal, claimed)
+            current_key, visits, goal, claimed = key, [], max(visits_for_prize, 1), claimed_rounds
+        visits.append((visit_id, visit_date))
+    if visits:
+        yield len(visits), compute_rounds(current_key[0], current_key[1], visits, goal, claimed)
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    return str(value)
+
+class RoundRebuildService:
+    """Reconstrucción masiva de user_rounds (y loyalty_state) a partir de user_visits"""
+    
+    @staticmethod
+    def rebuild(
+        business_id: Optional[int] = None,
+        chunk_size: int = 50000,
+        progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """Recalcula las rondas de un negocio (o de toda la base) con su meta actual
+        
+        Lee las visitas con un cursor de servidor en bloques de `chunk_size`, calcula las
+        rondas en memoria y las escribe con COPY en una tabla temporal. Al final, en la
+        misma transacción, reemplaza las rondas de los pares reconstruidos y actualiza
+        loyalty_state. user_rounds queda bloqueada para escritura mientras tanto (los
+        registros de visita esperan), por lo que el resultado es consistente. Las visitas
+        incluyen las particiones archivadas por la retención (esquema archive); las que se
+        borraron con --drop ya no se pueden contar.
+        """
+        started = time.perf_counter()
+        stats = {"business_id": business_id, "visits": 0, "pairs": 0, "rounds": 0}
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("LOCK TABLE user_rounds IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute("""
+                    CREATE TEMP TABLE rebuilt_rounds (
+                        user_id INTEGER, business_id BIGINT, round_number INTEGER,
+                        progress_in_round INTEGER, round_start_date TIMESTAMP, completed_at TIMESTAMP,
+                        is_completed BOOLEAN, is_reward_claimed BOOLEAN, last_visit_id BIGINT
+                    ) ON COMMIT DROP
+                """)
+                
+                cursor.execute(ARCHIVED_VISITS_SQL, (ARCHIVE_SCHEMA,))
+                archived = [row['tablename'] for row in cursor.fetchall()]
+                stats["archived_partitions"] = len(archived)
+                stream_sql = sql.SQL(VISIT_STREAM_SQL).format(
+                    visits=visit_source(archived),
+                    round_filter=sql.SQL("WHERE business_id = %(business_id)s" if business_id else ""),
+                    visit_filter=sql.SQL("WHERE uv.business_id = %(business_id)s" if business_id else "")
+                )
+                # Cursor de servidor con filas como tuplas (sin RealDictCursor) para el flujo
+                stream = connection.cursor(name="round_rebuild_stream", cursor_factory=psycopg2.extensions.cursor)
+                stream.itersize = chunk_size
+                stream.execute(stream_sql, {"business_id": business_id})
+                
+                buffer: List[Tuple] = []
+                next_report = chunk_size
+                for visit_count, rounds in iter_pair_rounds(stream):
+                    stats["visits"] += visit_count
+                    stats["pairs"] += 1
+                    stats["rounds"] += len(rounds)
+                    buffer.extend(rounds)
+                    if len(buffer) >= chunk_size:
+                        RoundRebuildService._copy_rounds(cursor, buffer)
+                        buffer = []
+                    if stats["visits"] >= next_report:
+                        next_report += chunk_size
+                        RoundRebuildService._report(stats, started, progress)
+                stream.close()
+                RoundRebuildService._copy_rounds(cursor, buffer)
+                
+                cursor.execute("ANALYZE rebuilt_rounds")
+                cursor.execute("""
+                    DELETE FROM user_rounds ur
+                    USING (SELECT DISTINCT user_id, business_id FROM rebuilt_rounds) rebuilt
+                    WHERE ur.user_id = rebuilt.user_id AND ur.business_id = rebuilt.business_id
+                """)
+                stats["rounds_replaced"] = cursor.rowcount
+                columns = ", ".join(ROUND_COLUMNS)
+                cursor.execute(f"INSERT INTO user_rounds ({columns}) SELECT {columns} FROM rebuilt_rounds")
+                
+                # Ronda actual y rondas completadas en loyalty_state
+                cursor.execute("""
+                    INSERT INTO loyalty_state (user_id, business_id, round_number, progress_in_round, completed_rounds)
+                    SELECT user_id, business_id,
+                           COUNT(*) FILTER (WHERE is_completed) + 1,
+                           COALESCE(MAX(progress_in_round) FILTER (WHERE NOT is_completed), 0),
+                           COUNT(*) FILTER (WHERE is_completed)
+                    FROM rebuilt_rounds
+                    GROUP BY user_id, business_id
+                    ON CONFLICT (user_id, business_id) DO UPDATE
+                    SET round_number = EXCLUDED.round_number,
+                        progress_in_round = EXCLUDED.progress_in_round,
+                        completed_rounds = EXCLUDED.completed_rounds,
+                        updated_at = NOW()
+                """)
+                connection.commit()
+            
+            stats["seconds"] = round(time.perf_counter() - started, 2)
+            log_info("Rondas reconstruidas", **stats)
+            return stats
+        except Exception as e:
+            connection.rollback()
+            log_error("Error reconstruyendo rondas", error=e, business_id=business_id)
+            raise
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def _copy_rounds(cursor, rounds: List[Tuple]):
+        """Escribe un bloque de rondas en la tabla temporal con COPY"""
+        if not rounds:
+            return
+        data = io.StringIO()
+        for round_row in rounds:
+            data.write("\t".join(_copy_value(value) for value in round_row))
+            data.write("\n")
+        data.seek(0)
+        cursor.copy_expert(f"COPY rebuilt_rounds ({', '.join(ROUND_COLUMNS)}) FROM STDIN", data)
+    
+    @staticmethod
+    def _report(stats: Dict, started: float, progress: Optional[Callable[[Dict], None]]):
+        elapsed = time.perf_counter() - started
+        snapshot = {**stats, "seconds": round(elapsed, 1), "visits_per_second": int(stats["visits"] / elapsed) if elapsed else 0}
+        log_info("Reconstrucción de rondas en curso", **snapshot)
+        if progress:
+            progress(snapshot)
@@ -0,0 +1,125 @@
+from app.config.database import get_db_connection
+from app.config.settings import settings
+from app.models.user_visit import UserVisit
+from app.utils.logger import log_error, log_info
+from typing import Dict, List
+from datetime import datetime, timedelta
+
+# Tolerancia para relojes de dispositivos adelantados
+CLOCK_SKEW = timedelta(minutes=5)
+
+class ScanBatchService:
+    """Carga masiva de escaneos QR hechos sin conexión por el escáner del negocio"""
+    
+    @staticmethod
+    def process_batch(business_id: int, owner_user_id: int, scans: List[Dict]) -> Dict:
+        """Verifica y registra un lote de escaneos {qr_token, scanned_at}
+        
+        Cada escaneo se valida contra el momento en que se hizo (firma, expiración,
+        negocio y antigüedad máxima). Los válidos se registran juntos con
+        UserVisit.register_visits_bulk; la clave del día descarta repetidos dentro del
+        lote y contra visitas ya registradas. Devuelve un resultado por escaneo, en el
+        mismo orden del lote.
+        """
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT owner_user_id, name FROM businesses
+                    WHERE id = %s AND active = TRUE
+                """, (business_id,))
+                business = cursor.fetchone()
+                if not business:
+                    return {"success": False, "error": "Negocio no encontrado"}
+                if business['owner_user_id'] != owner_user_id:
+                    return {"success": False, "error": "Sin permisos"}
+                
+                now = datetime.now()
+                oldest = now - timedelta(hours=settings.offline_scan_max_age_hours)
+                results: List[Dict] = []
+                accepted: Dict[tuple, int] = {}
+                
+                for index, scan in enumerate(scans):
+                    scanned_at = scan['scanned_at']
+                    if scanned_at.tzinfo is not None:
+                        scanned_at = scanned_at.astimezone().replace(tzinfo=None)
+                    result = {"index": index, "status": "rechazada"}
+                    results.append(result)
+                    
+                    if scanned_at > now + CLOCK_SKEW:
+                        result["error"] = "Fecha de escaneo en el futuro"
+                        continue
+                    if scanned_at < oldest:
+                        result["error"] = "Escaneo demasiado antiguo"
+                        continue
+                    
+                    qr_info = UserVisit.verify_qr_code(scan['qr_token'], scanned_at)
+                    if not qr_info or not qr_info['user_id']:
+                        result["error"] = "Código QR inválido o expirado"
+                        continue
+                    if qr_info['business_id'] != business_id:
+                        result["error"] = "QR de otro negocio"
+                        continue
+                    
+                    result.update(user_id=qr_info['user_id'], scanned_at=scanned_at)
+                    key = (qr_info['user_id'], scanned_at.date())
+                    if key in accepted:
+                        result.update(status="duplicada", error="Escaneo repetido en el lote")
+                        continue
+                    accepted[key] = index
+                
+                # Clientes existentes en una sola consulta
+                user_ids = sorted({user_id for user_id, _ in accepted})
+                names = {}
+                if user_ids:
+                    cursor.execute("SELECT id, nombre FROM users WHERE id = ANY(%s)", (user_ids,))
+                    names = {user['id']: user['nombre'] for user in cursor.fetchall()}
+        finally:
+            connection.close()
+        
+        visits = []
+        for key, index in list(accepted.items()):
+            if key[0] not in names:
+                results[index]["error"] = "Cliente no encontrado"
+                del accepted[key]
+                continue
+            visits.append((key[0], results[index]["scanned_at"]))
+        
+        try:
+            registered = UserVisit.register_visits_bulk(business_id, visits)
+        except Exception as e:
+            log_error("Error registrando lote de escaneos", error=e, business_id=business_id)
+            return {"success": False, "error": "Error al registrar"}
+        
+        # Premios: una verificación por cliente que alcanzó la meta
+        from app.services.reward_service import RewardService
+        goal_reached = {
+            user_id for (user_id, _), visit in registered.items()
+            if visit['progress_in_round'] >= (visit['visits_for_prize'] or 6)
+        }
+        rewards = {user_id: RewardService.check_and_generate_reward(user_id, business_id) for user_id in goal_reached}
+        
+        for key, index in accepted.items():
+            result = results[index]
+            result["customer_name"] = names[key[0]]
+            visit = registered.get(key)
+            if not visit:
+                result.update(status="duplicada", error="Visita ya registrada")
+                continue
+            result.update(
+                status="registrada",
+                round_number=visit['round_number'],
+                progress_in_round=visit['progress_in_round'],
+                max_visits_per_round=visit['visits_for_prize'] or 6,
+                reward_earned=rewards.get(key[0]) is not None
+            )
+        
+        summary = {"total": len(scans), "registradas": 0, "duplicadas": 0, "rechazadas": 0}
+        for result in results:
+            summary[result["status"] + "s"] += 1
+            if "scanned_at" in result:
+                result["scanned_at"] = result["scanned_at"].isoformat()
+        
+        log_info("Lote offline procesado", business_id=business_id, **summary)
+        return {"success": True, "data": {**summary, "results": results}}
+
@@ -1,6 +1,7 @@
-from app.config.database import get_db_connection
+from app.config.database import get_db_connection, unit_of_work
 from app.models.user_visit import UserVisit
 from app.utils.logger import log_info, log_error
+from app.utils.qr_renderer import qr_render_pool
 from datetime import datetime
 from typing import Dict, Optional
 
@@ -55,10 +56,16 @@ class UserService:
         return UserVisit.get_user_visits(user_id)
     
     @staticmethod
-    def generate_qr_code(user_id: int, business_id: int, visit_date: datetime):
-        """Genera código QR sin registrar visita"""
-        log_info(f"Generando QR para usuario {user_id} en negocio {business_id}")
-        qr_code = UserVisit.generate_qr_code(user_id, business_id, visit_date)
+    async def generate_qr_code(user_id: int, business_id: int, visit_date: datetime, image_format: str = "png"):
+        """Genera código QR sin registrar visita; la imagen se renderiza en el pool de procesos
+        
+        Con image_format="token" no se renderiza: se devuelve el token para que lo dibuje el cliente.
+        """
+        log_info(f"Generando QR para usuario {user_id} en negocio {business_id}", format=image_format)
+        qr_token = UserVisit.create_qr_token(user_id, business_id, visit_date)
+        if image_format == "token":
+            return qr_token is not None, qr_token
+        qr_code = await qr_render_pool.render(qr_token, image_format)
         return qr_code is not None, qr_code
     
     @staticmethod
@@ -82,61 +89,42 @@ class UserService:
         if visit_date.year != current_date.year or visit_date.month != current_date.month:
             return {"valid": False, "error": "El código QR no corresponde al mes actual"}
         
-        # Verificar si ya existe la visita
-        connection = get_db_connection()
+        # Toda la cadena visita → ronda → premio corre en una sola transacción
         try:
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM user_visits 
-                    WHERE user_id = %s AND business_id = %s 
-                    AND DATE(visit_date) = DATE(%s)
-                """, (expected_user_id, expected_business_id, visit_date))
-                
-                if cursor.fetchone()["count"] > 0:
+            with unit_of_work():
+                # Registrar visita y avanzar la ronda; None si ya hubo visita ese día.
+                # Un escaneo concurrente del mismo día espera en la clave única y no inserta.
+                registered = UserVisit.register_visit(expected_user_id, expected_business_id, visit_date)
+                if not registered:
                     return {"valid": False, "error": "Esta visita ya fue registrada anteriormente"}
+                max_visits = registered['visits_for_prize'] or 6
+                
+                # Verificar si merece un premio
+                from app.services.reward_service import RewardService
+                reward = RewardService.check_and_generate_reward(expected_user_id, expected_business_id)
         except Exception as e:
-            log_error("Error verificando visita existente", error=e)
+            log_error("Error validando visita", error=e)
             return {"valid": False, "error": "Error interno validando la visita"}
-        finally:
-            connection.close()
         
-        # Registrar visita efectiva
-        if UserVisit.register_visit(expected_user_id, expected_business_id, visit_date):
-            # Verificar si merece un premio
-            from app.services.reward_service import RewardService
-            reward = RewardService.check_and_generate_reward(expected_user_id, expected_business_id)
-            
-            # Obtener información de ronda actual
-            from app.models.user_round import UserRound
-            round_stats = UserRound.get_user_round_stats(expected_user_id, expected_business_id)
-            current_round = round_stats['current_round']
-            
-            # Obtener configuración del negocio
-            cursor.execute("SELECT visits_for_prize FROM businesses WHERE id = %s", (expected_business_id,))
-            business = cursor.fetchone()
-            max_visits = business['visits_for_prize'] if business else 6
-            
-            result = {
-                "valid": True,
-                "visit_registered": True,
-                "visit_data": {
-                    "user_id": qr_data["user_id"],
-                    "business_id": qr_data["business_id"],
-                    "visit_date": visit_date.isoformat()
-                },
-                "current_round": current_round['round_number'] if current_round else 1,
-                "progress_in_round": current_round['progress_in_round'] if current_round else 1,
-                "max_visits_per_round": max_visits
-            }
-            
-            # Agregar información del premio si se generó
-            if reward:
-                result["reward_earned"] = True
-                result["reward_data"] = reward
-                log_info(f"Premio automático generado para usuario {expected_user_id}")
-            else:
-                result["reward_earned"] = False
-            
-            return result
+        result = {
+            "valid": True,
+            "visit_registered": True,
+            "visit_data": {
+                "user_id": qr_data["user_id"],
+                "business_id": qr_data["business_id"],
+                "visit_date": visit_date.isoformat()
+            },
+            "current_round": registered['round_number'],
+            "progress_in_round": registered['progress_in_round'],
+            "max_visits_per_round": max_visits
+        }
+        
+        # Agregar información del premio si se generó
+        if reward:
+            result["reward_earned"] = True
+            result["reward_data"] = reward
+            log_info(f"Premio automático generado para usuario {expected_user_id}")
         else:
-            return {"valid": False, "error": "Error registrando la visita"}
\ No newline at end of file
+            result["reward_earned"] = False
+        
+        return result
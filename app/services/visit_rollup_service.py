@@ -0,0 +1,78 @@
+from app.config.database import get_db_connection
+from app.config.settings import settings
+from app.utils.logger import log_info, log_error
+from typing import Dict, Optional
+from datetime import date, timedelta
+
+ROLLUP_NAME = "visit_daily_rollup"
+
+# Conteos por (negocio, día) de un rango de días; re-ejecutable (upsert)
+ROLLUP_RANGE_SQL = """
+    INSERT INTO visit_daily_rollup (business_id, day, visits, unique_users)
+    SELECT business_id, visit_day, COUNT(*), COUNT(DISTINCT user_id)
+    FROM user_visits
+    WHERE visit_day >= %(start)s AND visit_day < %(end)s
+    GROUP BY business_id, visit_day
+    ON CONFLICT (business_id, day) DO UPDATE
+    SET visits = EXCLUDED.visits, unique_users = EXCLUDED.unique_users, updated_at = NOW()
+"""
+
+class VisitRollupService:
+    """Rollups diarios de visitas (visit_daily_rollup) para dashboards y estadísticas"""
+    
+    @staticmethod
+    def rollup_range(start: date, end: date) -> int:
+        """Recalcula los rollups de los días en [start, end); devuelve las filas escritas"""
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(ROLLUP_RANGE_SQL, {"start": start, "end": end})
+                written = cursor.rowcount
+                connection.commit()
+            return written
+        except Exception as e:
+            connection.rollback()
+            log_error("Error calculando rollups de visitas", error=e, start=start, end=end)
+            raise
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def run_nightly(today: Optional[date] = None) -> Dict:
+        """Job nocturno: cierra los días pendientes hasta ayer y avanza la marca
+        
+        Además de los días posteriores a la marca, recalcula los últimos
+        VISIT_ROLLUP_LOOKBACK_DAYS días para incluir escaneos offline cargados tarde.
+        """
+        today = today or date.today()
+        connection = get_db_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT rolled_through FROM rollup_watermarks WHERE rollup = %s FOR UPDATE", (ROLLUP_NAME,))
+                watermark = cursor.fetchone()
+                start = today - timedelta(days=settings.visit_rollup_lookback_days)
+                if watermark:
+                    start = min(start, watermark['rolled_through'] + timedelta(days=1))
+                else:
+                    cursor.execute("SELECT MIN(visit_day) AS first_day FROM user_visits")
+                    start = min(start, cursor.fetchone()['first_day'] or today)
+                
+                cursor.execute(ROLLUP_RANGE_SQL, {"start": start, "end": today})
+                written = cursor.rowcount
+                cursor.execute("""
+                    INSERT INTO rollup_watermarks (rollup, rolled_through) VALUES (%s, %s)
+                    ON CONFLICT (rollup) DO UPDATE
+                    SET rolled_through = GREATEST(rollup_watermarks.rolled_through, EXCLUDED.rolled_through),
+                        updated_at = NOW()
+                """, (ROLLUP_NAME, today - timedelta(days=1)))
+                connection.commit()
+            
+            result = {"from": start.isoformat(), "through": (today - timedelta(days=1)).isoformat(), "rows": written}
+            log_info("Rollups de visitas actualizados", **result)
+            return result
+        except Exception as e:
+            connection.rollback()
+            log_error("Error en el job de rollups de visitas", error=e)
+            raise
+        finally:
+            connection.close()
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from app.config.settings import settings
+from app.utils.logger import log_info, log_warning
+
+class MemoryIdempotencyBackend:
+    """LRU en memoria del proceso con expiración por TTL"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max(max_entries, 1)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, record: Dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class RedisIdempotencyBackend:
+    """Backend compartido entre workers (requiere el paquete opcional `redis`)"""
+
+    def __init__(self, url: str, ttl: float):
+        import redis
+        self.ttl = max(int(ttl), 1)
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[Dict]:
+        raw = self._client.get(f"idempotency:{key}")
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, record: Dict):
+        self._client.set(f"idempotency:{key}", json.dumps(record), ex=self.ttl)
+
+    def size(self) -> Optional[int]:
+        return None
+
+class IdempotencyStore:
+    """Respuestas guardadas por Idempotency-Key y espera de duplicados en vuelo.
+
+    La primera petición con una clave ejecuta el handler y guarda su respuesta;
+    las repeticiones reciben la misma respuesta sin volver a la base de datos.
+    Un duplicado que llega mientras la original sigue en curso espera su
+    resultado en lugar de ejecutarse en paralelo (dentro del mismo proceso).
+    """
+
+    def __init__(self, local: MemoryIdempotencyBackend, shared=None):
+        self.local = local
+        self.shared = shared
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {"stored": 0, "replayed": 0, "inflight_waits": 0, "mismatches": 0, "shared_errors": 0}
+
+    async def _lookup(self, key: str) -> Optional[Dict]:
+        record = self.local.get(key)
+        if record is None and self.shared is not None:
+            try:
+                record = await run_in_threadpool(self.shared.get, key)
+            except Exception as e:
+                self._stats["shared_errors"] += 1
+                log_warning("Backend de idempotencia no disponible", error=e)
+                return None
+            if record is not None:
+                self.local.set(key, record)
+        return record
+
+    async def _store(self, key: str, record: Dict):
+        self.local.set(key, record)
+        if self.shared is not None:
+            try:
+                await run_in_threadpool(self.shared.set, key, record)
+            except Exception as e:
+                self._stats["shared_errors"] += 1
+                log_warning("Backend de idempotencia no disponible", error=e)
+        self._stats["stored"] += 1
+
+    def _replay(self, record: Dict, fingerprint: str, response: Optional[Response]) -> Any:
+        if record["fingerprint"] != fingerprint:
+            self._stats["mismatches"] += 1
+            raise HTTPException(
+                status_code=422,
+                detail="La Idempotency-Key ya se usó con una petición distinta"
+            )
+        self._stats["replayed"] += 1
+        if response is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+        return record["body"]
+
+    async def run(
+        self,
+        idempotency_key: Optional[str],
+        scope: str,
+        request_data: Any,
+        handler: Callable[[], Awaitable[Any]],
+        response: Optional[Response] = None
+    ) -> Any:
+        """Ejecuta `handler` una sola vez por (scope, clave); sin clave lo ejecuta siempre
+
+        `scope` debe incluir la ruta y el usuario para que una clave no se comparta
+        entre clientes. `request_data` identifica la petición: la misma clave con otro
+        contenido responde 422.
+        """
+        if not idempotency_key:
+            return await handler()
+        if len(idempotency_key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key demasiado larga")
+
+        key = f"{scope}:{idempotency_key}"
+        fingerprint = hashlib.sha256(
+            json.dumps(jsonable_encoder(request_data), sort_keys=True).encode()
+        ).hexdigest()
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._stats["inflight_waits"] += 1
+            record = await asyncio.shield(pending)
+            return self._replay(record, fingerprint, response)
+
+        # La clave queda en vuelo desde antes de consultar el backend compartido para
+        # que un duplicado concurrente espere en lugar de ejecutar el handler
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            record = await self._lookup(key)
+            if record is None:
+                body = jsonable_encoder(await handler())
+                record = {"fingerprint": fingerprint, "body": body}
+                await self._store(key, record)
+                future.set_result(record)
+                return body
+            future.set_result(record)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Los errores no se guardan: el duplicado en espera recibe el mismo error
+            # y un reintento posterior vuelve a ejecutar la operación
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        return self._replay(record, fingerprint, response)
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "entries": self.local.size(),
+            "in_flight": len(self._inflight),
+            "shared_backend": self.shared is not None
+        }
+
+def _create_store() -> IdempotencyStore:
+    local = MemoryIdempotencyBackend(settings.idempotency_max_entries, settings.idempotency_ttl)
+    shared = None
+    if settings.idempotency_redis_url:
+        try:
+            shared = RedisIdempotencyBackend(settings.idempotency_redis_url, settings.idempotency_ttl)
+            log_info("Idempotencia con backend compartido (Redis)")
+        except ImportError:
+            log_warning("IDEMPOTENCY_REDIS_URL definido pero el paquete redis no está instalado; se usa solo memoria")
+    return IdempotencyStore(local, shared)
+
+idempotency_store = _create_store()
+
+def get_idempotency_stats() -> Dict:
+    return idempotency_store.stats()
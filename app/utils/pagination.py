@@ -0,0 +1,149 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from app.config.settings import settings
+
+class InvalidCursorError(ValueError):
+    """El cursor de paginación no se pudo decodificar"""
+
+def encode_cursor(row: Dict, direction: str = "next") -> str:
+    """Cursor opaco con la posición (created_at, id) de una fila"""
+    created_at = row["created_at"]
+    payload = {
+        "c": created_at.isoformat() if isinstance(created_at, datetime) else str(created_at),
+        "i": row["id"],
+        "d": direction
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload.get("d", "next")
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload["c"]), int(payload["i"]), direction
+    except Exception:
+        raise InvalidCursorError("Cursor de paginación inválido")
+
+def keyset_query(alias: str, cursor: Optional[str]) -> Tuple[str, List, str, str]:
+    """Condición, parámetros, ORDER BY y dirección para paginar por (created_at, id) descendente
+
+    "next" avanza hacia registros más antiguos; "prev" regresa hacia los más recientes
+    (se consulta en orden ascendente y build_page invierte el resultado). La cota simple
+    sobre created_at es redundante con la comparación de filas, pero permite podar
+    particiones (audit_logs está particionada por created_at).
+    """
+    if not cursor:
+        return "", [], f"{alias}.created_at DESC, {alias}.id DESC", "next"
+
+    created_at, row_id, direction = decode_cursor(cursor)
+    if direction == "next":
+        return (
+            f" AND {alias}.created_at <= %s AND ({alias}.created_at, {alias}.id) < (%s, %s)",
+            [created_at, created_at, row_id],
+            f"{alias}.created_at DESC, {alias}.id DESC",
+            direction
+        )
+    return (
+        f" AND {alias}.created_at >= %s AND ({alias}.created_at, {alias}.id) > (%s, %s)",
+        [created_at, created_at, row_id],
+        f"{alias}.created_at ASC, {alias}.id ASC",
+        direction
+    )
+
+def build_page(rows: List, limit: int, direction: str, has_cursor: bool) -> Tuple[List, Dict]:
+    """Recorta la fila extra (se consulta limit + 1) y arma los cursores siguiente/anterior"""
+    has_more = len(rows) > limit
+    items = list(rows[:limit])
+    if direction == "prev":
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, has_cursor
+
+    pagination = {
+        "limit": limit,
+        "next_cursor": encode_cursor(items[-1], "next") if items and has_next else None,
+        "prev_cursor": encode_cursor(items[0], "prev") if items and has_prev else None,
+        "has_more": has_next
+    }
+    return items, pagination
+
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    """Posición de un cursor de resultados ordenados por relevancia (búsqueda)"""
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        offset = int(json.loads(raw)["o"])
+        if offset < 0:
+            raise ValueError(offset)
+        return offset
+    except Exception:
+        raise InvalidCursorError("Cursor de paginación inválido")
+
+def build_ranked_page(rows: List, limit: int, offset: int) -> Tuple[List, Dict]:
+    """Igual que build_page para resultados por relevancia: el cursor guarda la posición"""
+    def encode(position: int) -> str:
+        raw = json.dumps({"o": position}, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    has_more = len(rows) > limit
+    pagination = {
+        "limit": limit,
+        "next_cursor": encode(offset + limit) if has_more else None,
+        "prev_cursor": encode(max(offset - limit, 0)) if offset > 0 else None,
+        "has_more": has_more
+    }
+    return list(rows[:limit]), pagination
+
+class CountCache:
+    """Conteos totales cacheados por (consulta, parámetros) durante `ttl` segundos"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Tuple, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Tuple, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+        value = compute()
+        with self._lock:
+            if len(self._entries) > 1000:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+_count_cache = CountCache(settings.pagination_count_cache_ttl)
+
+def approximate_count(cursor, table: str) -> Optional[int]:
+    """Filas estimadas por el planner (pg_class.reltuples); None si la tabla nunca se analizó"""
+    cursor.execute("SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    if not row or row["estimate"] is None or row["estimate"] < 0:
+        return None
+    return row["estimate"]
+
+def total_count(cursor, table: str, count_sql: str, params: List, filtered: bool) -> Dict:
+    """Total opcional: aproximado si no hay filtros, exacto y cacheado si los hay"""
+    if not filtered:
+        estimate = approximate_count(cursor, table)
+        if estimate is not None:
+            return {"total": estimate, "total_is_estimate": True}
+
+    def compute() -> int:
+        cursor.execute(count_sql, params)
+        return cursor.fetchone()["total"]
+
+    total = _count_cache.get_or_compute((count_sql, tuple(params)), compute)
+    return {"total": total, "total_is_estimate": False}
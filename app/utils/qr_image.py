@@ -0,0 +1,82 @@
+import base64
+import io
+import qrcode
+
+# Módulo sin dependencias de la aplicación: es lo único que importan los procesos del
+# pool de renderizado (ver app/utils/qr_renderer.py)
+
+# Formatos de respuesta de generate-qr; "token" no renderiza imagen (la dibuja el cliente)
+QR_IMAGE_FORMATS = ("png", "svg")
+QR_FORMATS = QR_IMAGE_FORMATS + ("token",)
+
+# Nivel de corrección de errores como lo nombran las librerías de QR de los clientes
+ERROR_CORRECTION_NAMES = {
+    qrcode.constants.ERROR_CORRECT_L: "L",
+    qrcode.constants.ERROR_CORRECT_M: "M",
+    qrcode.constants.ERROR_CORRECT_Q: "Q",
+    qrcode.constants.ERROR_CORRECT_H: "H",
+}
+
+def _build_qr(data: str, box_size: int, border: int, error_correction: int) -> qrcode.QRCode:
+    qr = qrcode.QRCode(version=1, error_correction=error_correction, box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+def render_png_data_url(
+    data: str,
+    box_size: int = 10,
+    border: int = 5,
+    error_correction: int = qrcode.constants.ERROR_CORRECT_M
+) -> str:
+    """Construye la matriz QR, la rasteriza a PNG y la devuelve como data URL base64"""
+    qr = _build_qr(data, box_size, border, error_correction)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+def render_svg(
+    data: str,
+    box_size: int = 10,
+    border: int = 5,
+    error_correction: int = qrcode.constants.ERROR_CORRECT_M
+) -> str:
+    """Construye la matriz QR y la devuelve como SVG de un solo <path>
+    
+    Cada tramo horizontal de módulos oscuros es un trazo de 1 módulo de grosor con
+    movimientos relativos dentro de la fila, en unidades de módulo (viewBox); `box_size`
+    solo fija el tamaño de dibujo. Sin rasterizar ni base64.
+    """
+    qr = _build_qr(data, box_size, border, error_correction)
+    matrix = qr.get_matrix()
+    size = len(matrix)
+    
+    commands = []
+    for y, row in enumerate(matrix):
+        x, pen = 0, None
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            commands.append(f"M{start} {y}.5h{x - start}" if pen is None else f"m{start - pen} 0h{x - start}")
+            pen = x
+    
+    pixels = size * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" width="{pixels}" '
+        f'height="{pixels}" shape-rendering="crispEdges"><path fill="#fff" d="M0 0h{size}v{size}H0z"/>'
+        f'<path stroke="#000" d="{"".join(commands)}"/></svg>'
+    )
+
+def render_qr_image(data: str, image_format: str = "png", **options) -> str:
+    """Renderiza el QR en el formato pedido: data URL PNG o SVG"""
+    if image_format == "svg":
+        return render_svg(data, **options)
+    if image_format == "png":
+        return render_png_data_url(data, **options)
+    raise ValueError(f"Formato de imagen QR no soportado: {image_format}")
@@ -0,0 +1,247 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+import qrcode
+from fastapi.concurrency import run_in_threadpool
+from app.config.settings import settings
+from app.utils.logger import log_info, log_warning
+from app.utils.qr_image import render_qr_image
+
+# Parámetros de render por defecto (los de render_png_data_url y render_svg) para normalizar la clave
+DEFAULT_RENDER_OPTIONS = {"box_size": 10, "border": 5, "error_correction": qrcode.constants.ERROR_CORRECT_M}
+
+class QRRenderBusyError(Exception):
+    """La cola del pool de renderizado de QR está llena"""
+
+class QRRenderTimeoutError(Exception):
+    """El QR no se renderizó dentro del tiempo de espera"""
+
+class QRImageCache:
+    """LRU con TTL de imágenes QR renderizadas, direccionado por contenido.
+
+    La clave es el hash del contenido codificado y de los parámetros de render: el
+    mismo QR nunca se renderiza dos veces mientras siga en caché. El límite es de
+    memoria (bytes de las data URL y SVG), no de número de entradas.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max(max_bytes, 0)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def key(data: str, options: Dict, image_format: str = "png") -> str:
+        params = {**DEFAULT_RENDER_OPTIONS, **options}
+        raw = f"{image_format}|{params['box_size']}|{params['border']}|{params['error_correction']}|{data}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key: str, image: str):
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, image)
+            self._bytes += len(image)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, image = self._entries.pop(key)
+        self._bytes -= len(image)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
+
+class QRRenderPool:
+    """Pool de procesos acotado para renderizar QR fuera del event loop.
+
+    La matriz QR y el PNG (PIL) o el SVG son CPU puro: en procesos separados no
+    bloquean el event loop ni compiten por el GIL. Se admiten como máximo
+    `workers + queue_limit` renders en vuelo; el resto se rechaza de inmediato con
+    QRRenderBusyError. `timeout` cubre la espera en cola y el render; un render
+    vencido no se interrumpe en el worker, pero la petición deja de esperarlo.
+    Con `workers = 0` se renderiza en el threadpool (desarrollo y pruebas). Los QR ya
+    renderizados se sirven desde `cache` sin ocupar lugar en la cola.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, timeout: float, cache: Optional[QRImageCache] = None):
+        self.cache = cache
+        self.workers = max(workers, 0)
+        self.queue_limit = max(queue_limit, 0)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=1000)
+        self._stats = {"submitted": 0, "completed": 0, "rejected": 0, "timeouts": 0, "errors": 0, "max_in_flight": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: los workers no heredan hilos ni conexiones del proceso principal
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                log_info("Pool de renderizado de QR iniciado", workers=self.workers, queue_limit=self.queue_limit)
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        log_warning("Pool de renderizado de QR reiniciado tras la caída de un worker")
+
+    def _acquire(self) -> float:
+        with self._lock:
+            if self._in_flight >= max(self.workers, 1) + self.queue_limit:
+                self._stats["rejected"] += 1
+                raise QRRenderBusyError("Demasiados códigos QR en cola; intenta de nuevo")
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+        return time.perf_counter()
+
+    def _release(self, started: float, outcome: str):
+        with self._lock:
+            self._in_flight -= 1
+            self._stats[outcome] += 1
+            if outcome == "completed":
+                self._latencies.append((time.perf_counter() - started) * 1000)
+
+    async def render(self, data: str, image_format: str = "png", **options) -> str:
+        """Renderiza el QR de `data` (data URL PNG o SVG) sin bloquear el event loop"""
+        key = self.cache.key(data, options, image_format) if self.cache else None
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            return cached
+        image = await self._render(data, image_format, **options)
+        if self.cache:
+            self.cache.set(key, image)
+        return image
+
+    async def _render(self, data: str, image_format: str, **options) -> str:
+        started = self._acquire()
+        outcome = "errors"
+        future = None
+        try:
+            if self.workers == 0:
+                result = await asyncio.wait_for(
+                    run_in_threadpool(render_qr_image, data, image_format, **options), self.timeout
+                )
+            else:
+                future = self._get_executor().submit(render_qr_image, data, image_format, **options)
+                result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            outcome = "completed"
+            return result
+        except asyncio.TimeoutError:
+            outcome = "timeouts"
+            raise QRRenderTimeoutError(f"El QR no se generó en {self.timeout} s")
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+        finally:
+            if future is not None and outcome != "completed":
+                future.cancel()
+            self._release(started, outcome)
+
+    def render_sync(self, data: str, image_format: str = "png", **options) -> str:
+        """Igual que render() para código síncrono (modelos que corren en el threadpool)"""
+        key = self.cache.key(data, options, image_format) if self.cache else None
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            return cached
+        image = self._render_sync(data, image_format, **options)
+        if self.cache:
+            self.cache.set(key, image)
+        return image
+
+    def _render_sync(self, data: str, image_format: str, **options) -> str:
+        started = self._acquire()
+        outcome = "errors"
+        future = None
+        try:
+            if self.workers == 0:
+                result = render_qr_image(data, image_format, **options)
+            else:
+                future = self._get_executor().submit(render_qr_image, data, image_format, **options)
+                result = future.result(timeout=self.timeout)
+            outcome = "completed"
+            return result
+        except concurrent.futures.TimeoutError:
+            outcome = "timeouts"
+            raise QRRenderTimeoutError(f"El QR no se generó en {self.timeout} s")
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+        finally:
+            if future is not None and outcome != "completed":
+                future.cancel()
+            self._release(started, outcome)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                **self._stats,
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "avg_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+                "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+                "cache": self.cache.stats() if self.cache else None
+            }
+
+qr_render_pool = QRRenderPool(
+    settings.qr_render_workers,
+    settings.qr_render_queue_limit,
+    settings.qr_render_timeout,
+    QRImageCache(settings.qr_cache_max_bytes, settings.qr_cache_ttl) if settings.qr_cache_max_bytes > 0 else None
+)
+
+def get_qr_render_stats() -> Dict:
+    return qr_render_pool.stats()
+
+def shutdown_qr_render_pool():
+    qr_render_pool.shutdown()
@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import struct
+from typing import Dict
+
+# Token compacto de QR: binario de ancho fijo firmado con HMAC truncado y codificado en
+# base45 (RFC 9285). El alfabeto base45 es el del modo alfanumérico de QR, así que el
+# QR sale en ese modo (5.5 bits por carácter) y con una versión mucho menor que un JWT.
+#
+#   byte 0       versión del formato (4 bits altos) y tipo de token (4 bits bajos)
+#   visita       user_id u32 | business_id u32 | visit_timestamp u32 | exp u32
+#   cupón        código u32 (hex de CPN-XXXXXXXX) | user_id u32 | business_id u32 | expires_at u32
+#   últimos 10   HMAC-SHA256 truncado a 80 bits
+#
+# Los tiempos son segundos epoch. 27 bytes -> 41 caracteres (un JWT de visita ronda 200).
+
+TOKEN_VERSION = 1
+VISIT_TOKEN = 1
+COUPON_TOKEN = 2
+
+COUPON_PREFIX = "CPN-"
+SIGNATURE_BYTES = 10
+BODY = struct.Struct(">BIIII")
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+BASE45_VALUES = {char: index for index, char in enumerate(BASE45_ALPHABET)}
+
+class QRTokenError(Exception):
+    """Token compacto de QR mal formado, de otro tipo o con firma inválida"""
+
+def b45encode(data: bytes) -> str:
+    chars = []
+    for index in range(0, len(data) - 1, 2):
+        value = data[index] * 256 + data[index + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars.extend((BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e]))
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars.extend((BASE45_ALPHABET[c], BASE45_ALPHABET[d]))
+    return "".join(chars)
+
+def b45decode(text: str) -> bytes:
+    try:
+        values = [BASE45_VALUES[char] for char in text]
+    except KeyError:
+        raise QRTokenError("Carácter fuera del alfabeto base45")
+    if len(values) % 3 == 1:
+        raise QRTokenError("Longitud base45 inválida")
+    output = bytearray()
+    for index in range(0, len(values), 3):
+        chunk = values[index:index + 3]
+        if len(chunk) == 3:
+            value = chunk[0] + chunk[1] * 45 + chunk[2] * 45 * 45
+            if value > 0xFFFF:
+                raise QRTokenError("Bloque base45 fuera de rango")
+            output.extend(divmod(value, 256))
+        else:
+            value = chunk[0] + chunk[1] * 45
+            if value > 0xFF:
+                raise QRTokenError("Bloque base45 fuera de rango")
+            output.append(value)
+    return bytes(output)
+
+def _sign(body: bytes, secret: str) -> bytes:
+    return hmac.new(secret.encode(), b"qr-token|" + body, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def _encode(kind: int, fields: tuple, secret: str) -> str:
+    try:
+        body = BODY.pack((TOKEN_VERSION << 4) | kind, *fields)
+    except struct.error:
+        raise QRTokenError("Valor fuera del rango del token compacto (u32)")
+    return b45encode(body + _sign(body, secret))
+
+def is_compact_token(token: str) -> bool:
+    """Los JWT empiezan con "eyJ" (JSON en base64url); base45 no tiene minúsculas"""
+    return not token.startswith("eyJ")
+
+def encode_visit_token(user_id: int, business_id: int, visit_timestamp: int, exp: int, secret: str) -> str:
+    """Token compacto del QR de visita"""
+    return _encode(VISIT_TOKEN, (user_id, business_id, visit_timestamp, exp), secret)
+
+def encode_coupon_token(coupon_code: str, user_id: int, business_id: int, expires_at: int, secret: str) -> str:
+    """Token compacto del QR de cupón; el código debe ser CPN- seguido de 8 dígitos hex"""
+    code = coupon_code[len(COUPON_PREFIX):] if coupon_code.startswith(COUPON_PREFIX) else ""
+    if len(code) != 8:
+        raise QRTokenError(f"Código de cupón sin formato compacto: {coupon_code}")
+    try:
+        code_value = int(code, 16)
+    except ValueError:
+        raise QRTokenError(f"Código de cupón sin formato compacto: {coupon_code}")
+    return _encode(COUPON_TOKEN, (code_value, user_id, business_id, expires_at), secret)
+
+def decode_qr_token(token: str, secret: str, kind: int) -> Dict:
+    """Verifica la firma y el tipo de un token compacto y devuelve sus campos
+
+    No evalúa la expiración: cada llamador la compara contra su propio reloj (por
+    ejemplo, el momento del escaneo en los lotes offline).
+    """
+    raw = b45decode(token)
+    if len(raw) != BODY.size + SIGNATURE_BYTES:
+        raise QRTokenError("Longitud de token compacto inválida")
+    body, signature = raw[:BODY.size], raw[BODY.size:]
+    if not hmac.compare_digest(signature, _sign(body, secret)):
+        raise QRTokenError("Firma de token compacto inválida")
+    header, *fields = BODY.unpack(body)
+    if header >> 4 != TOKEN_VERSION or header & 0x0F != kind:
+        raise QRTokenError("Versión o tipo de token compacto inesperado")
+    if kind == COUPON_TOKEN:
+        code_value, user_id, business_id, expires_at = fields
+        return {
+            "coupon_code": f"{COUPON_PREFIX}{code_value:08X}",
+            "user_id": user_id,
+            "business_id": business_id,
+            "expires_at": expires_at
+        }
+    user_id, business_id, visit_timestamp, exp = fields
+    return {"user_id": user_id, "business_id": business_id, "visit_timestamp": visit_timestamp, "exp": exp}
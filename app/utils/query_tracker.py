@@ -0,0 +1,167 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from app.utils.logger import log_warning
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+|%\([a-z_]+\)s|%s|\?|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryBudgetExceeded(Exception):
+    """Una petición ejecutó más consultas de las permitidas por el presupuesto"""
+
+def normalize_statement(statement: str) -> str:
+    """Forma de la sentencia: literales y parámetros como '?', espacios colapsados"""
+    shape = _LITERALS.sub("?", str(statement))
+    return _WHITESPACE.sub(" ", shape).strip()[:200]
+
+class QueryStats:
+    """Consultas ejecutadas durante una petición (compartido entre el event loop y el threadpool)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed_ms: float):
+        shape = normalize_statement(statement)
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """Formas ejecutadas `threshold` veces o más, de la más repetida a la menos"""
+        with self._lock:
+            return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "repeated": [{"statement": shape, "count": count} for shape, count in self.repeated()]
+        }
+
+def get_current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@contextmanager
+def track_queries(budget: Optional[int] = None):
+    """Registra las consultas del bloque; con `budget` lanza QueryBudgetExceeded si se excede
+
+    Útil en scripts de prueba:
+        with track_queries(budget=5) as stats:
+            UserVisit.get_user_visits_with_rounds(user_id)
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+    if budget is not None and stats.count > budget:
+        raise QueryBudgetExceeded(f"{stats.count} consultas (presupuesto {budget})")
+
+def check_budget(label: str, stats: QueryStats, budget: int, repeat_threshold: int, strict: bool = False):
+    """Advierte de presupuesto excedido y de posibles N+1; en modo estricto lanza excepción"""
+    repeated = stats.repeated(repeat_threshold)
+    if repeated:
+        shape, count = repeated[0]
+        log_warning("Posible N+1: sentencia repetida", route=label, count=count, statement=shape)
+    if budget and stats.count > budget:
+        log_warning(
+            "Presupuesto de consultas excedido",
+            route=label, queries=stats.count, budget=budget, db_ms=round(stats.total_ms, 1)
+        )
+        if strict:
+            raise QueryBudgetExceeded(f"{label}: {stats.count} consultas (presupuesto {budget})")
+
+class TrackedCursor:
+    """Cursor que mide y registra cada execute/executemany en las estadísticas de la petición"""
+
+    def __init__(self, cursor, stats: QueryStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._cursor.__exit__(*exc_info)
+
+    def _timed(self, method, statement, *args):
+        started = time.perf_counter()
+        try:
+            return method(statement, *args)
+        finally:
+            self._stats.record(statement, (time.perf_counter() - started) * 1000)
+
+    def execute(self, statement, *args):
+        self._timed(self._cursor.execute, statement, *args)
+        return self
+
+    def executemany(self, statement, *args):
+        self._timed(self._cursor.executemany, statement, *args)
+        return self
+
+def tracked_cursor(cursor):
+    """Envuelve el cursor solo si hay una petición registrando consultas"""
+    stats = _current_stats.get()
+    return TrackedCursor(cursor, stats) if stats is not None else cursor
+
+class _TimedCall:
+    """Llamada asíncrona medida; admite `await` (asyncpg) y `async with` (aiosqlite)"""
+
+    def __init__(self, result, statement: str, stats: QueryStats):
+        self._result = result
+        self._statement = statement
+        self._stats = stats
+
+    async def _timed(self, awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._stats.record(self._statement, (time.perf_counter() - started) * 1000)
+
+    def __await__(self):
+        return self._timed(self._result).__await__()
+
+    async def __aenter__(self):
+        return await self._timed(self._result.__aenter__())
+
+    async def __aexit__(self, *exc_info):
+        return await self._result.__aexit__(*exc_info)
+
+class TrackedAsyncConnection:
+    """Proxy de una conexión asyncpg o aiosqlite que registra las consultas de la petición"""
+
+    def __init__(self, connection, stats: QueryStats):
+        self._connection = connection
+        self._stats = stats
+
+    def __getattr__(self, name):
+        attribute = getattr(self._connection, name)
+        if name not in ("execute", "executemany", "fetch", "fetchval", "fetchrow"):
+            return attribute
+
+        def timed(statement, *args, **kwargs):
+            return _TimedCall(attribute(statement, *args, **kwargs), statement, self._stats)
+        return timed
+
+def tracked_async_connection(connection):
+    stats = _current_stats.get()
+    return TrackedAsyncConnection(connection, stats) if stats is not None else connection
@@ -0,0 +1,46 @@
+import re
+from typing import List, Optional, Tuple
+
+# Palabras del término de búsqueda (letras con acento, dígitos, guion bajo)
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+def search_words(term: Optional[str]) -> List[str]:
+    """Palabras del término en minúsculas; ignora operadores y puntuación"""
+    return [word.lower() for word in _WORDS.findall(term or "")][:8]
+
+def prefix_tsquery(term: Optional[str]) -> Optional[str]:
+    """tsquery de PostgreSQL con todas las palabras como prefijo ('taq:* & centro:*')"""
+    words = search_words(term)
+    return " & ".join(f"{word}:*" for word in words) if words else None
+
+def fts5_query(term: Optional[str]) -> Optional[str]:
+    """Consulta MATCH de FTS5 con todas las palabras como prefijo ('"taq"* "centro"*')"""
+    words = search_words(term)
+    return " ".join(f'"{word}"*' for word in words) if words else None
+
+def like_pattern(term: str) -> str:
+    """Patrón ILIKE de subcadena con comodines escapados"""
+    escaped = term.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def ranked_search(document: str, config: str, trigram_columns: List[str], term: str) -> Tuple[str, List, str, List]:
+    """Filtro y relevancia para PostgreSQL (índices de la migración 0005_admin_search)
+
+    `document` es la expresión tsvector indexada y `trigram_columns` las expresiones con
+    índice gin_trgm_ops (la primera pondera la similitud). Devuelve
+    (filtro, parámetros del filtro, expresión de relevancia, parámetros de la relevancia).
+    """
+    pattern = like_pattern(term)
+    conditions = [f"{column} ILIKE immutable_unaccent(%s)" for column in trigram_columns]
+    filter_params: List = [pattern] * len(trigram_columns)
+    rank_sql = f"similarity({trigram_columns[0]}, immutable_unaccent(%s))"
+    rank_params: List = [term.strip().lower()]
+
+    tsquery = prefix_tsquery(term)
+    if tsquery:
+        conditions.append(f"{document} @@ to_tsquery('{config}', immutable_unaccent(%s))")
+        filter_params.append(tsquery)
+        rank_sql = f"ts_rank({document}, to_tsquery('{config}', immutable_unaccent(%s))) + {rank_sql}"
+        rank_params.insert(0, tsquery)
+
+    return f" AND ({' OR '.join(conditions)})", filter_params, rank_sql, rank_params
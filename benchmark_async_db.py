@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia: consultas síncronas dentro del event loop vs capa async (aiosqlite)
+
+Simula N requests concurrentes al listado de negocios y mide el tiempo total
+y la latencia máxima del event loop (lo que sufren el resto de rutas y Socket.IO).
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.models.business_sqlite import Business
+
+CONCURRENT_REQUESTS = 50
+EXTRA_BUSINESSES = 200
+
+def prepare_database() -> str:
+    """Copia auth_api.db a un archivo temporal y agrega negocios de prueba"""
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, "benchmark.db")
+    shutil.copy("auth_api.db", db_path)
+    
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO businesses (name, category, address, description, active) VALUES (?, ?, ?, ?, 1)",
+        [(f"Negocio Benchmark {i}", "Restaurante", f"Calle {i}", "Negocio de prueba " * 10) for i in range(EXTRA_BUSINESSES)]
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+async def measure(label: str, handler):
+    """Ejecuta las requests concurrentes midiendo el lag del event loop"""
+    max_lag = 0.0
+    running = True
+    
+    async def heartbeat():
+        nonlocal max_lag
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.001)
+    
+    monitor = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.01)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*[handler() for _ in range(CONCURRENT_REQUESTS)])
+    elapsed = time.perf_counter() - started
+    
+    running = False
+    await monitor
+    print(f"{label:<28} total={elapsed * 1000:8.1f} ms  lag_max_event_loop={max_lag * 1000:8.1f} ms")
+
+async def sync_in_loop():
+    # Lo que hacían las rutas async: llamada bloqueante dentro del event loop
+    Business.get_all()
+
+async def native_async():
+    await Business.get_all_async()
+
+async def main():
+    settings.sqlite_path = prepare_database()
+    print(f"=== BENCHMARK LISTADO DE NEGOCIOS ({CONCURRENT_REQUESTS} requests concurrentes) ===")
+    await measure("sync dentro del event loop", sync_in_loop)
+    await measure("async (aiosqlite)", native_async)
+    shutil.rmtree(os.path.dirname(settings.sqlite_path), ignore_errors=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
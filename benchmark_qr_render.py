@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de generate-qr con 50 clientes concurrentes: render síncrono dentro del event
+loop (como antes) vs pool de procesos de QR (app/utils/qr_renderer.py).
+
+Mide el tiempo total, el throughput y la latencia máxima del event loop (lo que sufren
+las demás rutas mientras se generan QR), y muestra las métricas del pool y el rechazo
+inmediato cuando se supera el límite de cola.
+
+Uso: python benchmark_qr_render.py [--workers N]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import qrcode
+from jose import jwt
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.controllers.user_controller_sqlite import UserController
+from app.schemas.user import VisitCreate
+from app.utils.qr_image import render_png_data_url
+from app.utils.qr_renderer import QRRenderPool, QRRenderBusyError, qr_render_pool
+
+CONCURRENT_CLIENTS = 50
+REQUESTS_PER_CLIENT = 4
+
+async def measure(label: str, handler):
+    """Ejecuta los clientes concurrentes midiendo el lag del event loop"""
+    max_lag = 0.0
+    running = True
+
+    async def heartbeat():
+        nonlocal max_lag
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.001)
+
+    async def client(index: int):
+        for _ in range(REQUESTS_PER_CLIENT):
+            await handler(index)
+
+    monitor = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(index) for index in range(CONCURRENT_CLIENTS)])
+    elapsed = time.perf_counter() - started
+
+    running = False
+    await monitor
+    total = CONCURRENT_CLIENTS * REQUESTS_PER_CLIENT
+    print(f"{label:<28} total={elapsed * 1000:8.1f} ms  {total / elapsed:7.1f} QR/s  "
+          f"lag_max_event_loop={max_lag * 1000:8.1f} ms")
+
+def visit(index: int) -> VisitCreate:
+    return VisitCreate(user_id=index + 1, business_id=1, visit_date=datetime.now())
+
+async def sync_in_loop(index: int):
+    # Lo que hacía la ruta: token, matriz, PNG y base64 dentro del event loop
+    data = visit(index)
+    qr_token = jwt.encode({
+        "user_id": data.user_id,
+        "business_id": data.business_id,
+        "visit_date": data.visit_date.isoformat(),
+        "exp": datetime.utcnow() + timedelta(hours=24)
+    }, os.getenv("JWT_SECRET_KEY", "default-secret-key"), algorithm="HS256")
+    render_png_data_url(qr_token, border=4, error_correction=qrcode.constants.ERROR_CORRECT_L)
+
+async def process_pool(index: int):
+    await UserController.generate_qr(visit(index))
+
+async def main():
+    if "--workers" in sys.argv:
+        qr_render_pool.workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    print(f"=== BENCHMARK GENERATE-QR ({CONCURRENT_CLIENTS} clientes x {REQUESTS_PER_CLIENT} requests, "
+          f"{qr_render_pool.workers} workers, {os.cpu_count()} CPU) ===")
+
+    # Arranque de los workers fuera de la medición
+    await qr_render_pool.render("warmup")
+    await measure("sync dentro del event loop", sync_in_loop)
+    await measure("pool de procesos", process_pool)
+    print(f"Métricas del pool: {qr_render_pool.stats()}")
+
+    small_pool = QRRenderPool(workers=1, queue_limit=2, timeout=5.0)
+    results = await asyncio.gather(*[small_pool.render(f"cola-{i}") for i in range(10)], return_exceptions=True)
+    rejected = sum(isinstance(result, QRRenderBusyError) for result in results)
+    print(f"Límite de cola (1 worker + 2 en cola, 10 a la vez): {rejected} rechazados con 503")
+    small_pool.shutdown()
+    qr_render_pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark del token compacto de QR frente al JWT: costo de codificar, verificar y
+renderizar (PNG y SVG) y la versión/tamaño del QR resultante, para visitas y cupones.
+
+Uso: python benchmark_qr_token.py [--rounds N]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import qrcode
+from jose import jwt
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.utils.qr_image import render_qr_image
+from app.utils.qr_token import (
+    COUPON_TOKEN, VISIT_TOKEN, decode_qr_token, encode_coupon_token, encode_visit_token
+)
+
+SECRET = settings.jwt_secret_key
+RENDER_OPTIONS = {"border": 4, "error_correction": qrcode.constants.ERROR_CORRECT_L}
+
+def per_call_us(function, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - started) * 1_000_000 / rounds
+
+def qr_version(token: str) -> int:
+    qr = qrcode.QRCode(error_correction=RENDER_OPTIONS["error_correction"])
+    qr.add_data(token)
+    qr.make(fit=True)
+    return qr.version
+
+def report(label: str, encode, verify, rounds: int):
+    token = encode()
+    render_rounds = max(rounds // 50, 5)
+    png = render_qr_image(token, "png", **RENDER_OPTIONS)
+    print(f"{label:<16} {len(token):5d} car.  QR v{qr_version(token):<3d}"
+          f"encode {per_call_us(encode, rounds):7.1f} us  verify {per_call_us(lambda: verify(token), rounds):7.1f} us  "
+          f"png {per_call_us(lambda: render_qr_image(token, 'png', **RENDER_OPTIONS), render_rounds) / 1000:6.1f} ms "
+          f"({len(png)} B)  svg {per_call_us(lambda: render_qr_image(token, 'svg', **RENDER_OPTIONS), render_rounds) / 1000:6.1f} ms")
+
+def main():
+    rounds = int(sys.argv[sys.argv.index("--rounds") + 1]) if "--rounds" in sys.argv else 2000
+    now = datetime.now()
+    exp = datetime.utcnow() + timedelta(hours=24)
+    coupon_expires = now + timedelta(days=30)
+    print(f"=== BENCHMARK TOKEN DE QR ({rounds} encode/verify, corrección L, borde 4) ===")
+
+    report("visita JWT", lambda: jwt.encode({
+        "user_id": 1234, "business_id": 56, "visit_timestamp": int(now.timestamp()), "exp": exp
+    }, SECRET, algorithm="HS256"), lambda token: jwt.decode(token, SECRET, algorithms=["HS256"]), rounds)
+    report("visita compacto", lambda: encode_visit_token(
+        1234, 56, int(now.timestamp()), int(time.time()) + 86400, SECRET
+    ), lambda token: decode_qr_token(token, SECRET, VISIT_TOKEN), rounds)
+    report("cupón JWT", lambda: jwt.encode({
+        "coupon_code": "CPN-1A2B3C4D", "user_id": 1234, "business_id": 56,
+        "expires_at": coupon_expires.isoformat(), "type": "reward_coupon"
+    }, SECRET, algorithm="HS256"), lambda token: jwt.decode(token, SECRET, algorithms=["HS256"]), rounds)
+    report("cupón compacto", lambda: encode_coupon_token(
+        "CPN-1A2B3C4D", 1234, 56, int(coupon_expires.timestamp()), SECRET
+    ), lambda token: decode_qr_token(token, SECRET, COUPON_TOKEN), rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark de conexiones SQLite: conexión nueva por llamada (journal por defecto)
+vs conexiones persistentes por hilo con WAL y PRAGMAs ajustados.
+
+Mide lecturas/escrituras por segundo sobre user_visits y businesses con
+varios hilos lectores y escritores en paralelo, y cuenta los errores
+"database is locked".
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import database_sqlite
+from app.config.settings import settings
+
+READER_THREADS = 4
+WRITER_THREADS = 4
+DURATION_SECONDS = 3
+
+def legacy_connection():
+    """Comportamiento anterior: conexión nueva con la configuración por defecto"""
+    connection = sqlite3.connect(settings.sqlite_path, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA encoding = "UTF-8"')
+    return connection
+
+def run(label: str, get_connection):
+    counters = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + DURATION_SECONDS
+    
+    def reader(user_id: int):
+        while time.perf_counter() < stop_at:
+            connection = get_connection()
+            try:
+                cursor = connection.cursor()
+                cursor.execute("""
+                    SELECT b.id, b.name, COUNT(v.id) as visit_count
+                    FROM businesses b
+                    LEFT JOIN user_visits v ON v.business_id = b.id AND v.user_id = ?
+                    WHERE b.active = 1
+                    GROUP BY b.id, b.name
+                """, (user_id,))
+                cursor.fetchall()
+                with lock:
+                    counters["reads"] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counters["locked"] += 1
+            finally:
+                connection.close()
+    
+    def writer(user_id: int):
+        while time.perf_counter() < stop_at:
+            connection = get_connection()
+            try:
+                now = datetime.now()
+                connection.execute(
+                    "INSERT INTO user_visits (user_id, business_id, visit_date, visit_month) VALUES (?, 1, ?, ?)",
+                    (user_id, now.isoformat(), now.strftime("%Y-%m"))
+                )
+                connection.commit()
+                with lock:
+                    counters["writes"] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counters["locked"] += 1
+            finally:
+                connection.close()
+    
+    threads = [threading.Thread(target=reader, args=(i + 1,)) for i in range(READER_THREADS)]
+    threads += [threading.Thread(target=writer, args=(i + 1,)) for i in range(WRITER_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    print(
+        f"{label:<34} lecturas/s={counters['reads'] / DURATION_SECONDS:9.1f}  "
+        f"escrituras/s={counters['writes'] / DURATION_SECONDS:8.1f}  locked={counters['locked']}"
+    )
+
+def main():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print(f"=== BENCHMARK SQLITE ({READER_THREADS} lectores, {WRITER_THREADS} escritores, {DURATION_SECONDS}s) ===")
+        
+        settings.sqlite_path = os.path.join(tmp_dir, "legacy.db")
+        shutil.copy("auth_api.db", settings.sqlite_path)
+        sqlite3.connect(settings.sqlite_path).execute("PRAGMA journal_mode = DELETE").close()
+        run("antes: conexión por llamada", legacy_connection)
+        
+        settings.sqlite_path = os.path.join(tmp_dir, "tuned.db")
+        shutil.copy("auth_api.db", settings.sqlite_path)
+        settings.sqlite_persistent_connections = True
+        run("después: persistente + WAL", database_sqlite.get_db_connection)
+        database_sqlite.close_all_connections()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/user/visits: un usuario con visitas en 200 negocios, varias rondas
+completadas por negocio y la ronda abierta actual.
+
+Compara la consulta anterior de SQLite (JOIN contra todas las rondas y GROUP BY por
+columnas de ronda, que duplica filas) con la consulta por conjuntos actual, y
+verifica que la actual devuelve una fila por negocio en una sola consulta.
+
+Uso: python benchmark_user_visits.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.config.migrations import run_migrations
+from app.utils.query_tracker import track_queries
+
+BUSINESSES = 200
+VISITS_PER_BUSINESS = 20
+ITERATIONS = 50
+
+LEGACY_SQL = """
+    SELECT
+        b.id as business_id,
+        b.name as business_name,
+        COUNT(v.id) as visit_count,
+        MAX(v.visit_date) as last_visit_date,
+        MAX(v.id) as latest_visit_id,
+        COALESCE(r.round_number, 1) as round_number,
+        COALESCE(r.progress_in_round, 0) as progress_in_round,
+        b.visits_for_prize as max_visits_per_round,
+        COALESCE(r.is_reward_claimed, 0) as is_reward_claimed,
+        v.visit_month
+    FROM user_visits v
+    JOIN businesses b ON v.business_id = b.id
+    LEFT JOIN user_rounds r ON r.user_id = v.user_id AND r.business_id = v.business_id
+    WHERE v.user_id = ?
+    GROUP BY b.id, b.name, v.visit_month, r.round_number, r.progress_in_round, r.is_reward_claimed
+    ORDER BY last_visit_date DESC
+"""
+
+def seed(connection, user_id: int = 1):
+    """Visitas repartidas en 3 meses; una ronda completada por cada 6 visitas más la abierta"""
+    random.seed(7)
+    connection.execute("INSERT INTO users (id, nombre, email, password) VALUES (?, 'Frecuente', 'f@test.com', 'x')", (user_id,))
+    connection.executemany(
+        "INSERT INTO businesses (id, name, category) VALUES (?, ?, 'Prueba')",
+        [(business_id, f"Negocio {business_id}") for business_id in range(1, BUSINESSES + 1)]
+    )
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    visits, rounds = [], []
+    for business_id in range(1, BUSINESSES + 1):
+        days = random.sample(range(0, 90), VISITS_PER_BUSINESS)
+        for offset in days:
+            visit_date = today - timedelta(days=offset)
+            visits.append((user_id, business_id, visit_date.isoformat(), visit_date.strftime("%Y-%m"), visit_date.date().isoformat()))
+        completed = VISITS_PER_BUSINESS // 6
+        rounds.extend((user_id, business_id, number, 6, 1, 1) for number in range(1, completed + 1))
+        rounds.append((user_id, business_id, completed + 1, VISITS_PER_BUSINESS % 6, 0, 0))
+    connection.executemany(
+        "INSERT INTO user_visits (user_id, business_id, visit_date, visit_month, visit_day) VALUES (?, ?, ?, ?, ?)",
+        visits
+    )
+    connection.executemany(
+        """INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, is_completed, is_reward_claimed)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        rounds
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+
+def timed(function, iterations: int = ITERATIONS):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = function()
+    return result, (time.perf_counter() - started) * 1000 / iterations
+
+def main() -> bool:
+    temp_dir = tempfile.mkdtemp()
+    settings.sqlite_path = os.path.join(temp_dir, "user_visits.db")
+    run_migrations("sqlite")
+
+    from app.config.database_sqlite import connect_sqlite
+    from app.models.user_visit_sqlite import UserVisit
+
+    connection = connect_sqlite()
+    seed(connection)
+
+    legacy_rows, legacy_ms = timed(lambda: connection.execute(LEGACY_SQL, (1,)).fetchall())
+    current, current_ms = timed(lambda: UserVisit.get_user_visits_with_rounds(1))
+    with track_queries() as stats:
+        UserVisit.get_user_visits_with_rounds(1)
+    connection.close()
+
+    rows = current["data"]
+    expected_round = VISITS_PER_BUSINESS // 6 + 1
+    print(f"\nUsuario con {BUSINESSES} negocios y {BUSINESSES * VISITS_PER_BUSINESS} visitas ({ITERATIONS} iteraciones)")
+    print(f"  Anterior: {len(legacy_rows):5d} filas  {legacy_ms:8.2f} ms")
+    print(f"  Actual:   {len(rows):5d} filas  {current_ms:8.2f} ms  consultas={stats.count}")
+
+    checks = [
+        ("Una fila por negocio", len(rows) == BUSINESSES),
+        ("Una sola consulta", stats.count == 1),
+        ("Total de visitas", current["total_visits"] == BUSINESSES * VISITS_PER_BUSINESS),
+        ("Ronda abierta actual", all(row["round_number"] == expected_round for row in rows)),
+        ("Progreso de la ronda abierta", all(row["progress_in_round"] == VISITS_PER_BUSINESS % 6 for row in rows))
+    ]
+    for description, passed in checks:
+        print(f"  {'✅' if passed else '❌'} {description}")
+    return all(passed for _, passed in checks)
+
+if __name__ == "__main__":
+    print("🔍 Benchmark de /api/user/visits...")
+    if main():
+        print("\n✅ Consulta por conjuntos correcta")
+    else:
+        print("\n❌ La consulta por conjuntos no coincide")
+        sys.exit(1)
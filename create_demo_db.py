@@ -81,10 +81,14 @@ def create_demo_database():
             visit_date TIMESTAMP NOT NULL,
             visit_month TEXT NOT NULL,
             status TEXT DEFAULT 'completed',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            visit_day TEXT
         )
     ''')
     
+    # Índice único de la migración 0004: una visita por (usuario, negocio, día)
+    cursor.execute("CREATE UNIQUE INDEX ux_user_visits_day ON user_visits (user_id, business_id, visit_day)")
+    
     cursor.execute('''
         CREATE TABLE user_rounds (
             id INTEGER PRIMARY KEY,
@@ -100,6 +104,9 @@ def create_demo_database():
         )
     ''')
     
+    # Índice único de la migración 0005: una sola ronda abierta por (usuario, negocio)
+    cursor.execute("CREATE UNIQUE INDEX ux_user_rounds_open ON user_rounds (user_id, business_id) WHERE is_completed = 0")
+    
     cursor.execute('''
         CREATE TABLE user_rewards (
             id INTEGER PRIMARY KEY,
@@ -207,9 +214,9 @@ def create_demo_database():
     
     for user_id, business_id, fecha, mes in todas_visitas:
         cursor.execute('''
-            INSERT INTO user_visits (user_id, business_id, visit_date, visit_month) 
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, business_id, fecha.isoformat(), mes))
+            INSERT INTO user_visits (user_id, business_id, visit_date, visit_month, visit_day) 
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, business_id, fecha.isoformat(), mes, fecha.date().isoformat()))
     
     # Crear rondas de usuario
     rondas = [
@@ -32,7 +32,7 @@ def fix_postgresql_errors():
                     business_id BIGINT NOT NULL REFERENCES businesses(id),
                     reward_id INTEGER,
                     coupon_code VARCHAR(50) UNIQUE,
-                    qr_code TEXT,
+                    qr_token VARCHAR(300),
                     status VARCHAR(20) DEFAULT 'vigente' CHECK (status IN ('vigente', 'reclamado', 'usado', 'expirado')),
                     expires_at TIMESTAMP,
                     claimed_at TIMESTAMP,
@@ -1,5 +1,5 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.auth import router as auth_router
 from app.routes.protected import router as protected_router
@@ -13,7 +13,13 @@ from app.routes.loyalty import router as loyalty_router
 from app.routes.admin import router as admin_router
 from app.routes.notifications import router as notifications_router
 from app.services.websocket_service import websocket_service
-from app.config.database_sqlite import init_database
+from app.config.database_sqlite import init_database, close_all_connections
+from app.config.sqlite_writer import stop_writer
+from app.config.database import close_pool
+from app.config.database_async import close_async_pool
+from app.utils.qr_renderer import shutdown_qr_render_pool
+from app.config.settings import settings
+from app.utils.query_tracker import track_queries, check_budget
 from app.utils.logger import log_info, log_error
 
 @asynccontextmanager
@@ -32,6 +38,11 @@ async def lifespan(app: FastAPI):
     
     # Cleanup al cerrar la aplicación
     log_info("Cerrando aplicación Auth API")
+    close_pool()
+    await close_async_pool()
+    shutdown_qr_render_pool()
+    stop_writer()
+    close_all_connections()
 
 # Crear instancia de FastAPI
 app = FastAPI(
@@ -50,6 +61,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def query_tracking_middleware(request: Request, call_next):
+    """Cuenta las consultas de cada petición, detecta N+1 y en debug las expone como headers"""
+    if not settings.query_tracking_enabled:
+        return await call_next(request)
+    
+    with track_queries() as stats:
+        response = await call_next(request)
+    
+    route = request.scope.get("route")
+    label = f"{request.method} {getattr(route, 'path', request.url.path)}"
+    check_budget(label, stats, settings.query_budget, settings.query_repeat_threshold, settings.query_budget_strict)
+    
+    if settings.debug:
+        repeated = stats.repeated()
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = f"{stats.total_ms:.1f}"
+        response.headers["X-DB-Repeated-Statements"] = str(len(repeated))
+        response.headers["X-DB-Max-Repeat"] = str(repeated[0][1] if repeated else 0)
+    return response
+
 # Incluir rutas
 app.include_router(auth_router)
 app.include_router(protected_router)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Mantenimiento de las particiones mensuales de user_visits y audit_logs (PostgreSQL).
+
+Sin argumentos consolida los días cerrados en visit_daily_rollup, crea las particiones
+del mes actual y de los PARTITION_MONTHS_AHEAD siguientes, y archiva las que exceden la
+retención configurada. Pensado para un cron nocturno; es idempotente.
+
+Uso:
+    python maintain_partitions.py                              # job de mantenimiento
+    python maintain_partitions.py --list                       # particiones y tamaño
+    python maintain_partitions.py --detach audit_logs 2024-01  # separar meses anteriores (a archive)
+    python maintain_partitions.py --detach audit_logs 2024-01 --drop
+    python maintain_partitions.py --rollup 2024-01-01            # recalcular rollups desde ese día
+"""
+import sys
+import os
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.partition_service import PartitionService, PARTITIONED_TABLES
+from app.services.visit_rollup_service import VisitRollupService
+
+def main():
+    if "--list" in sys.argv:
+        for table in PARTITIONED_TABLES:
+            print(f"\n{table}")
+            for partition in PartitionService.list_partitions(table):
+                print(f"  {partition['name']:24s} {partition['size_bytes'] / 1024 / 1024:10.1f} MB  {partition['bound']}")
+        return
+
+    if "--detach" in sys.argv:
+        position = sys.argv.index("--detach")
+        table, month = sys.argv[position + 1], sys.argv[position + 2]
+        cutoff = datetime.strptime(month, "%Y-%m").date()
+        detached = PartitionService.detach_partitions_before(table, cutoff, drop="--drop" in sys.argv)
+        print(f"{len(detached)} particiones separadas: {', '.join(detached) or '-'}")
+        return
+
+    if "--rollup" in sys.argv:
+        start = datetime.strptime(sys.argv[sys.argv.index("--rollup") + 1], "%Y-%m-%d").date()
+        written = VisitRollupService.rollup_range(start, date.today())
+        print(f"{written} rollups recalculados desde {start}")
+        return
+
+    result = PartitionService.run_maintenance()
+    rolled_up = result["rolled_up"]
+    print(f"Rollups de visitas: {rolled_up['from']} a {rolled_up['through']} ({rolled_up['rows']} filas)")
+    print(f"Particiones creadas: {', '.join(result['created']) or '-'}")
+    for table, archived in result["archived"].items():
+        print(f"Archivadas de {table}: {', '.join(archived) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Migración única de visitas anteriores al sistema de rondas (PostgreSQL).
+
+Antes se hacía en cada lectura de /api/user/visits; ahora las lecturas no escriben
+y este proceso crea en lotes la ronda 1 de cada (usuario, negocio) con visitas del
+mes y sin rondas. Es idempotente: se puede volver a ejecutar sin duplicar rondas.
+
+Uso: python migrate_legacy_rounds.py [--batch-size N]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.models.user_round import UserRound
+
+def main():
+    batch_size = int(sys.argv[sys.argv.index("--batch-size") + 1]) if "--batch-size" in sys.argv else 1000
+    print(f"Migrando visitas a rondas (lotes de {batch_size} usuarios)...")
+    created = UserRound.migrate_legacy_visits(batch_size)
+    print(f"{created} rondas creadas")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ import psycopg2.extras
 from dotenv import load_dotenv
 import os
 from datetime import datetime, timedelta
+from app.models.user_visit import UserVisit
 import bcrypt
 
 # Cargar variables de entorno
@@ -135,7 +136,6 @@ def populate_all_data():
                 cursor.execute("SELECT id FROM users ORDER BY id")
                 user_ids = [row['id'] for row in cursor.fetchall()]
                 
-                current_month = datetime.now().strftime('%Y-%m')
                 base_date = datetime.now() - timedelta(days=20)
                 
                 visits_data = []
@@ -143,44 +143,21 @@ def populate_all_data():
                     visit_date = base_date + timedelta(days=i % 20, hours=i % 12)
                     user_id = user_ids[i % len(user_ids)]
                     business_id = business_ids[i % len(business_ids)]
-                    visits_data.append((user_id, business_id, visit_date, current_month))
+                    visits_data.append((user_id, business_id, visit_date))
                 
-                cursor.executemany("""
-                    INSERT INTO user_visits (user_id, business_id, visit_date, visit_month)
-                    VALUES (%s, %s, %s, %s)
-                """, visits_data)
+                # Por el modelo, igual que un escaneo: llena visit_day y avanza la ronda y loyalty_state
                 connection.commit()
+                visits_by_business = {}
+                for user_id, business_id, visit_date in visits_data:
+                    visits_by_business.setdefault(business_id, []).append((user_id, visit_date))
+                for business_id, visits in visits_by_business.items():
+                    UserVisit.register_visits_bulk(business_id, visits)
                 print("✅ Visitas agregadas")
             
-            # 6. USER ROUNDS
-            cursor.execute("SELECT COUNT(*) as count FROM user_rounds")
-            rounds_count = cursor.fetchone()['count']
-            
-            if rounds_count < 15:
-                print("6. Creando rondas...")
-                # Obtener IDs reales
-                cursor.execute("SELECT id FROM businesses ORDER BY id LIMIT 5")
-                business_ids = [row['id'] for row in cursor.fetchall()]
-                cursor.execute("SELECT id FROM users ORDER BY id")
-                user_ids = [row['id'] for row in cursor.fetchall()]
-                
-                rounds_data = []
-                for user_id in user_ids[:5]:  # Primeros 5 usuarios
-                    for business_id in business_ids[:3]:  # Primeros 3 businesses
-                        progress = (user_id + business_id) % 6
-                        rounds_data.append((user_id, business_id, 1, progress, False, False))
-                
-                cursor.executemany("""
-                    INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, is_completed, is_reward_claimed)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, rounds_data)
-                connection.commit()
-                print("✅ Rondas creadas")
-            
             print("\n=== VERIFICACIÓN FINAL ===")
             
             # Verificar datos finales
-            tables = ['municipalities', 'businesses', 'business_menu', 'users', 'user_visits', 'user_rounds']
+            tables = ['municipalities', 'businesses', 'business_menu', 'users', 'user_visits', 'user_rounds', 'loyalty_state']
             for table in tables:
                 cursor.execute(f"SELECT COUNT(*) as count FROM {table}")
                 count = cursor.fetchone()['count']
@@ -8,6 +8,7 @@ import psycopg2.extras
 from dotenv import load_dotenv
 import os
 from datetime import datetime, timedelta
+from app.models.user_visit import UserVisit
 
 # Cargar variables de entorno
 load_dotenv()
@@ -112,7 +113,6 @@ def populate_data_fixed():
             
             if visits_count == 0:
                 # Crear visitas para el mes actual usando solo businesses existentes
-                current_month = datetime.now().strftime('%Y-%m')
                 base_date = datetime.now() - timedelta(days=15)
                 
                 visits_data = []
@@ -120,32 +120,17 @@ def populate_data_fixed():
                     visit_date = base_date + timedelta(days=i % 15, hours=i % 12)
                     user_id = (i % 5) + 1  # Usuarios 1-5
                     business_id = (i % 2) + 1  # Solo businesses 1-2 (existentes)
-                    visits_data.append((user_id, business_id, visit_date, current_month))
+                    visits_data.append((user_id, business_id, visit_date))
                 
-                cursor.executemany("""
-                    INSERT INTO user_visits (user_id, business_id, visit_date, visit_month)
-                    VALUES (%s, %s, %s, %s)
-                """, visits_data)
+                # Por el modelo, igual que un escaneo: llena visit_day y avanza la ronda y loyalty_state
+                connection.commit()
+                visits_by_business = {}
+                for user_id, business_id, visit_date in visits_data:
+                    visits_by_business.setdefault(business_id, []).append((user_id, visit_date))
+                for business_id, visits in visits_by_business.items():
+                    UserVisit.register_visits_bulk(business_id, visits)
                 print("✅ Visitas de ejemplo agregadas")
             
-            print("Creando rondas de ejemplo...")
-            cursor.execute("SELECT COUNT(*) as count FROM user_rounds")
-            result = cursor.fetchone()
-            rounds_count = result['count'] if result else 0
-            
-            if rounds_count == 0:
-                rounds_data = []
-                for user_id in range(1, 6):  # Usuarios 1-5
-                    for business_id in range(1, 3):  # Solo businesses 1-2 (existentes)
-                        progress = (user_id + business_id) % 6  # Progreso variable
-                        rounds_data.append((user_id, business_id, 1, progress, False, False))
-                
-                cursor.executemany("""
-                    INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, is_completed, is_reward_claimed)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, rounds_data)
-                print("✅ Rondas de ejemplo creadas")
-            
             connection.commit()
             print("🎉 ¡Datos dummy agregados exitosamente!")
             
@@ -166,7 +151,7 @@ if __name__ == "__main__":
         print("- 8 businesses con menús completos")
         print("- 5 usuarios de prueba (password: password123)")
         print("- 20 visitas distribuidas en el mes")
-        print("- 10 rondas de lealtad en progreso")
+        print("- Rondas de lealtad calculadas a partir de las visitas")
         print("\n🔑 Usuarios de prueba:")
         print("- juan@test.com")
         print("- maria@test.com") 
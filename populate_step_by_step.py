@@ -8,6 +8,7 @@ import psycopg2.extras
 from dotenv import load_dotenv
 import os
 from datetime import datetime, timedelta
+from app.models.user_visit import UserVisit
 
 # Cargar variables de entorno
 load_dotenv()
@@ -118,7 +119,6 @@ def populate_step_by_step():
             visits_count = result['count'] if result else 0
             
             if visits_count == 0:
-                current_month = datetime.now().strftime('%Y-%m')
                 base_date = datetime.now() - timedelta(days=15)
                 
                 # Obtener IDs reales
@@ -130,40 +130,17 @@ def populate_step_by_step():
                     visit_date = base_date + timedelta(days=i % 15, hours=i % 12)
                     user_id = (i % 5) + 1
                     business_id = business_ids[i % len(business_ids)]
-                    visits_data.append((user_id, business_id, visit_date, current_month))
+                    visits_data.append((user_id, business_id, visit_date))
                 
-                cursor.executemany("""
-                    INSERT INTO user_visits (user_id, business_id, visit_date, visit_month)
-                    VALUES (%s, %s, %s, %s)
-                """, visits_data)
+                # Por el modelo, igual que un escaneo: llena visit_day y avanza la ronda y loyalty_state
                 connection.commit()
+                visits_by_business = {}
+                for user_id, business_id, visit_date in visits_data:
+                    visits_by_business.setdefault(business_id, []).append((user_id, visit_date))
+                for business_id, visits in visits_by_business.items():
+                    UserVisit.register_visits_bulk(business_id, visits)
                 print("✅ Visitas agregadas y confirmadas")
         
-        # PASO 6: Crear rondas
-        print("PASO 6: Creando rondas...")
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT COUNT(*) as count FROM user_rounds")
-            result = cursor.fetchone()
-            rounds_count = result['count'] if result else 0
-            
-            if rounds_count == 0:
-                # Obtener IDs reales
-                cursor.execute("SELECT id FROM businesses ORDER BY id LIMIT 3")
-                business_ids = [row['id'] for row in cursor.fetchall()]
-                
-                rounds_data = []
-                for user_id in range(1, 6):
-                    for business_id in business_ids:
-                        progress = (user_id + business_id) % 6
-                        rounds_data.append((user_id, business_id, 1, progress, False, False))
-                
-                cursor.executemany("""
-                    INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, is_completed, is_reward_claimed)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, rounds_data)
-                connection.commit()
-                print("✅ Rondas creadas y confirmadas")
-        
         connection.close()
         print("🎉 ¡Todos los datos agregados exitosamente!")
         return True
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Reconstrucción masiva de user_rounds a partir de user_visits (PostgreSQL).
+
+Recalcula las rondas con la meta de visitas actual de cada negocio, conservando cuántos
+premios se habían reclamado, y actualiza loyalty_state. Se ejecuta automáticamente al
+cambiar visits_per_round de un negocio; este script sirve para toda la base o para
+repetir un negocio. Es idempotente.
+
+Uso: python rebuild_rounds.py [--business-id N] [--chunk-size N]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.round_rebuild_service import RoundRebuildService
+
+def print_progress(snapshot: dict):
+    print(f"  {snapshot['visits']:>12,} visitas  {snapshot['pairs']:>10,} pares  "
+          f"{snapshot['rounds']:>10,} rondas  {snapshot['visits_per_second']:>9,} visitas/s")
+
+def main():
+    business_id = int(sys.argv[sys.argv.index("--business-id") + 1]) if "--business-id" in sys.argv else None
+    chunk_size = int(sys.argv[sys.argv.index("--chunk-size") + 1]) if "--chunk-size" in sys.argv else 50000
+    print(f"Reconstruyendo rondas de {f'el negocio {business_id}' if business_id else 'todos los negocios'}...")
+    stats = RoundRebuildService.rebuild(business_id, chunk_size, progress=print_progress)
+    print(f"{stats['rounds']:,} rondas de {stats['pairs']:,} pares a partir de {stats['visits']:,} visitas "
+          f"en {stats['seconds']} s ({stats['rounds_replaced']:,} rondas reemplazadas)")
+
+if __name__ == "__main__":
+    main()
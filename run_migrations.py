@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Script para aplicar las migraciones pendientes (reemplaza a add_owner_column.py,
+create_missing_tables.py y create_push_table.py)
+
+Uso: python run_migrations.py [postgresql|sqlite] [--seed]
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.migrations import run_migrations
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else "postgresql"
+    print(f"Aplicando migraciones ({backend})...")
+    applied = run_migrations(backend)
+    print(f"{applied} migraciones aplicadas")
+    
+    if "--seed" in sys.argv:
+        if backend == "postgresql":
+            from app.config.database import seed_database
+        else:
+            from app.config.database_sqlite import seed_database
+        seed_database()
+        print("Datos de prueba verificados")
+
+if __name__ == "__main__":
+    main()
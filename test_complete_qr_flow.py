@@ -3,6 +3,7 @@
 Script para probar generación y validación completa de códigos QR
 """
 
+import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -30,7 +31,7 @@ def test_complete_qr_flow():
     )
     
     try:
-        qr_result = UserController.generate_qr(visit_data)
+        qr_result = asyncio.run(UserController.generate_qr(visit_data))
         
         if qr_result["success"]:
             print("[OK] QR generado exitosamente")
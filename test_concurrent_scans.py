@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del avance de rondas: 200 escaneos concurrentes de un mismo cliente
+(días distintos) y de 200 clientes en un negocio, mezclados con reclamos que completan
+la ronda. Verifica que no se pierdan incrementos (la suma del progreso de las rondas es
+igual a las visitas registradas), que haya a lo sumo una ronda abierta por (usuario,
+negocio) y que los números de ronda no se repitan.
+
+- SQLite: base temporal, sin escritor único (transacciones concurrentes reales).
+- PostgreSQL (--postgres): usa DATABASE_URL; siembra datos propios y los borra al final.
+
+Uso: python test_concurrent_scans.py [--postgres]
+"""
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.config.migrations import run_migrations
+
+SCANS = 200
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+def check_rounds(rounds: list, visits: int, label: str) -> bool:
+    """rounds: filas (user_id, round_number, progress_in_round, is_completed) de un negocio"""
+    progress = sum(row[2] for row in rounds)
+    open_rounds = {}
+    numbers = set()
+    duplicated = 0
+    for user_id, round_number, _, is_completed in rounds:
+        if not is_completed:
+            open_rounds[user_id] = open_rounds.get(user_id, 0) + 1
+        duplicated += (user_id, round_number) in numbers
+        numbers.add((user_id, round_number))
+    ok = check(f"{label}: sin incrementos perdidos", progress == visits, f"progreso={progress} visitas={visits}")
+    ok = check(f"{label}: una ronda abierta por cliente", max(open_rounds.values(), default=1) == 1) and ok
+    return check(f"{label}: números de ronda únicos", duplicated == 0) and ok
+
+def run_scenarios(register, complete_round, fetch_rounds, count_visits, user_ids, business_id) -> bool:
+    start = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    single_user = user_ids[0]
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        list(executor.map(lambda day: register(single_user, business_id, start + timedelta(days=day)), range(SCANS)))
+    ok = check_rounds(fetch_rounds(business_id), count_visits(business_id), f"{SCANS} escaneos de un cliente")
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        list(executor.map(lambda user_id: register(user_id, business_id, start), user_ids[1:SCANS + 1]))
+    ok = check_rounds(fetch_rounds(business_id), count_visits(business_id), f"{SCANS} clientes a la vez") and ok
+
+    # Escaneos y reclamos del mismo cliente mezclados: cada reclamo cierra la ronda abierta
+    def job(index):
+        if index % 10 == 0:
+            return complete_round(single_user, business_id)
+        return register(single_user, business_id, start + timedelta(days=SCANS + index))
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        list(executor.map(job, range(SCANS)))
+    return check_rounds(fetch_rounds(business_id), count_visits(business_id), "Escaneos con reclamos concurrentes") and ok
+
+def check_sqlite() -> bool:
+    temp_dir = tempfile.mkdtemp()
+    settings.sqlite_path = os.path.join(temp_dir, "concurrency.db")
+    settings.sqlite_single_writer = False
+    run_migrations("sqlite")
+
+    from app.config.database_sqlite import connect_sqlite
+    from app.models.user_visit_sqlite import UserVisit
+
+    connection = connect_sqlite()
+    connection.executemany(
+        "INSERT INTO users (id, nombre, email, password) VALUES (?, ?, ?, 'x')",
+        [(user_id, f"Cliente {user_id}", f"c{user_id}@test.com") for user_id in range(1, SCANS + 2)]
+    )
+    connection.execute("INSERT INTO businesses (id, name, category) VALUES (1, 'Negocio', 'Prueba')")
+    connection.commit()
+
+    def complete_round(user_id, business_id):
+        writer = connect_sqlite()
+        try:
+            writer.execute(
+                "UPDATE user_rounds SET is_completed = 1, is_reward_claimed = 1 WHERE user_id = ? AND business_id = ? AND is_completed = 0",
+                (user_id, business_id)
+            )
+            writer.commit()
+        finally:
+            writer.close()
+
+    def fetch_rounds(business_id):
+        return [tuple(row) for row in connection.execute(
+            "SELECT user_id, round_number, progress_in_round, is_completed FROM user_rounds WHERE business_id = ?",
+            (business_id,)
+        ).fetchall()]
+
+    def count_visits(business_id):
+        return connection.execute("SELECT COUNT(*) FROM user_visits WHERE business_id = ?", (business_id,)).fetchone()[0]
+
+    print("\nSQLite")
+    try:
+        return run_scenarios(UserVisit.register_visit, complete_round, fetch_rounds, count_visits,
+                             list(range(1, SCANS + 2)), 1)
+    finally:
+        connection.close()
+
+def check_postgres() -> bool:
+    from app.config.database import get_db_connection
+    from app.models.user_visit import UserVisit
+    from app.models.user_round import UserRound
+
+    run_migrations("postgresql")
+    settings.db_pool_max_size = max(settings.db_pool_max_size, 32)
+    connection = get_db_connection()
+    user_ids, business_id = [], None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT create_monthly_partition('user_visits', (date_trunc('month', NOW()) + g * INTERVAL '1 month')::date)
+                FROM generate_series(0, 15) g
+            """)
+            cursor.execute("""
+                INSERT INTO users (nombre, email, password)
+                SELECT 'Carga ' || g, 'carga' || g || '-' || md5(random()::text) || '@test.com', 'x'
+                FROM generate_series(1, %s) g
+                RETURNING id
+            """, (SCANS + 1,))
+            user_ids = [row['id'] for row in cursor.fetchall()]
+            cursor.execute("INSERT INTO businesses (name, category) VALUES ('Negocio carga', 'Prueba') RETURNING id")
+            business_id = cursor.fetchone()['id']
+            connection.commit()
+
+        def fetch_rounds(business_id):
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT user_id, round_number, progress_in_round, is_completed
+                    FROM user_rounds WHERE business_id = %s
+                """, (business_id,))
+                rows = [(row['user_id'], row['round_number'], row['progress_in_round'], row['is_completed'])
+                        for row in cursor.fetchall()]
+                connection.commit()
+                return rows
+
+        def count_visits(business_id):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) AS total FROM user_visits WHERE business_id = %s", (business_id,))
+                total = cursor.fetchone()['total']
+                connection.commit()
+                return total
+
+        print("\nPostgreSQL")
+        ok = run_scenarios(UserVisit.register_visit, UserRound.complete_round_and_claim_reward,
+                           fetch_rounds, count_visits, user_ids, business_id)
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) AS mismatched FROM loyalty_state ls
+                LEFT JOIN user_rounds ur ON ur.user_id = ls.user_id AND ur.business_id = ls.business_id
+                                        AND ur.is_completed = FALSE
+                WHERE ls.business_id = %s AND ls.progress_in_round != COALESCE(ur.progress_in_round, 0)
+            """, (business_id,))
+            mismatched = cursor.fetchone()['mismatched']
+        ok = check("loyalty_state coincide con la ronda abierta", mismatched == 0, f"diferencias={mismatched}") and ok
+        return ok
+    finally:
+        connection.rollback()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM loyalty_state WHERE business_id = %s", (business_id,))
+            cursor.execute("DELETE FROM user_rounds WHERE business_id = %s", (business_id,))
+            cursor.execute("DELETE FROM user_visits WHERE business_id = %s", (business_id,))
+            cursor.execute("DELETE FROM businesses WHERE id = %s", (business_id,))
+            cursor.execute("DELETE FROM users WHERE id = ANY(%s)", (user_ids,))
+        connection.commit()
+        connection.close()
+
+if __name__ == "__main__":
+    print(f"🔍 Verificando avance de rondas con {SCANS} escaneos concurrentes...")
+    success = check_sqlite()
+    if "--postgres" in sys.argv:
+        success = check_postgres() and success
+    if success:
+        print("\n✅ Avance de rondas consistente")
+    else:
+        print("\n❌ Hay fallas de concurrencia en las rondas")
+        sys.exit(1)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Prueba de las imágenes QR de cupones sin blobs en user_rewards: el cupón guarda solo el
+token, los cupones anteriores (sin qr_token) vuelven a firmar el mismo token desde la
+fila, y GET /api/rewards/coupons/{id}/qr renderiza la imagen al pedirla (una sola vez
+gracias a la caché) con ETag, Cache-Control y 304. También revisa las migraciones que
+eliminan las imágenes y recuperan el espacio.
+
+No necesita PostgreSQL: la búsqueda del cupón se sustituye por una fila en memoria.
+
+Uso: python test_coupon_qr.py
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.migrations import load_migrations, split_statements
+from app.controllers.reward_controller import RewardController
+from app.models.user_reward import UserReward
+from app.services.reward_service import RewardService
+from app.utils.qr_renderer import QRImageCache, qr_render_pool
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+async def run_checks() -> bool:
+    qr_render_pool.workers = 0
+    qr_render_pool.cache = QRImageCache(max_bytes=1024 * 1024, ttl=60)
+
+    legacy_row = {
+        "id": 9, "user_id": 42, "business_id": 7, "coupon_code": "CPN-1A2B3C4D",
+        "expires_at": (datetime.now() + timedelta(days=30)).replace(microsecond=0), "qr_token": None
+    }
+    token = UserReward.coupon_qr_token(legacy_row)
+    ok = check("Cupón sin qr_token: el token se firma desde la fila y es estable",
+               token == UserReward.coupon_qr_token(dict(legacy_row)), f"{len(token)} caracteres")
+    ok = check("El token reconstruido verifica como cupón",
+               (UserReward.verify_coupon_qr(token) or {}).get("coupon_code") == "CPN-1A2B3C4D") and ok
+    ok = check("Cupón con qr_token usa el guardado",
+               UserReward.coupon_qr_token({**legacy_row, "qr_token": "GUARDADO"}) == "GUARDADO") and ok
+
+    rows = {(9, 42): legacy_row}
+    RewardService.get_coupon_qr_token = staticmethod(
+        lambda coupon_id, user_id: UserReward.coupon_qr_token(rows[(coupon_id, user_id)]) if (coupon_id, user_id) in rows else None
+    )
+
+    png = await RewardController.get_coupon_qr_image(9, 42, "png", None)
+    ok = check("PNG binario con caché HTTP", png.media_type == "image/png" and png.body.startswith(b"\x89PNG")
+               and png.headers["cache-control"].startswith("private, max-age=") and "etag" in png.headers,
+               f"{len(png.body)} bytes") and ok
+    again = await RewardController.get_coupon_qr_image(9, 42, "png", None)
+    ok = check("La segunda petición sale de la caché de QR", again.body == png.body
+               and qr_render_pool.stats()["completed"] == 1) and ok
+    not_modified = await RewardController.get_coupon_qr_image(9, 42, "png", png.headers["etag"])
+    ok = check("If-None-Match con el ETag responde 304 sin cuerpo", not_modified.status_code == 304
+               and not not_modified.body) and ok
+    svg = await RewardController.get_coupon_qr_image(9, 42, "svg", png.headers["etag"])
+    ok = check("SVG tiene otro ETag", svg.status_code == 200 and svg.media_type == "image/svg+xml"
+               and svg.headers["etag"] != png.headers["etag"]) and ok
+
+    try:
+        await RewardController.get_coupon_qr_image(9, 43, "png", None)
+        ok = check("El cupón de otro usuario no se sirve", False) and ok
+    except HTTPException as e:
+        ok = check("El cupón de otro usuario no se sirve", e.status_code == 404) and ok
+
+    migrations = {migration.version: migration for migration in load_migrations("postgresql")}
+    strip, reclaim = migrations[11], migrations[12]
+    ok = check("0011 elimina qr_code y reporta el tamaño", strip.transactional and "DROP COLUMN IF EXISTS qr_code" in strip.sql
+               and "RAISE NOTICE" in strip.sql) and ok
+    ok = check("0012 recupera el espacio fuera de transacción y lo reporta", not reclaim.transactional
+               and len(split_statements(reclaim.sql)) == 2 and "VACUUM (FULL, ANALYZE) user_rewards" in reclaim.sql) and ok
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando imágenes QR de cupones...")
+    if asyncio.run(run_checks()):
+        print("\n✅ Imágenes QR de cupones correctas")
+    else:
+        print("\n❌ Hay fallas en las imágenes QR de cupones")
+        sys.exit(1)
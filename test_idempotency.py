@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Prueba del almacén de Idempotency-Key: duplicados concurrentes esperan a la petición
+original, los reintentos reciben la respuesta guardada, la misma clave con otro
+contenido se rechaza, los errores no se guardan y el LRU respeta su tamaño máximo.
+También verifica que una falla transitoria de /validate-qr (503) no queda guardada y
+que el reintento con la misma clave vuelve a registrar la visita.
+
+Uso: python test_idempotency.py
+"""
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException, Response
+import app.config.database_async as database_async
+from app.models.user_visit import UserVisit
+from app.routes.business_portal import validate_qr
+from app.schemas.business import QRValidation
+from app.utils.idempotency import IdempotencyStore, MemoryIdempotencyBackend
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+async def run_checks() -> bool:
+    store = IdempotencyStore(MemoryIdempotencyBackend(max_entries=2, ttl=60))
+    calls = {"count": 0}
+
+    async def handler():
+        calls["count"] += 1
+        await asyncio.sleep(0.05)
+        return {"success": True, "call": calls["count"]}
+
+    results = await asyncio.gather(*[store.run("clave-1", "scope", {"qr": "a"}, handler) for _ in range(10)])
+    ok = check("10 duplicados concurrentes ejecutan el handler una vez",
+               calls["count"] == 1 and all(result == results[0] for result in results), f"llamadas={calls['count']}")
+
+    replay = await store.run("clave-1", "scope", {"qr": "a"}, handler)
+    ok = check("Reintento recibe la respuesta guardada", replay == results[0] and calls["count"] == 1) and ok
+
+    try:
+        await store.run("clave-1", "scope", {"qr": "b"}, handler)
+        ok = check("Misma clave con otro contenido se rechaza", False)
+    except HTTPException as e:
+        ok = check("Misma clave con otro contenido se rechaza", e.status_code == 422) and ok
+
+    other_scope = await store.run("clave-1", "otro-usuario", {"qr": "a"}, handler)
+    ok = check("La clave no se comparte entre scopes", other_scope["call"] == 2) and ok
+
+    async def failing():
+        calls["count"] += 1
+        raise RuntimeError("falla")
+
+    failures = 0
+    for _ in range(2):
+        try:
+            await store.run("clave-error", "scope", {}, failing)
+        except RuntimeError:
+            failures += 1
+    ok = check("Los errores no se guardan", failures == 2 and calls["count"] == 4) and ok
+
+    await store.run("clave-2", "scope", {}, handler)
+    await store.run("clave-3", "scope", {}, handler)
+    ok = check("LRU acotado", store.stats()["entries"] == 2, str(store.stats())) and ok
+
+    without_key = [await store.run(None, "scope", {}, handler) for _ in range(2)]
+    ok = check("Sin clave se ejecuta siempre", without_key[0] != without_key[1]) and ok
+    return await check_transient_scan_failure() and ok
+
+async def check_transient_scan_failure() -> bool:
+    """El primer registro falla (base caída) y el reintento con la misma clave lo registra"""
+    class FakeConnection:
+        async def fetchrow(self, query, *args):
+            return {"owner_user_id": 1, "name": "Café"} if "businesses" in query else {"nombre": "Ana"}
+
+    @asynccontextmanager
+    async def fake_connection():
+        yield FakeConnection()
+
+    attempts = {"count": 0}
+
+    def register_visit(user_id, business_id, visit_date):
+        attempts["count"] += 1
+        if attempts["count"] == 1:
+            raise RuntimeError("conexión perdida")
+        return None
+
+    UserVisit.verify_qr_code = staticmethod(lambda token, scanned_at=None: {"user_id": 42, "business_id": 7})
+    UserVisit.register_visit = staticmethod(register_visit)
+    database_async.get_async_connection = fake_connection
+
+    qr_data = QRValidation(qr_token="QR", business_id=7)
+    try:
+        await validate_qr(qr_data, Response(), {"id": 1}, "clave-scan")
+        ok = check("Falla transitoria del escaneo responde 503", False)
+    except HTTPException as e:
+        ok = check("Falla transitoria del escaneo responde 503", e.status_code == 503)
+
+    retry = await validate_qr(qr_data, Response(), {"id": 1}, "clave-scan")
+    return check("El reintento con la misma clave vuelve a registrar", attempts["count"] == 2
+                 and retry["error"] == "Visita ya registrada", str(retry)) and ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando Idempotency-Key...")
+    if asyncio.run(run_checks()):
+        print("\n✅ Idempotencia correcta")
+    else:
+        print("\n❌ Hay fallas en la idempotencia")
+        sys.exit(1)
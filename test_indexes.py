@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Prueba de índices: verifica con EXPLAIN que cada consulta caliente usa su índice
+sobre un conjunto de datos sembrado.
+
+- SQLite (por defecto): base temporal creada con las migraciones y EXPLAIN QUERY PLAN.
+- PostgreSQL (--postgres): aplica migraciones en DATABASE_URL, siembra datos dentro
+  de una transacción, ejecuta EXPLAIN (FORMAT JSON) y hace ROLLBACK al final. También
+  verifica que las consultas por visit_day / created_at lean solo sus particiones.
+
+Uso: python test_indexes.py [--postgres]
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.config.migrations import run_migrations
+
+# (descripción, consulta, parámetros, índice esperado)
+SQLITE_HOT_QUERIES = [
+    (
+        "Visitas del usuario por negocio",
+        "SELECT business_id, COUNT(*) FROM user_visits WHERE user_id = ? GROUP BY business_id",
+        (7,),
+        "ux_user_visits_day"
+    ),
+    (
+        "Visita duplicada del día",
+        "SELECT id FROM user_visits WHERE user_id = ? AND business_id = ? AND visit_day = ?",
+        (7, 3, "2025-01-15"),
+        "ux_user_visits_day"
+    ),
+    (
+        "Ronda abierta del usuario",
+        """SELECT id, progress_in_round FROM user_rounds
+           WHERE user_id = ? AND business_id = ? AND is_completed = 0""",
+        (7, 3),
+        "ux_user_rounds_open"
+    ),
+    (
+        "Visitas del negocio en un rango de fechas",
+        "SELECT COUNT(*) FROM user_visits WHERE business_id = ? AND visit_date >= ? AND visit_date < ?",
+        (3, "2025-01-15 00:00:00", "2025-01-16 00:00:00"),
+        "idx_user_visits_business_date"
+    )
+]
+
+POSTGRES_HOT_QUERIES = [
+    (
+        "UserReward: premio vigente del usuario en el negocio",
+        "SELECT * FROM user_rewards WHERE user_id = %(user_id)s AND business_id = %(business_id)s AND status = 'vigente'",
+        "idx_user_rewards_open"
+    ),
+    (
+        "UserReward: expirar premios vencidos",
+        "SELECT id FROM user_rewards WHERE user_id = %(user_id)s AND status IN ('vigente', 'reclamado') AND expires_at < NOW()",
+        "idx_user_rewards_open"
+    ),
+    (
+        "UserReward: historial del usuario",
+        "SELECT * FROM user_rewards WHERE user_id = %(user_id)s ORDER BY created_at DESC",
+        "idx_user_rewards_user_created"
+    ),
+    (
+        "UserReward: búsqueda por cupón",
+        "SELECT * FROM user_rewards WHERE coupon_code = 'IDX-00042'",
+        "user_rewards_coupon_code_key"
+    ),
+    (
+        "Dashboard: premios redimidos hoy",
+        "SELECT COUNT(*) FROM user_rewards WHERE business_id = %(business_id)s AND redeemed_at >= %(today)s AND redeemed_at < %(tomorrow)s",
+        "idx_user_rewards_business_redeemed"
+    ),
+    (
+        "Dashboard: visitas de hoy",
+        "SELECT COUNT(*) FROM user_visits WHERE business_id = %(business_id)s AND visit_day = %(today)s::date",
+        "idx_user_visits_business_day"
+    ),
+    (
+        "Dashboard: visitas del mes desde rollups",
+        "SELECT SUM(visits) FROM visit_daily_rollup WHERE business_id = %(business_id)s AND day >= date_trunc('month', NOW())::date AND day < %(today)s::date",
+        "visit_daily_rollup_pkey"
+    ),
+    (
+        "Dashboard: rondas activas",
+        "SELECT * FROM user_rounds WHERE business_id = %(business_id)s AND is_completed = FALSE ORDER BY progress_in_round DESC LIMIT 10",
+        "idx_user_rounds_open"
+    ),
+    (
+        "AuditLog: logs del negocio",
+        "SELECT * FROM audit_logs WHERE business_id = %(business_id)s ORDER BY created_at DESC LIMIT 50",
+        "idx_audit_logs_business_created_id"
+    ),
+    (
+        "PushSubscription: suscripciones activas",
+        "SELECT * FROM push_subscriptions WHERE user_id = %(user_id)s AND is_active = TRUE",
+        "idx_push_user_active"
+    )
+]
+
+# (descripción, consulta, máximo de particiones que debe leer el plan)
+POSTGRES_PRUNED_QUERIES = [
+    (
+        "Dashboard: visitas de hoy",
+        "SELECT COUNT(*) FROM user_visits WHERE business_id = %(business_id)s AND visit_day = %(today)s::date",
+        1
+    ),
+    (
+        "Visitas del mes",
+        "SELECT COUNT(*) FROM user_visits WHERE visit_month = to_char(NOW(), 'YYYY-MM') AND visit_day >= date_trunc('month', NOW())::date AND visit_day < (date_trunc('month', NOW()) + INTERVAL '1 month')::date",
+        1
+    ),
+    (
+        "AuditLog: página siguiente por cursor",
+        "SELECT * FROM audit_logs WHERE business_id = %(business_id)s AND created_at <= %(today)s AND created_at >= %(today)s - INTERVAL '20 days' ORDER BY created_at DESC LIMIT 50",
+        2
+    )
+]
+
+def seed_sqlite(connection, users: int = 300, businesses: int = 40, visits: int = 60000):
+    """Siembra usuarios, negocios, visitas y rondas con distribución realista"""
+    random.seed(42)
+    connection.executemany(
+        "INSERT INTO users (nombre, email, password) VALUES (?, ?, 'x')",
+        [(f"Usuario {i}", f"idx{i}@test.com") for i in range(users)]
+    )
+    connection.executemany(
+        "INSERT INTO businesses (name, category) VALUES (?, 'Prueba')",
+        [(f"Negocio índice {i}",) for i in range(businesses)]
+    )
+    start = datetime(2025, 1, 1)
+    rows = []
+    for _ in range(visits):
+        visit_date = start + timedelta(minutes=random.randint(0, 60 * 24 * 90))
+        rows.append((
+            random.randint(1, users), random.randint(1, businesses),
+            visit_date.strftime("%Y-%m-%d %H:%M:%S"), visit_date.strftime("%Y-%m")
+        ))
+    connection.executemany(
+        "INSERT INTO user_visits (user_id, business_id, visit_date, visit_month) VALUES (?, ?, ?, ?)",
+        rows
+    )
+    # Una ronda completada por cada 6 visitas más la ronda abierta actual
+    rounds = []
+    for user_id, business_id, count in connection.execute(
+        "SELECT user_id, business_id, COUNT(*) FROM user_visits GROUP BY user_id, business_id"
+    ):
+        completed = count // 6
+        rounds.extend((user_id, business_id, number, 6, 1) for number in range(1, completed + 1))
+        rounds.append((user_id, business_id, completed + 1, count % 6, 0))
+    connection.executemany(
+        """INSERT INTO user_rounds (user_id, business_id, round_number, progress_in_round, is_completed)
+           VALUES (?, ?, ?, ?, ?)""",
+        rounds
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+
+def check_sqlite() -> bool:
+    temp_dir = tempfile.mkdtemp()
+    settings.sqlite_path = os.path.join(temp_dir, "indexes.db")
+    run_migrations("sqlite")
+
+    from app.config.database_sqlite import connect_sqlite
+    connection = connect_sqlite()
+    seed_sqlite(connection)
+
+    ok = True
+    print("\nSQLite (EXPLAIN QUERY PLAN)")
+    for description, query, params, index in SQLITE_HOT_QUERIES:
+        plan = " | ".join(row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {query}", params))
+        used = f"INDEX {index}" in plan
+        ok = ok and used
+        print(f"  {'✅' if used else '❌'} {description}: {plan}")
+    connection.close()
+    return ok
+
+def collect_indexes(plan: dict) -> list:
+    """Nombres de índice usados en cualquier nodo del plan JSON"""
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        names.extend(collect_indexes(child))
+    return names
+
+def collect_relations(plan: dict) -> set:
+    """Tablas (particiones) leídas en cualquier nodo del plan JSON"""
+    names = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= collect_relations(child)
+    return names
+
+def seed_postgres(cursor):
+    """Siembra datos dentro de la transacción abierta (se revierte al final)"""
+    # Particiones del último año para los datos sembrados
+    cursor.execute("""
+        SELECT create_monthly_partition(parent, month::date)
+        FROM unnest(ARRAY['user_visits', 'audit_logs']) AS parent,
+             generate_series(date_trunc('month', NOW()) - INTERVAL '12 months', date_trunc('month', NOW()), INTERVAL '1 month') AS month
+    """)
+    cursor.execute("""
+        INSERT INTO users (nombre, email, password)
+        SELECT 'Índice ' || g, 'idx' || g || '@test.com', 'x' FROM generate_series(1, 500) g
+        RETURNING id
+    """)
+    user_ids = [row["id"] for row in cursor.fetchall()]
+    cursor.execute("""
+        INSERT INTO businesses (name, category)
+        SELECT 'Negocio índice ' || g, 'Prueba' FROM generate_series(1, 50) g
+        RETURNING id
+    """)
+    business_ids = [row["id"] for row in cursor.fetchall()]
+    params = {"users": user_ids, "businesses": business_ids}
+
+    cursor.execute("""
+        INSERT INTO user_visits (user_id, business_id, visit_date, visit_month, visit_day)
+        SELECT u, b, d, to_char(d, 'YYYY-MM'), d::date
+        FROM (
+            SELECT (%(users)s::int[])[1 + (random() * 499)::int] AS u,
+                   (%(businesses)s::bigint[])[1 + (random() * 49)::int] AS b,
+                   NOW() - random() * INTERVAL '365 days' AS d
+            FROM generate_series(1, 100000)
+        ) seed
+        ON CONFLICT DO NOTHING
+    """, params)
+    cursor.execute("""
+        INSERT INTO user_rounds (user_id, business_id, progress_in_round, is_completed)
+        SELECT user_id, business_id, LEAST(COUNT(*), 6)::int, random() < 0.9
+        FROM user_visits WHERE user_id = ANY(%(users)s) GROUP BY user_id, business_id
+    """, params)
+    cursor.execute("""
+        INSERT INTO user_rewards (user_id, business_id, coupon_code, status, expires_at, redeemed_at, created_at)
+        SELECT (%(users)s::int[])[1 + (random() * 499)::int],
+               (%(businesses)s::bigint[])[1 + (random() * 49)::int],
+               'IDX-' || lpad(g::text, 5, '0'),
+               CASE WHEN g %% 20 = 0 THEN 'vigente' WHEN g %% 20 = 1 THEN 'reclamado' ELSE 'usado' END,
+               NOW() + INTERVAL '30 days',
+               CASE WHEN g %% 20 > 1 THEN NOW() - random() * INTERVAL '365 days' END,
+               NOW() - random() * INTERVAL '365 days'
+        FROM generate_series(1, 50000) g
+    """, params)
+    cursor.execute("""
+        INSERT INTO audit_logs (user_id, business_id, action_type, created_at)
+        SELECT (%(users)s::int[])[1 + (random() * 499)::int],
+               (%(businesses)s::bigint[])[1 + (random() * 49)::int],
+               'qr_validation', NOW() - random() * INTERVAL '365 days'
+        FROM generate_series(1, 50000)
+    """, params)
+    cursor.execute("""
+        INSERT INTO push_subscriptions (user_id, endpoint, p256dh_key, auth_key, is_active)
+        SELECT (%(users)s::int[])[1 + (g %% 500)], 'https://push.test/' || g, 'k', 'a', g %% 10 = 0
+        FROM generate_series(1, 20000) g
+    """, params)
+    cursor.execute("""
+        INSERT INTO visit_daily_rollup (business_id, day, visits, unique_users)
+        SELECT business_id, visit_day, COUNT(*), COUNT(DISTINCT user_id)
+        FROM user_visits WHERE business_id = ANY(%(businesses)s) AND visit_day < CURRENT_DATE
+        GROUP BY business_id, visit_day
+    """, params)
+    for table in ("user_visits", "user_rounds", "user_rewards", "audit_logs", "push_subscriptions", "visit_daily_rollup"):
+        cursor.execute(f"ANALYZE {table}")
+    return user_ids[7], business_ids[3]
+
+def check_postgres() -> bool:
+    from app.config.database import get_db_connection
+
+    run_migrations("postgresql")
+    connection = get_db_connection()
+    ok = True
+    try:
+        with connection.cursor() as cursor:
+            user_id, business_id = seed_postgres(cursor)
+            today = datetime.combine(datetime.now().date(), datetime.min.time())
+            params = {
+                "user_id": user_id,
+                "business_id": business_id,
+                "today": today,
+                "tomorrow": today + timedelta(days=1)
+            }
+
+            print("\nPostgreSQL (EXPLAIN FORMAT JSON)")
+            for description, query, index in POSTGRES_HOT_QUERIES:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+                plan = cursor.fetchone()["QUERY PLAN"][0]["Plan"]
+                used_indexes = collect_indexes(plan)
+                used = index in used_indexes
+                ok = ok and used
+                print(f"  {'✅' if used else '❌'} {description}: {plan['Node Type']} {used_indexes}")
+
+            print("\nPostgreSQL (poda de particiones)")
+            for description, query, max_partitions in POSTGRES_PRUNED_QUERIES:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+                partitions = sorted(collect_relations(cursor.fetchone()["QUERY PLAN"][0]["Plan"]))
+                pruned = 0 < len(partitions) <= max_partitions
+                ok = ok and pruned
+                print(f"  {'✅' if pruned else '❌'} {description}: {partitions}")
+    finally:
+        connection.rollback()
+        connection.close()
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando índices de consultas calientes...")
+    success = check_sqlite()
+    if "--postgres" in sys.argv:
+        success = check_postgres() and success
+
+    if success:
+        print("\n✅ Todas las consultas calientes usan índice")
+    else:
+        print("\n❌ Hay consultas sin índice")
+        sys.exit(1)
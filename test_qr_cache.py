@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Prueba de la caché de imágenes QR: el mismo contenido con los mismos parámetros se
+sirve desde caché, otros parámetros son otra entrada, el TTL expira, el límite de
+memoria desaloja por LRU y las métricas reflejan aciertos y fallos.
+
+Uso: python test_qr_cache.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.qr_renderer import QRImageCache, QRRenderPool
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+async def run_checks() -> bool:
+    pool = QRRenderPool(workers=0, queue_limit=10, timeout=5.0, cache=QRImageCache(max_bytes=10 * 1024 * 1024, ttl=60))
+
+    first = await pool.render("cupón-1")
+    second = await pool.render("cupón-1")
+    stats = pool.stats()
+    ok = check("El mismo contenido se renderiza una vez", first == second and stats["completed"] == 1,
+               f"renders={stats['completed']}")
+    ok = check("Métricas de aciertos y fallos", stats["cache"]["hits"] == 1 and stats["cache"]["misses"] == 1,
+               str(stats["cache"])) and ok
+
+    bordered = await pool.render("cupón-1", border=4)
+    same_defaults = pool.render_sync("cupón-1", box_size=10, border=5)
+    ok = check("Otros parámetros son otra entrada", bordered != first and pool.stats()["completed"] == 2) and ok
+    ok = check("Parámetros por defecto explícitos comparten la entrada", same_defaults == first
+               and pool.stats()["completed"] == 2) and ok
+
+    short_ttl = QRImageCache(max_bytes=1024 * 1024, ttl=0.05)
+    short_ttl.set("k", "imagen")
+    time.sleep(0.1)
+    ok = check("El TTL expira", short_ttl.get("k") is None and short_ttl.stats()["expired"] == 1) and ok
+
+    capped = QRImageCache(max_bytes=len(first) * 2, ttl=60)
+    for index in range(3):
+        capped.set(f"k{index}", first)
+    capped.get("k1")
+    capped.set("k3", first)
+    stats = capped.stats()
+    ok = check("El límite de memoria desaloja por LRU",
+               stats["bytes"] <= stats["max_bytes"] and capped.get("k1") is not None and capped.get("k2") is None,
+               f"entradas={stats['entries']} desalojos={stats['evictions']}") and ok
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando caché de imágenes QR...")
+    if asyncio.run(run_checks()):
+        print("\n✅ Caché de QR correcta")
+    else:
+        print("\n❌ Hay fallas en la caché de QR")
+        sys.exit(1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Prueba de los formatos de respuesta de generate-qr: png (data URL), svg (un solo path)
+y token (sin imagen). Verifica que el SVG dibuja exactamente la matriz QR, que el token
+trae los parámetros para dibujarla, la negociación por ?format= y Accept, y mide el
+tamaño de respuesta y el tiempo de CPU de cada formato.
+
+Uso: python test_qr_formats.py
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+import qrcode
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.controllers.user_controller_sqlite import UserController
+from app.routes.user import generate_qr
+from app.schemas.user import VisitCreate
+from app.utils.qr_image import render_qr_image, render_svg
+from app.utils.qr_renderer import qr_render_pool
+
+ROUNDS = 20
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+def svg_modules(svg: str) -> set:
+    """Módulos oscuros que pinta el path del SVG (trazos horizontales por fila)"""
+    dark = set()
+    path = re.search(r'<path stroke="#000" d="([^"]*)"', svg).group(1)
+    for command, first, second in re.findall(r"([Mmh])(-?\d+)(?: (\d+)\.5)?", path):
+        if command == "M":
+            x, y = int(first), int(second)
+        elif command == "m":
+            x += int(first)
+        else:
+            dark.update((x + offset, y) for offset in range(int(first)))
+            x += int(first)
+    return dark
+
+def cpu_ms(image_format: str, token: str) -> float:
+    options = {"border": 4, "error_correction": qrcode.constants.ERROR_CORRECT_L}
+    started = time.process_time()
+    for _ in range(ROUNDS):
+        if image_format != "token":
+            render_qr_image(token, image_format, **options)
+    return (time.process_time() - started) * 1000 / ROUNDS
+
+async def run_checks() -> bool:
+    # Render en el threadpool y sin caché: se mide el render de cada formato
+    qr_render_pool.workers = 0
+    qr_render_pool.cache = None
+    visit = VisitCreate(user_id=1, business_id=1, visit_date=datetime.now())
+
+    responses = {image_format: await UserController.generate_qr(visit, image_format) for image_format in ("png", "svg", "token")}
+    png, svg, token = (responses[image_format]["data"] for image_format in ("png", "svg", "token"))
+    ok = check("png sigue siendo la data URL de siempre", png["qr_code"].startswith("data:image/png;base64,"))
+    ok = check("svg es un SVG con un solo path de módulos", svg["qr_code"].startswith("<svg")
+               and svg["qr_code"].count("<path") == 2) and ok
+    ok = check("token no incluye imagen y trae cómo dibujarla",
+               "qr_code" not in token and token["error_correction"] == "L" and token["border"] == 4) and ok
+
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=4)
+    qr.add_data(svg["qr_token"])
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    expected = {(x, y) for y, row in enumerate(matrix) for x, dark in enumerate(row) if dark}
+    ok = check("El SVG pinta exactamente la matriz QR del token", svg_modules(svg["qr_code"]) == expected,
+               f"{len(matrix)}x{len(matrix)} módulos") and ok
+    ok = check("El token permite redibujar el mismo QR", svg["qr_code"] == render_svg(
+        svg["qr_token"], border=svg["border"], error_correction=qrcode.constants.ERROR_CORRECT_L)) and ok
+
+    default = await generate_qr(visit, {"id": 1}, None, "application/json")
+    by_query = await generate_qr(visit, {"id": 1}, "token", "image/svg+xml")
+    raw_svg = await generate_qr(visit, {"id": 1}, None, "image/svg+xml;q=0.9, */*;q=0.1")
+    raw_token = await generate_qr(visit, {"id": 1}, None, "text/plain")
+    ok = check("Sin format ni Accept específico: png en JSON", default["data"]["format"] == "png") and ok
+    ok = check("?format= tiene prioridad sobre Accept", by_query["data"]["format"] == "token") and ok
+    ok = check("Accept: image/svg+xml devuelve el SVG sin sobre JSON",
+               raw_svg.media_type == "image/svg+xml" and raw_svg.body.startswith(b"<svg")
+               and "x-qr-token" in raw_svg.headers) and ok
+    ok = check("Accept: text/plain devuelve solo el token",
+               raw_token.media_type == "text/plain" and len(raw_token.body) < 64) and ok
+
+    print(f"\n  Tamaño de respuesta y CPU por QR (token de {len(png['qr_token'])} caracteres, {ROUNDS} renders):")
+    for image_format, response in responses.items():
+        size = len(json.dumps(response))
+        print(f"    {image_format:<6} {size:7d} bytes JSON  {cpu_ms(image_format, png['qr_token']):6.1f} ms CPU")
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando formatos de generate-qr...")
+    if asyncio.run(run_checks()):
+        print("\n✅ Formatos de QR correctos")
+    else:
+        print("\n❌ Hay fallas en los formatos de QR")
+        sys.exit(1)
@@ -4,6 +4,7 @@
 Script para probar la generación de códigos QR
 """
 
+import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -24,7 +25,7 @@ def test_qr_generation():
     
     try:
         # Generar QR
-        result = UserController.generate_qr(visit_data)
+        result = asyncio.run(UserController.generate_qr(visit_data))
         
         if result["success"]:
             print("Codigo QR generado exitosamente")
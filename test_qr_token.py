@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Prueba del token compacto de QR (app/utils/qr_token.py): base45 según RFC 9285, ida y
+vuelta de visitas y cupones, rechazo de firmas alteradas y de tokens de otro tipo,
+expiración contra el momento del escaneo, y aceptación de los JWT emitidos antes.
+
+Uso: python test_qr_token.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from jose import jwt
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.models.user_reward import UserReward
+from app.models.user_visit import UserVisit
+from app.utils.qr_token import (
+    COUPON_TOKEN, VISIT_TOKEN, QRTokenError, b45decode, b45encode, decode_qr_token, encode_coupon_token
+)
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+def rejects(token: str, kind: int, secret: str = settings.jwt_secret_key) -> bool:
+    try:
+        decode_qr_token(token, secret, kind)
+        return False
+    except QRTokenError:
+        return True
+
+def run_checks() -> bool:
+    ok = check("Vectores de RFC 9285", b45encode(b"AB") == "BB8" and b45encode(b"Hello!!") == "%69 VD92EX0"
+               and b45decode("QED8WEX0") == b"ietf!")
+    ok = check("base45 ida y vuelta", all(b45decode(b45encode(data)) == data
+                                          for data in (os.urandom(size) for size in range(12)))) and ok
+
+    visit_date = datetime.now().replace(microsecond=0)
+    token = UserVisit.create_qr_token(42, 7, visit_date)
+    payload = UserVisit.verify_qr_code(token)
+    ok = check("Token de visita compacto", len(token) == 41 and payload == {
+        "user_id": 42, "business_id": 7, "visit_timestamp": int(visit_date.timestamp())
+    }, f"{len(token)} caracteres: {token}") and ok
+
+    tampered = token[:10] + ("0" if token[10] != "0" else "1") + token[11:]
+    ok = check("Firma alterada se rechaza", UserVisit.verify_qr_code(tampered) is None) and ok
+    ok = check("Un token de visita no sirve como cupón", rejects(token, COUPON_TOKEN)
+               and UserReward.verify_coupon_qr(token) is None) and ok
+    ok = check("Otra clave no verifica", rejects(token, VISIT_TOKEN, "otra-clave")) and ok
+
+    ok = check("Escaneo offline dentro de la vigencia", UserVisit.verify_qr_code(token, datetime.now() + timedelta(hours=23)) is not None) and ok
+    ok = check("Escaneo offline vencido", UserVisit.verify_qr_code(token, datetime.now() + timedelta(hours=25)) is None) and ok
+
+    expires_at = (datetime.now() + timedelta(days=30)).replace(microsecond=0)
+    coupon = encode_coupon_token("CPN-1A2B3C4D", 42, 7, int(expires_at.timestamp()), settings.jwt_secret_key)
+    ok = check("Cupón compacto", UserReward.verify_coupon_qr(coupon) == {
+        "coupon_code": "CPN-1A2B3C4D", "user_id": 42, "business_id": 7, "expires_at": expires_at.isoformat()
+    }, coupon) and ok
+
+    legacy_visit = jwt.encode({
+        "user_id": 42, "business_id": 7, "visit_timestamp": int(visit_date.timestamp()),
+        "exp": datetime.utcnow() + timedelta(hours=24)
+    }, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    legacy_coupon = jwt.encode({
+        "coupon_code": "CPN-1A2B3C4D", "user_id": 42, "business_id": 7,
+        "expires_at": expires_at.isoformat(), "type": "reward_coupon"
+    }, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    ok = check("JWT de visita emitido antes se sigue aceptando", UserVisit.verify_qr_code(legacy_visit) == payload) and ok
+    ok = check("JWT de cupón emitido antes se sigue aceptando",
+               UserReward.verify_coupon_qr(legacy_coupon) == UserReward.verify_coupon_qr(coupon)) and ok
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando token compacto de QR...")
+    if run_checks():
+        print("\n✅ Token compacto de QR correcto")
+    else:
+        print("\n❌ Hay fallas en el token compacto de QR")
+        sys.exit(1)
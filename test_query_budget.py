@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Prueba del contador de consultas por petición: llama rutas reales a través de la
+app ASGI (incluido el middleware) sobre una copia temporal de SQLite, muestra los
+headers de debug y falla si una ruta supera su presupuesto de consultas.
+
+Uso: python test_query_budget.py
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from jose import jwt
+from app.config.settings import settings
+
+# (método, ruta, presupuesto de consultas)
+ROUTE_BUDGETS = [
+    ("GET", "/api/user/visits", 1),
+    ("GET", "/api/businesses", 3)
+]
+
+def make_token(user_id: int) -> str:
+    payload = {"sub": str(user_id), "exp": datetime.utcnow() + timedelta(hours=1)}
+    return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+async def call_route(app, method: str, path: str, headers: dict):
+    """Ejecuta una petición directamente sobre la app ASGI; devuelve (status, headers)"""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "path": path,
+        "raw_path": path.encode(), "root_path": "", "scheme": "http", "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80)
+    }
+    response = {"status": None, "headers": {}}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode().lower(): v.decode() for k, v in message["headers"]}
+
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        print(f"     Error: {e}")
+        response["status"] = response["status"] or 500
+    return response["status"], response["headers"]
+
+def main() -> bool:
+    temp_dir = tempfile.mkdtemp()
+    settings.sqlite_path = os.path.join(temp_dir, "query_budget.db")
+    shutil.copy("auth_api.db", settings.sqlite_path)
+    settings.debug = True
+    settings.query_budget_strict = True
+
+    from main import app
+
+    ok = True
+    headers = {"Authorization": f"Bearer {make_token(1)}"}
+    for method, path, budget in ROUTE_BUDGETS:
+        settings.query_budget = budget
+        status, response_headers = asyncio.run(call_route(app, method, path, headers))
+        count = response_headers.get("x-db-query-count")
+        passed = status < 500 and count is not None and int(count) <= budget
+        ok = ok and passed
+        print(
+            f"  {'✅' if passed else '❌'} {method} {path}: status={status} "
+            f"consultas={count} (presupuesto {budget}) "
+            f"db_ms={response_headers.get('x-db-time-ms')} "
+            f"repetidas={response_headers.get('x-db-repeated-statements')}"
+        )
+
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando presupuesto de consultas por ruta...")
+    if main():
+        print("\n✅ Todas las rutas dentro de su presupuesto")
+    else:
+        print("\n❌ Hay rutas que exceden su presupuesto")
+        sys.exit(1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Prueba del cálculo de rondas de la reconstrucción masiva (sin base de datos): rondas
+completas según premios reclamados, ronda abierta con el resto de las visitas, cambio
+de meta, inclusión de las particiones archivadas en el flujo de visitas y rendimiento
+del cálculo en memoria para un millón de visitas.
+
+Uso: python test_round_rebuild.py
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from psycopg2 import sql
+from app.services.round_rebuild_service import compute_rounds, iter_pair_rounds, visit_source, _copy_value
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+def visits(count: int, start: int = 1):
+    base = datetime(2024, 1, 1)
+    return [(start + i, base + timedelta(days=i)) for i in range(count)]
+
+def run_checks() -> bool:
+    rounds = compute_rounds(1, 2, visits(14), 6, 2)
+    ok = check("14 visitas, meta 6, 2 premios: 2 completas y una abierta con 2",
+               [(r[2], r[3], r[6]) for r in rounds] == [(1, 6, True), (2, 6, True), (3, 2, False)])
+    ok = check("La ronda completa cierra en su última visita",
+               rounds[0][5] == visits(14)[5][1] and rounds[0][8] == 6 and rounds[1][4] == visits(14)[6][1]) and ok
+
+    pending = compute_rounds(1, 2, visits(14), 6, 0)
+    ok = check("Sin premios reclamados todo queda en la ronda abierta (premio pendiente)",
+               [(r[2], r[3]) for r in pending] == [(1, 14)]) and ok
+
+    lowered = compute_rounds(1, 2, visits(14), 4, 2)
+    ok = check("Bajar la meta a 4 con 2 premios: abierta con 6 visitas",
+               [(r[2], r[3]) for r in lowered] == [(1, 4), (2, 4), (3, 6)]) and ok
+
+    raised = compute_rounds(1, 2, visits(14), 10, 2)
+    ok = check("Subir la meta a 10 conserva solo las rondas que alcanzan",
+               [(r[2], r[3], r[6]) for r in raised] == [(1, 10, True), (2, 4, False)]) and ok
+
+    exact = compute_rounds(1, 2, visits(12), 6, 2)
+    ok = check("Sin visitas restantes no hay ronda abierta", len(exact) == 2) and ok
+
+    stream = [(1, 1, vid, date, 6, 0) for vid, date in visits(3)] + [(1, 2, vid, date, 2, 1) for vid, date in visits(5, 10)]
+    grouped = list(iter_pair_rounds(stream))
+    ok = check("El flujo se agrupa por (usuario, negocio)",
+               [count for count, _ in grouped] == [3, 5] and [len(r) for _, r in grouped] == [1, 2]) and ok
+
+    ok = check("Formato COPY", [_copy_value(v) for v in (None, True, False, 7)] == ["\\N", "t", "f", "7"]) and ok
+    archived = repr(visit_source(["user_visits_p202401", "user_visits_p202402"]))
+    ok = check("Sin particiones archivadas se leen solo las visitas adjuntas",
+               visit_source([]) == sql.Identifier("user_visits")) and ok
+    ok = check("Las particiones archivadas entran al flujo de visitas",
+               "UNION ALL" in archived and "Identifier('archive', 'user_visits_p202401')" in archived
+               and "Identifier('archive', 'user_visits_p202402')" in archived) and ok
+
+    users, per_pair = 100_000, 10
+    base = datetime(2024, 1, 1)
+    rows = (
+        (user_id, 1, user_id * per_pair + i, base, 6, 1)
+        for user_id in range(users) for i in range(per_pair)
+    )
+    started = time.perf_counter()
+    produced = sum(len(r) for _, r in iter_pair_rounds(rows))
+    elapsed = time.perf_counter() - started
+    ok = check("1M visitas calculadas en memoria", produced == users * 2,
+               f"{elapsed:.2f} s, {int(users * per_pair / elapsed):,} visitas/s") and ok
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando reconstrucción de rondas...")
+    if run_checks():
+        print("\n✅ Reconstrucción de rondas correcta")
+    else:
+        print("\n❌ Hay fallas en la reconstrucción de rondas")
+        sys.exit(1)
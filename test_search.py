@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Prueba de búsqueda indexada: en una base SQLite temporal creada con las migraciones
+verifica que FTS5 ignore acentos, acepte prefijos, ordene por relevancia y se mantenga
+sincronizado con los triggers; además revisa el armado de consultas de PostgreSQL.
+
+Uso: python test_search.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.config.migrations import run_migrations
+from app.utils.search import prefix_tsquery, fts5_query, like_pattern, ranked_search
+
+BUSINESSES = [
+    ("Taquería El Güero", "Restaurante", "Av. Juárez 10"),
+    ("Café Central", "Cafetería", "Calle Taquería 5"),
+    ("Panadería La Espiga", "Panadería", "Centro"),
+    ("Farmacia San José", "Farmacia", "Av. Café 21")
+]
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+def check_query_builders() -> bool:
+    print("\nConstrucción de consultas")
+    ok = check("Prefijos tsquery", prefix_tsquery("Taq  centro!") == "taq:* & centro:*", prefix_tsquery("Taq  centro!"))
+    ok = check("Operadores ignorados", prefix_tsquery("a & | ! ( ) :*") == "a:*") and ok
+    ok = check("Sin palabras", prefix_tsquery("@@") is None and fts5_query("--") is None) and ok
+    ok = check("FTS5 entrecomillado", fts5_query('caf" OR x') == '"caf"* "or"* "x"*', fts5_query('caf" OR x')) and ok
+    ok = check("Comodines ILIKE escapados", like_pattern("50%_") == "%50\\%\\_%", like_pattern("50%_")) and ok
+
+    filter_sql, filter_params, rank_sql, rank_params = ranked_search(
+        "doc(b.name)", "spanish", ["immutable_unaccent(b.name)"], "Café"
+    )
+    placeholders = filter_sql.count("%s") + rank_sql.count("%s")
+    ok = check(
+        "Parámetros coinciden con placeholders",
+        placeholders == len(filter_params) + len(rank_params),
+        f"{placeholders} placeholders"
+    ) and ok
+    return ok
+
+def check_sqlite_fts() -> bool:
+    temp_dir = tempfile.mkdtemp()
+    settings.sqlite_path = os.path.join(temp_dir, "search.db")
+    run_migrations("sqlite")
+
+    from app.config.database_sqlite import connect_sqlite
+    from app.models.business_sqlite import Business
+    from app.models.user_sqlite import User
+
+    connection = connect_sqlite()
+    connection.executemany("INSERT INTO businesses (name, category, address) VALUES (?, ?, ?)", BUSINESSES)
+    connection.execute("INSERT INTO users (nombre, email, password) VALUES ('José Pérez', 'jperez@correo.com', 'x')")
+    connection.commit()
+
+    print("\nSQLite FTS5")
+    names = [business["name"] for business in Business.search("taqueria")]
+    ok = check("Sin acentos y ordenado por relevancia (nombre antes que dirección)",
+               names == ["Taquería El Güero", "Café Central"], str(names))
+
+    names = [business["name"] for business in Business.search("pana")]
+    ok = check("Prefijo", names == ["Panadería La Espiga"], str(names)) and ok
+
+    names = [business["name"] for business in Business.search("cafe")]
+    ok = check("Categoría pondera más que dirección", names[:1] == ["Café Central"], str(names)) and ok
+
+    connection.execute("UPDATE businesses SET name = 'Farmacia del Ahorro' WHERE name = 'Farmacia San José'")
+    connection.commit()
+    names = [business["name"] for business in Business.search("ahorro")]
+    ok = check("Trigger de actualización", names == ["Farmacia del Ahorro"], str(names)) and ok
+    ok = check("Nombre anterior eliminado del índice", Business.search("jose") == []) and ok
+
+    users = [user["nombre"] for user in User.search("jose")] + [user["nombre"] for user in User.search("jperez")]
+    ok = check("Usuarios por nombre y email", users == ["José Pérez", "José Pérez"], str(users)) and ok
+
+    plan = " | ".join(row[3] for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT rowid FROM businesses_fts WHERE businesses_fts MATCH '\"caf\"*'"
+    ))
+    ok = check("Consulta por índice FTS5", "VIRTUAL TABLE INDEX" in plan, plan) and ok
+    connection.close()
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando búsqueda indexada...")
+    success = check_query_builders()
+    success = check_sqlite_fts() and success
+
+    if success:
+        print("\n✅ Búsqueda indexada correcta")
+    else:
+        print("\n❌ Hay fallas en la búsqueda")
+        sys.exit(1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Prueba del registro atómico de visitas: sobre una base SQLite temporal verifica que
+el segundo escaneo del mismo día no inserte ni avance la ronda (también con escaneos
+concurrentes), que una visita sin ronda abierta cree la siguiente y que un trabajo
+del escritor que vence en cola se cancele sin confirmarse.
+
+Uso: python test_visit_registration.py
+"""
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.settings import settings
+from app.config.migrations import run_migrations
+
+def check(description: str, passed: bool, detail: str = "") -> bool:
+    print(f"  {'✅' if passed else '❌'} {description}{f': {detail}' if detail else ''}")
+    return passed
+
+def main() -> bool:
+    temp_dir = tempfile.mkdtemp()
+    settings.sqlite_path = os.path.join(temp_dir, "visits.db")
+    settings.sqlite_single_writer = True
+    run_migrations("sqlite")
+
+    from app.config.database_sqlite import connect_sqlite
+    from app.config.sqlite_writer import SQLiteWriter, stop_writer
+    from app.models.user_visit_sqlite import UserVisit
+
+    connection = connect_sqlite()
+    connection.execute("INSERT INTO users (id, nombre, email, password) VALUES (1, 'Visitante', 'v@test.com', 'x')")
+    connection.execute("INSERT INTO businesses (id, name, category) VALUES (1, 'Negocio', 'Prueba')")
+    connection.commit()
+
+    def state():
+        visits = connection.execute("SELECT COUNT(*) FROM user_visits").fetchone()[0]
+        rounds = connection.execute(
+            "SELECT round_number, progress_in_round, is_completed FROM user_rounds ORDER BY round_number"
+        ).fetchall()
+        return visits, [tuple(row) for row in rounds]
+
+    day = datetime(2025, 3, 10, 9, 0)
+    ok = True
+    try:
+        first = UserVisit.register_visit(1, 1, day)
+        ok = check("Primera visita crea la ronda 1", first is not None and state() == (1, [(1, 1, 0)]), str(state()))
+
+        second = UserVisit.register_visit(1, 1, day + timedelta(hours=5))
+        ok = check("Segundo escaneo del día se descarta", second is None and state() == (1, [(1, 1, 0)]), str(state())) and ok
+
+        next_day = day + timedelta(days=1)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: UserVisit.register_visit(1, 1, next_day), range(8)))
+        inserted = [result for result in results if result is not None]
+        ok = check(
+            "8 escaneos concurrentes del mismo día registran una visita",
+            len(inserted) == 1 and state() == (2, [(1, 2, 0)]), str(state())
+        ) and ok
+
+        connection.execute("UPDATE user_rounds SET is_completed = 1")
+        connection.commit()
+        UserVisit.register_visit(1, 1, day + timedelta(days=2))
+        ok = check(
+            "Sin ronda abierta se crea la siguiente con progreso 1",
+            state() == (3, [(1, 2, 1), (2, 1, 0)]), str(state())
+        ) and ok
+
+        # Trabajo que vence en cola: el llamador recibe el timeout y el escritor no lo confirma
+        writer = SQLiteWriter()
+        timeout, settings.sqlite_writer_timeout = settings.sqlite_writer_timeout, 0.05
+        try:
+            writer.execute(lambda conn: conn.execute("INSERT INTO businesses (id, name, category) VALUES (99, 'Tarde', 'Prueba')"))
+            timed_out = False
+        except FutureTimeoutError:
+            timed_out = True
+        finally:
+            settings.sqlite_writer_timeout = timeout
+        writer.start()
+        writer.stop()
+        late = connection.execute("SELECT COUNT(*) FROM businesses WHERE id = 99").fetchone()[0]
+        ok = check(
+            "Un trabajo vencido en cola se cancela y no se confirma",
+            timed_out and late == 0 and writer.stats()["cancelled_jobs"] == 1, str(writer.stats())
+        ) and ok
+    finally:
+        stop_writer()
+        connection.close()
+    return ok
+
+if __name__ == "__main__":
+    print("🔍 Verificando registro atómico de visitas...")
+    if main():
+        print("\n✅ Registro de visitas correcto")
+    else:
+        print("\n❌ Hay fallas en el registro de visitas")
+        sys.exit(1)